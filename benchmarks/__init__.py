@@ -0,0 +1 @@
+# Benchmarks do fluxo de envio (dados sintéticos + Graph simulado)
@@ -0,0 +1,102 @@
+import copy
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List
+from openpyxl import Workbook
+from apps.relatorios_ccee.configuracoes.constantes import DEFAULT_CONFIGS
+from apps.relatorios_ccee.model.contatos import COLUNAS_CONTATOS
+from apps.relatorios_ccee.model.relatorios import CELULAS_FIXAS
+from apps.relatorios_ccee.model.servicos import gerar_nome_arquivo
+
+ANALISTA_BENCHMARK = "Analista Benchmark"
+ANALISTA_OUTROS = "Outro Analista"
+PLANILHA_CONTATOS = "Planilha1"
+DIRETORIO_SUMARIO = Path("Sumário") / "SUM001 - Memória_de_Cálculo"
+
+def nome_agente(indice: int) -> str:
+    return f"AGENTE SINTETICO {indice:05d}"
+
+def _valor_coluna(destino: str, indice: int, aleatorio: random.Random, data_base: datetime) -> Any:
+    """Valor plausível para uma coluna padronizada (Empresa, Valor, Data...)."""
+    if destino == "Empresa":
+        return nome_agente(indice)
+    if destino == "Situacao":
+        return "Crédito" if indice % 2 == 0 else "Débito"
+    if destino == "TipoAgente":
+        return "Gerador" if indice % 3 == 0 else "Comercializador"
+    if destino == "Data":
+        return data_base + timedelta(days=indice % 5)
+    if destino.startswith("Valor"):
+        return round(aleatorio.uniform(-50_000, 250_000), 2)
+    return f"{destino} {indice}"
+
+def mapa_colunas(config: Dict[str, Any]) -> Dict[str, str]:
+    return dict(item.split(":") for item in config["colunas_dados"].split(","))
+
+def gerar_planilha_dados(tipo_relatorio: str, caminho_arquivo: Path, agentes: int, semente: int = 42) -> Path:
+    """Gera a planilha de dados do relatório com o layout de DEFAULT_CONFIGS.
+
+    O cabeçalho fica na linha `linha_cabecalho`, as células fixas lidas pelos handlers
+    (CELULAS_FIXAS) recebem datas e cada agente ocupa uma linha.
+    """
+    config = DEFAULT_CONFIGS[tipo_relatorio]
+    cabecalho = int(config["linha_cabecalho"])
+    colunas = mapa_colunas(config)
+    aleatorio = random.Random(semente)
+    data_base = datetime(2025, 3, 10)
+    celulas = {(linha, coluna): data_base + timedelta(days=coluna) for linha, coluna in CELULAS_FIXAS.get(tipo_relatorio, []) if linha < cabecalho}
+    livro = Workbook(write_only=True)
+    folha = livro.create_sheet(config["planilha_dados"])
+    for linha in range(cabecalho):
+        colunas_fixas = {coluna: valor for (l, coluna), valor in celulas.items() if l == linha}
+        folha.append([colunas_fixas.get(coluna) for coluna in range(max(colunas_fixas, default=-1) + 1)])
+    folha.append(list(colunas.keys()))
+    for indice in range(agentes):
+        folha.append([_valor_coluna(destino, indice, aleatorio, data_base) for destino in colunas.values()])
+    caminho_arquivo.parent.mkdir(parents=True, exist_ok=True)
+    livro.save(caminho_arquivo)
+    return caminho_arquivo
+
+def gerar_planilha_contatos(caminho_arquivo: Path, agentes: int) -> Path:
+    """Contatos dos agentes sintéticos, todos do analista do benchmark, mais o mesmo
+    número de agentes de outro analista (para a junção não ser trivial)."""
+    livro = Workbook(write_only=True)
+    folha = livro.create_sheet(PLANILHA_CONTATOS)
+    folha.append(list(COLUNAS_CONTATOS.keys()))
+    for indice in range(agentes):
+        folha.append([nome_agente(indice), ANALISTA_BENCHMARK, f"agente{indice}@exemplo.com.br; financeiro{indice}@exemplo.com.br"])
+    for indice in range(agentes, 2 * agentes):
+        folha.append([nome_agente(indice), ANALISTA_OUTROS, f"agente{indice}@exemplo.com.br"])
+    caminho_arquivo.parent.mkdir(parents=True, exist_ok=True)
+    livro.save(caminho_arquivo)
+    return caminho_arquivo
+
+def gerar_pdfs(diretorio: Path, tipo_relatorio: str, agentes: int, mes: str, ano: str, tamanho_bytes: int) -> List[Path]:
+    """Cria um PDF falso de `tamanho_bytes` por agente, com o nome que o envio procura."""
+    diretorio.mkdir(parents=True, exist_ok=True)
+    conteudo = b"%PDF-1.4\n" + b"0" * max(0, tamanho_bytes - 9)
+    caminhos = []
+    for indice in range(agentes):
+        caminho_pdf = diretorio / gerar_nome_arquivo(nome_agente(indice), tipo_relatorio, mes, ano)
+        caminho_pdf.write_bytes(conteudo)
+        caminhos.append(caminho_pdf)
+    return caminhos
+
+def gerar_cenario(raiz: Path, tipo_relatorio: str, agentes: int, mes: str = "MARÇO", ano: str = "2025", tamanho_pdf_bytes: int = 50 * 1024) -> Dict[str, Any]:
+    """Monta planilhas e PDFs de um relatório em `raiz` e devolve a config já resolvida."""
+    config = copy.deepcopy(DEFAULT_CONFIGS[tipo_relatorio])
+    config.pop("modelo_caminho", None)
+    codigo = tipo_relatorio.replace(" ", "_")
+    diretorio_pdfs = raiz / "pdfs" / codigo / "PDF"
+    config.update({
+        "excel_dados": str(gerar_planilha_dados(tipo_relatorio, raiz / f"{codigo}_{agentes}.xlsx", agentes)),
+        "excel_contatos": str(gerar_planilha_contatos(raiz / f"contatos_{agentes}.xlsx", agentes)),
+        "planilha_contatos": PLANILHA_CONTATOS,
+        "diretorio_pdfs": str(diretorio_pdfs),
+    })
+    gerar_pdfs(diretorio_pdfs, tipo_relatorio, agentes, mes, ano, tamanho_pdf_bytes)
+    if tipo_relatorio == "GFN001":
+        # O GFN001 também anexa o SUM001, procurado dois níveis acima da pasta de PDFs.
+        gerar_pdfs(diretorio_pdfs.parent.parent / DIRETORIO_SUMARIO, "SUM001", agentes, mes, ano, tamanho_pdf_bytes)
+    return config
@@ -0,0 +1,144 @@
+"""Benchmark do fluxo de envio com planilhas sintéticas e um Graph simulado.
+
+Uso:
+    python -m apps.relatorios_ccee.benchmarks.executar --tamanhos 10,100,1000
+    python -m apps.relatorios_ccee.benchmarks.executar --relatorios SUM001,GFN001 --latencia-ms 80 --taxa-429 0.05
+
+Cada cenário (relatório x número de agentes x modo de envio) roda em um processo
+próprio, para que o pico de memória medido seja só dele.
+"""
+import sys
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional
+from apps.relatorios_ccee.configuracoes.constantes import DEFAULT_CONFIGS
+from apps.relatorios_ccee.benchmarks.dados_sinteticos import gerar_cenario, ANALISTA_BENCHMARK
+from apps.relatorios_ccee.benchmarks.graph_simulado import ServidorGraphSimulado
+
+RELATORIOS_PADRAO = ["GFN001", "SUM001", "LFN001", "LFRES001", "LFRCAP001", "RCAP002"]
+TAMANHOS_PADRAO = [10, 100, 1000]
+TOKEN_BENCHMARK = "benchmark.token.simulado"
+
+def pico_rss_mb() -> Optional[float]:
+    """Pico de memória residente do processo atual, em MB (None se não der para medir)."""
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        memoria = psutil.Process().memory_info()
+        return round(getattr(memoria, "peak_wset", memoria.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+def executar_cenario(parametros: Dict[str, Any]) -> Dict[str, Any]:
+    """Gera os arquivos de um cenário e roda preparação + envio contra o Graph simulado."""
+    from apps.relatorios_ccee.configuracoes.constantes import GRAPH_CONFIGS, MEDICOES_CONFIGS, INSTANTANEOS_CONFIGS
+    from apps.relatorios_ccee.model import cliente_graph, servicos
+    from apps.relatorios_ccee.model.medicoes import MedicaoExecucao
+
+    cliente_graph.GRAPH_BASE_URL = parametros["url_graph"]
+    MEDICOES_CONFIGS["arquivo_jsonl"] = parametros["arquivo_jsonl"]
+    # Instantâneos isolados no diretório do cenário: a leitura medida é sempre a fria.
+    INSTANTANEOS_CONFIGS["diretorio"] = str(Path(parametros["diretorio"]) / "instantaneos")
+    GRAPH_CONFIGS.update(parametros.get("graph_configs") or {})
+    tipo, agentes, modo = parametros["tipo"], parametros["agentes"], parametros["modo"]
+    raiz = Path(parametros["diretorio"]) / f"{tipo.replace(' ', '_')}_{agentes}"
+    inicio_geracao = time.perf_counter()
+    config = gerar_cenario(raiz, tipo, agentes, parametros["mes"], parametros["ano"], parametros["tamanho_pdf_bytes"])
+    geracao_s = time.perf_counter() - inicio_geracao
+
+    medicao = MedicaoExecucao(tipo=tipo, analista=ANALISTA_BENCHMARK, mes=parametros["mes"], ano=parametros["ano"], agentes=agentes, modo=modo)
+    inicio = time.perf_counter()
+    dados_preparados = servicos.preparar_dados_config(tipo, ANALISTA_BENCHMARK, config)
+    resultados = servicos.informa_processos(
+        tipo, ANALISTA_BENCHMARK, parametros["mes"], parametros["ano"], TOKEN_BENCHMARK,
+        modo_envio=modo, dados_preparados=dados_preparados, medicao=medicao
+    )
+    duracao_s = time.perf_counter() - inicio
+    linhas = len(dados_preparados[0])
+    resumo = medicao.resumo()
+    return {
+        "tipo": tipo,
+        "agentes": agentes,
+        "modo": modo,
+        "linhas": linhas,
+        "criados": len(resultados),
+        "duracao_s": round(duracao_s, 3),
+        "linhas_por_s": round(linhas / duracao_s, 1) if duracao_s > 0 else None,
+        "pico_rss_mb": pico_rss_mb(),
+        "geracao_arquivos_s": round(geracao_s, 3),
+        "etapas_s": {nome: dados["total_s"] for nome, dados in resumo["etapas"].items()},
+        "etapas": resumo["etapas"],
+        "metricas_graph": servicos.obter_metricas_graph(TOKEN_BENCHMARK),
+    }
+
+def _imprimir_tabela(resultados: List[Dict[str, Any]]) -> None:
+    etapas = []
+    for resultado in resultados:
+        etapas.extend(nome for nome in resultado["etapas_s"] if nome not in etapas)
+    cabecalho = ["relatorio", "agentes", "modo", "linhas", "criados", "total_s", "linhas/s", "pico_MB"] + etapas
+    print("\t".join(cabecalho))
+    for r in resultados:
+        print("\t".join(str(v) for v in [r["tipo"], r["agentes"], r["modo"], r["linhas"], r["criados"], r["duracao_s"], r["linhas_por_s"], r["pico_rss_mb"]]
+                        + [f"{r['etapas_s'].get(nome, 0):.3f}" for nome in etapas]))
+
+def _lista(texto: str) -> List[str]:
+    return [item.strip() for item in texto.split(",") if item.strip()]
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark do envio de relatórios CCEE com dados sintéticos.")
+    parser.add_argument("--relatorios", default=",".join(RELATORIOS_PADRAO), help="Relatórios de DEFAULT_CONFIGS, separados por vírgula.")
+    parser.add_argument("--tamanhos", default=",".join(str(t) for t in TAMANHOS_PADRAO), help="Números de agentes, separados por vírgula.")
+    parser.add_argument("--modos", default="lote", help="Modos de envio (lote, individual), separados por vírgula.")
+    parser.add_argument("--latencia-ms", type=float, default=50.0, help="Latência de cada resposta do Graph simulado.")
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="Fração de requisições respondidas com 429 (0 a 1).")
+    parser.add_argument("--retry-after-s", type=float, default=0.1, help="Retry-After enviado junto com os 429.")
+    parser.add_argument("--tamanho-pdf-kb", type=int, default=50, help="Tamanho de cada PDF sintético.")
+    parser.add_argument("--mes", default="MARÇO")
+    parser.add_argument("--ano", default="2025")
+    parser.add_argument("--diretorio", help="Onde gerar os arquivos (padrão: diretório temporário).")
+    parser.add_argument("--saida", help="Grava os resultados completos neste arquivo JSON.")
+    parser.add_argument("--mesmo-processo", action="store_true", help="Roda os cenários neste processo (pico de memória acumulado).")
+    args = parser.parse_args(argv)
+
+    relatorios = _lista(args.relatorios)
+    desconhecidos = [r for r in relatorios if r not in DEFAULT_CONFIGS]
+    if desconhecidos:
+        parser.error(f"Relatórios fora de DEFAULT_CONFIGS: {', '.join(desconhecidos)}")
+    tamanhos = [int(t) for t in _lista(args.tamanhos)]
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix="bench_ccee_") as temporario, ServidorGraphSimulado(args.latencia_ms / 1000, args.taxa_429, args.retry_after_s, semente=1) as graph:
+        diretorio = Path(args.diretorio or temporario)
+        for tipo in relatorios:
+            for agentes in tamanhos:
+                for modo in _lista(args.modos):
+                    parametros = {
+                        "tipo": tipo, "agentes": agentes, "modo": modo, "mes": args.mes, "ano": args.ano,
+                        "tamanho_pdf_bytes": args.tamanho_pdf_kb * 1024, "diretorio": str(diretorio),
+                        "url_graph": graph.url, "arquivo_jsonl": str(diretorio / "tempos_execucao.jsonl"),
+                    }
+                    if args.mesmo_processo:
+                        resultado = executar_cenario(parametros)
+                    else:
+                        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                            resultado = executor.submit(executar_cenario, parametros).result()
+                    print(f"{tipo} {agentes} agentes ({modo}): {resultado['duracao_s']}s, {resultado['linhas_por_s']} linhas/s, pico {resultado['pico_rss_mb']} MB", file=sys.stderr)
+                    resultados.append(resultado)
+        contadores_graph = dict(graph.contadores)
+    _imprimir_tabela(resultados)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump({"parametros": vars(args), "graph_simulado": contadores_graph, "resultados": resultados}, arquivo, ensure_ascii=False, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional
+
+class ServidorGraphSimulado:
+    """Substituto local do Graph para /me/messages, $batch e sessões de upload.
+
+    Cada requisição espera `latencia_s` antes de responder. Com probabilidade `taxa_429`
+    a requisição (ou, no $batch, cada sub-requisição) recebe 429 com Retry-After.
+    """
+
+    def __init__(self, latencia_s: float = 0.05, taxa_429: float = 0.0, retry_after_s: float = 0.1, semente: Optional[int] = None):
+        self.latencia_s = latencia_s
+        self.taxa_429 = taxa_429
+        self.retry_after_s = retry_after_s
+        self.aleatorio = random.Random(semente)
+        self.trava = threading.Lock()
+        self.contadores = {"requisicoes": 0, "mensagens_criadas": 0, "respostas_429": 0, "lotes": 0, "blocos_upload": 0, "mensagens_apagadas": 0}
+        self._servidor: Optional[ThreadingHTTPServer] = None
+        self._proximo_id = 0
+
+    @property
+    def url(self) -> str:
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}/v1.0"
+
+    def _contar(self, chave: str, quantidade: int = 1) -> None:
+        with self.trava:
+            self.contadores[chave] += quantidade
+
+    def _sortear_429(self) -> bool:
+        with self.trava:
+            throttle = self.aleatorio.random() < self.taxa_429
+            if throttle:
+                self.contadores["respostas_429"] += 1
+            return throttle
+
+    def _nova_mensagem(self) -> str:
+        with self.trava:
+            self._proximo_id += 1
+            self.contadores["mensagens_criadas"] += 1
+            return f"msg-{self._proximo_id}"
+
+    def _tratar(self, metodo: str, caminho: str, corpo: Dict[str, Any]) -> tuple:
+        """Retorna (status, cabeçalhos, corpo JSON) de uma requisição ou sub-requisição."""
+        if self._sortear_429():
+            return 429, {"Retry-After": str(self.retry_after_s)}, {"error": {"code": "TooManyRequests", "message": "Simulado"}}
+        if metodo == "POST" and caminho.rstrip("/").endswith("/messages"):
+            return 201, {}, {"id": self._nova_mensagem()}
+        if metodo == "POST" and caminho.endswith("/createUploadSession"):
+            host, porta = self._servidor.server_address[:2]
+            return 200, {}, {"uploadUrl": f"http://{host}:{porta}/upload/{self._nova_mensagem()}"}
+        if metodo == "PUT" and caminho.startswith("/upload/"):
+            self._contar("blocos_upload")
+            return 201, {}, {}
+        if metodo == "DELETE" and "/messages/" in caminho:
+            self._contar("mensagens_apagadas")
+            return 204, {}, {}
+        return 404, {}, {"error": {"code": "NotFound", "message": caminho}}
+
+    def _criar_manipulador(self):
+        simulado = self
+
+        class Manipulador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _responder(self, status: int, cabecalhos: Dict[str, str], corpo: Dict[str, Any]) -> None:
+                dados = json.dumps(corpo).encode("utf-8")
+                self.send_response(status)
+                for chave, valor in cabecalhos.items():
+                    self.send_header(chave, valor)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def _atender(self, metodo: str) -> None:
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                bruto = self.rfile.read(tamanho) if tamanho else b""
+                simulado._contar("requisicoes")
+                time.sleep(simulado.latencia_s)
+                if metodo == "POST" and self.path.endswith("/$batch"):
+                    if simulado._sortear_429():
+                        self._responder(429, {"Retry-After": str(simulado.retry_after_s)}, {"error": {"code": "TooManyRequests"}})
+                        return
+                    simulado._contar("lotes")
+                    respostas = []
+                    for sub in json.loads(bruto or b"{}").get("requests", []):
+                        status, cabecalhos, corpo = simulado._tratar(sub.get("method", "GET"), "/" + sub.get("url", "").lstrip("/"), sub.get("body") or {})
+                        respostas.append({"id": sub.get("id"), "status": status, "headers": cabecalhos, "body": corpo})
+                    self._responder(200, {}, {"responses": respostas})
+                    return
+                corpo = json.loads(bruto) if bruto and metodo == "POST" else {}
+                self._responder(*simulado._tratar(metodo, self.path, corpo))
+
+            def do_POST(self) -> None:
+                self._atender("POST")
+
+            def do_PUT(self) -> None:
+                self._atender("PUT")
+
+            def do_DELETE(self) -> None:
+                self._atender("DELETE")
+
+        return Manipulador
+
+    def iniciar(self, host: str = "127.0.0.1", porta: int = 0) -> "ServidorGraphSimulado":
+        self._servidor = ThreadingHTTPServer((host, porta), self._criar_manipulador())
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, name="graph-simulado", daemon=True).start()
+        return self
+
+    def parar(self) -> None:
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+    def __enter__(self) -> "ServidorGraphSimulado":
+        return self.iniciar() if self._servidor is None else self
+
+    def __exit__(self, *args: Any) -> None:
+        self.parar()
@@ -0,0 +1,113 @@
+"""Execução dos envios pela linha de comando, sem Streamlit nem navegador.
+
+Uso:
+    python -m apps.relatorios_ccee.cli --relatorios SUM001 --analistas "Isabela Loredo" --mes MARÇO --ano 2025 --saida resultado.csv
+    python -m apps.relatorios_ccee.cli --relatorios SUM001,LFN001 --analistas todos --mes MARÇO --ano 2025 --autenticacao aplicativo --caixa relatorios@electra.com.br --saida resultado.json
+
+Autenticação "dispositivo" (padrão): login por código de dispositivo, com o token em
+cache para as próximas execuções. "aplicativo": client credentials, exige --caixa.
+Um relatório e um analista usam servicos.informa_processos; combinações maiores usam
+envio_massa.informa_processos_em_massa. Cada empresa é listada assim que termina.
+"""
+import sys
+import json
+import logging
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+from dotenv import load_dotenv
+from apps.relatorios_ccee.configuracoes.constantes import ANALISTAS, MESES, GRAPH_CONFIGS
+from apps.relatorios_ccee.configuracoes.gerenciador import carregar_configuracoes
+from apps.relatorios_ccee.model import servicos, envio_massa, autenticacao
+from apps.relatorios_ccee.model.cliente_graph import obter_cliente_graph
+
+SAIDA_OK = 0
+SAIDA_COM_FALHAS = 1
+SAIDA_INTERROMPIDA = 2
+
+def _lista(texto: str) -> List[str]:
+    return [item.strip() for item in texto.split(",") if item.strip()]
+
+def _autenticar(modo: str, caixa: Optional[str]) -> Dict[str, Any]:
+    """Devolve {"token": ..., "user_info": {...}} conforme o modo de autenticação."""
+    if modo == "aplicativo":
+        token = autenticacao.obter_token_aplicativo()["access_token"]
+        return {"token": token, "user_info": {"displayName": caixa, "userPrincipalName": caixa}}
+    token = autenticacao.obter_token_dispositivo(mostrar=lambda mensagem: print(mensagem, file=sys.stderr))["access_token"]
+    resposta = obter_cliente_graph(token).get("/me?$select=displayName,userPrincipalName")
+    resposta.raise_for_status()
+    return {"token": token, "user_info": resposta.json()}
+
+def gravar_resultados(resultados: List[Dict[str, Any]], caminho_saida: str, formato: Optional[str] = None) -> None:
+    """Grava os resultados em JSON ou CSV (";" e UTF-8 com BOM, para abrir direto no Excel)."""
+    formato = formato or ("csv" if caminho_saida.lower().endswith(".csv") else "json")
+    Path(caminho_saida).parent.mkdir(parents=True, exist_ok=True)
+    if formato == "csv":
+        import pandas as pd
+        pd.DataFrame(resultados).to_csv(caminho_saida, index=False, sep=";", encoding="utf-8-sig")
+    else:
+        with open(caminho_saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, ensure_ascii=False, indent=2, default=str)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cria os rascunhos dos relatórios CCEE pela linha de comando.")
+    parser.add_argument("--relatorios", required=True, help="Relatórios separados por vírgula (ex.: SUM001,LFN001).")
+    parser.add_argument("--analistas", required=True, help="Analistas separados por vírgula, ou 'todos'.")
+    parser.add_argument("--mes", required=True, help="Nome do mês (ex.: MARÇO).")
+    parser.add_argument("--ano", required=True)
+    parser.add_argument("--autenticacao", choices=["dispositivo", "aplicativo"], default="dispositivo")
+    parser.add_argument("--caixa", help="UPN da caixa onde criar os rascunhos (obrigatório com --autenticacao aplicativo).")
+    parser.add_argument("--modo", choices=["lote", "individual"], help="Modo de envio (padrão: GRAPH_CONFIGS['modo_envio']).")
+    parser.add_argument("--saida", help="Arquivo de resultados (.json ou .csv).")
+    parser.add_argument("--formato", choices=["json", "csv"], help="Formato da saída (padrão: pela extensão).")
+    parser.add_argument("--verboso", action="store_true", help="Mostra o log INFO no terminal.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verboso else logging.WARNING, format="%(asctime)s %(levelname)s: %(message)s")
+    load_dotenv()
+
+    mes = args.mes.upper()
+    if mes not in MESES:
+        parser.error(f"Mês inválido: {args.mes}")
+    tipos = _lista(args.relatorios)
+    desconhecidos = [t for t in tipos if t not in carregar_configuracoes()]
+    if desconhecidos:
+        parser.error(f"Relatórios não configurados: {', '.join(desconhecidos)}")
+    analistas = list(ANALISTAS) if args.analistas.strip().lower() == "todos" else _lista(args.analistas)
+    if args.autenticacao == "aplicativo":
+        if not args.caixa:
+            parser.error("--caixa é obrigatório com --autenticacao aplicativo.")
+        GRAPH_CONFIGS["caixa_postal"] = args.caixa
+
+    sessao = _autenticar(args.autenticacao, args.caixa)
+    resultados: List[Dict[str, Any]] = []
+    trava = threading.Lock()
+
+    def ao_resultado(resultado: Dict[str, Any]) -> None:
+        with trava:
+            resultados.append(resultado)
+            prefixo = " | ".join(str(resultado[c]) for c in ("tipo", "analista") if c in resultado)
+            erro = f" - {resultado['erro']}" if resultado.get("erro") else ""
+            print(f"[{len(resultados)}] {prefixo + ' | ' if prefixo else ''}{resultado['empresa']}: {resultado['situacao_envio']}{erro}", file=sys.stderr)
+
+    codigo = SAIDA_OK
+    try:
+        if len(tipos) == 1 and len(analistas) == 1:
+            servicos.informa_processos(tipos[0], analistas[0], mes, args.ano, sessao["token"], user_info=sessao["user_info"], modo_envio=args.modo, ao_resultado=ao_resultado)
+        else:
+            envio_massa.informa_processos_em_massa(tipos, analistas, mes, args.ano, sessao["token"], user_info=sessao["user_info"], modo_envio=args.modo, ao_resultado=ao_resultado)
+    except Exception as e:
+        logging.error(f"Envio interrompido: {e}", exc_info=args.verboso)
+        print(f"Envio interrompido: {e}", file=sys.stderr)
+        codigo = SAIDA_INTERROMPIDA
+    criados = sum(1 for r in resultados if r["situacao_envio"] == servicos.SITUACAO_CRIADO)
+    falhas = sum(1 for r in resultados if r["situacao_envio"] == servicos.SITUACAO_FALHOU)
+    print(f"{criados} rascunho(s) criado(s), {falhas} falha(s), {len(resultados)} empresa(s).", file=sys.stderr)
+    if args.saida:
+        gravar_resultados(resultados, args.saida, args.formato)
+    if codigo == SAIDA_OK and falhas:
+        codigo = SAIDA_COM_FALHAS
+    return codigo
+
+if __name__ == "__main__":
+    sys.exit(main())
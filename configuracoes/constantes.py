@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from datetime import datetime
 
@@ -17,6 +18,85 @@ PATH_CONFIGS = {
     "user_base": "C:/Users"
 }
 
+# modo_envio: "lote" agrupa os rascunhos em envelopes $batch (até 20 por chamada);
+# "individual" cria um rascunho por requisição em um pool de threads. Em ambos o envio
+# acompanha o render; no lote, um envelope incompleto sai após lote_espera_max_s sem
+# novos e-mails renderizados.
+# O Graph aceita no máximo 4 requisições simultâneas por caixa de correio; o
+# limite_concorrencia_caixa vale para o processo todo (envios em massa e tarefas somam).
+# Anexos acima de anexo_inline_max_bytes, ou além de anexos_inline_total_max_bytes
+# somados em base64 na mensagem, vão por sessão de upload, em blocos múltiplos de
+# 320 KiB (exigência do Graph). Se um upload falhar, o rascunho é apagado.
+# Respostas 429/503/504 são retentadas com Retry-After ou backoff com jitter, e cada
+# caixa tem um balde de tokens (taxa_requisicoes_por_segundo, rajada_requisicoes).
+# POSTs que criam rascunhos só são repetidos quando o Graph certamente não os executou
+# (429 ou Retry-After); sub-requisições recusadas por 429 no $batch são reenviadas até
+# max(batch_tentativas, max_tentativas) rodadas.
+# caixa_postal: UPN da caixa onde criar os rascunhos quando o token é de aplicativo
+# (client credentials, sem /me); None usa a caixa do usuário logado.
+GRAPH_CONFIGS = {
+    "modo_envio": "lote",
+    "max_workers": 4,
+    "limite_concorrencia_caixa": 4,
+    "batch_tamanho": 20,
+    "batch_max_bytes": 4 * 1024 * 1024,
+    "batch_tentativas": 5,
+    "lote_espera_max_s": 0.2,
+    "anexo_inline_max_bytes": 3 * 1024 * 1024,
+    "anexos_inline_total_max_bytes": 3 * 1024 * 1024,
+    "anexo_max_bytes": 150 * 1024 * 1024,
+    "upload_bloco_bytes": 10 * 320 * 1024,
+    "pool_tamanho": 10,
+    "timeout_conexao": 10,
+    "timeout_leitura": 60,
+    "max_tentativas": 5,
+    "backoff_base_s": 1.0,
+    "backoff_max_s": 60.0,
+    "taxa_requisicoes_por_segundo": 10,
+    "rajada_requisicoes": 20,
+    "caixa_postal": None,
+}
+
+# Envios rodam como tarefas em segundo plano (model/tarefas.py), fora da thread do
+# script do Streamlit; concluídas ficam consultáveis por reter_concluidas_s.
+TAREFAS_CONFIGS = {
+    "max_tarefas_simultaneas": 4,
+    "reter_concluidas_s": 6 * 3600,
+}
+
+# Envio em massa (model/envio_massa.py): vários relatórios x analistas agrupados pela
+# planilha de origem; cada grupo roda em uma thread, até max_grupos_simultaneos.
+ENVIO_MASSA_CONFIGS = {
+    "max_grupos_simultaneos": 3,
+}
+
+# Instantâneos em disco das planilhas lidas e das listagens de PDFs (model/instantaneos.py),
+# compartilhados entre o app e o pré-carregamento do mês (model/aquecimento.py).
+# Cada instantâneo só vale enquanto o mtime/tamanho da origem não mudar. O pré-carregamento
+# apaga os que não são regravados há mais de reter_dias (meses antigos).
+INSTANTANEOS_CONFIGS = {
+    "habilitado": True,
+    "reter_dias": 45,
+    "diretorio": str(Path(__file__).resolve().parent.parent / "cache" / "instantaneos"),
+}
+
+# Render paralelo (servicos.renderizar_contextos): a partir de limiar_contextos empresas,
+# os contextos são divididos em fatias e renderizados em um único pool de processos,
+# compartilhado por todos os envios do processo (tarefas simultâneas disputam os mesmos
+# `processos`). Cada processo mantém seus templates compilados e seu sanitizador.
+# tamanho_fatia None = automático (cerca de 4 fatias por processo).
+RENDER_CONFIGS = {
+    "processos": max(1, (os.cpu_count() or 2) // 2),
+    "limiar_contextos": 200,
+    "tamanho_fatia": None,
+    "metodo_inicio": "spawn",
+}
+
+# Tempos por etapa de cada execução (uma linha JSON por envio), ver model/medicoes.py.
+MEDICOES_CONFIGS = {
+    "arquivo_jsonl": str(Path("logs") / "tempos_execucao.jsonl"),
+}
+
 DEFAULT_CONFIGS = {
     "GFN001": {
         "planilha_dados": "GFN003 - Garantia Financeira po",
@@ -1,3 +1,4 @@
+import copy
 import json
 import os
 from pathlib import Path
@@ -54,16 +55,23 @@ def construir_caminhos_relatorio(report_type: str, ano: str, mes: str, username:
         )
     caminhos["excel_contatos"] = user_paths["contratos_email_path"]
     return caminhos
+_cache_configuracoes: Dict[str, Any] = {"mtime": None, "configs": None}
+
 def carregar_configuracoes() -> Dict[str, Any]:
     """
     Carrega as configurações do arquivo JSON ou cria com valores padrão.
+    O arquivo só é relido quando seu mtime muda; cada chamada recebe uma cópia
+    independente, pois os chamadores alteram o dicionário retornado.
     Returns:
         Dicionário com todas as configurações
     """
     if not CONFIG_FILE.exists():
         salvar_configuracoes(DEFAULT_CONFIGS)
-        return DEFAULT_CONFIGS.copy()
+        return copy.deepcopy(DEFAULT_CONFIGS)
     try:
+        mtime = CONFIG_FILE.stat().st_mtime_ns
+        if _cache_configuracoes["configs"] is not None and _cache_configuracoes["mtime"] == mtime:
+            return copy.deepcopy(_cache_configuracoes["configs"])
         with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
             loaded_configs = json.load(f)
             for key, value in DEFAULT_CONFIGS.items():
@@ -73,6 +81,7 @@ def carregar_configuracoes() -> Dict[str, Any]:
                     for default_key, default_value in value.items():
                         if default_key not in loaded_configs[key]:
                             loaded_configs[key][default_key] = default_value
+            _cache_configuracoes.update({"mtime": mtime, "configs": copy.deepcopy(loaded_configs)})
             return loaded_configs
     except (json.JSONDecodeError, IOError) as e:
         print(f"Erro ao carregar configurações: {e}. Usando configurações padrão.")
@@ -86,6 +95,7 @@ def salvar_configuracoes(configs: Dict[str, Any]) -> None:
     try:
         with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
             json.dump(configs, f, indent=4, ensure_ascii=False)
+        _cache_configuracoes.update({"mtime": None, "configs": None})
     except IOError as e:
         print(f"Erro ao salvar configurações: {e}")
 def validar_configuracao(config: Dict[str, Any], report_type: str) -> bool:
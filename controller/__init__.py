@@ -1,3 +1,11 @@
 # Controller package
-from . import auth_controller, report_controller
+# Submódulos carregados sob demanda: importar um deles (ex.: pela linha de comando)
+# não puxa o Streamlit que o auth_controller e o adaptador de sessão usam.
+import importlib
+
 __all__ = ["auth_controller", "report_controller"]
+
+def __getattr__(nome):
+    if nome in __all__:
+        return importlib.import_module(f"{__name__}.{nome}")
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
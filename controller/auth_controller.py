@@ -1,10 +1,10 @@
 import os
 import logging
 import msal
-import requests
 import streamlit as st
 from dotenv import load_dotenv
 from apps.relatorios_ccee.model.arquivos import obtem_asset_path
+from apps.relatorios_ccee.model.cliente_graph import obter_cliente_graph
 
 # Load .env from same folder as this file
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -71,9 +71,8 @@ def obter_info_usuario(token_acesso: str) -> dict:
     Returns:
         dict: Informações do usuário obtidas da API Graph.
     """
-    headers = {'Authorization': 'Bearer ' + token_acesso}
     try:
-        resposta = requests.get('https://graph.microsoft.com/v1.0/me?$select=displayName,userPrincipalName', headers=headers)
+        resposta = obter_cliente_graph(token_acesso).get('/me?$select=displayName,userPrincipalName')
         resposta.raise_for_status()
         return resposta.json()
     except Exception as e:
@@ -1,40 +1,111 @@
 import logging
-import streamlit as st
 from apps.relatorios_ccee.model import servicos
-from typing import Any
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 from apps.relatorios_ccee.model.arquivos import ErroProcessamento
+from apps.relatorios_ccee.model import tarefas, envio_massa
+from apps.relatorios_ccee.controller import sessao_streamlit as sessao
 from apps.relatorios_ccee.configuracoes.constantes import MESES
 
 
-def criar_rascunhos(tipo_relatorio: str, analista: str, mes: str, ano: str) -> List[Dict[str, Any]]:
-    """Orquestra o processamento de relatórios e criação de rascunhos via Graph.
+CHAVE_CACHE_DADOS = "_cache_dados_preparados"
+CHAVE_TEMPOS_EXECUCAO = "tempos_execucao"
 
-    Args:
-        tipo_relatorio: Código do relatório (ex: 'GFN001').
-        analista: Nome do analista.
-        mes: Nome do mês.
-        ano: Ano.
 
-    Returns:
-        Lista de dicionários com resultados por empresa.
+def obter_dados_preparados(tipo_relatorio: str, analista: str, mes: str, ano: str) -> Tuple[Any, Dict[str, Any]]:
+    """Retorna o (DataFrame filtrado, config) da sessão, preparando-o apenas se necessário.
+
+    O cache fica no estado da sessão do Streamlit, por (tipo, analista, mês, ano), e é validado pelos
+    mtimes das planilhas e da configuração. Assim a prévia e o envio do mesmo relatório
+    compartilham uma única carga.
+    """
+    em_cache = _dados_preparados_em_cache(tipo_relatorio, analista, mes, ano)
+    if em_cache is not None:
+        return em_cache
+    user_info = sessao.info_usuario()
+    df, cfg = servicos._preparar_dados_relatorio(tipo_relatorio, analista, mes, ano, user_info=user_info)
+    cache = sessao.estado().setdefault(CHAVE_CACHE_DADOS, {})
+    cache[(tipo_relatorio, analista, mes, str(ano))] = {"df": df, "config": cfg, "assinatura": servicos.assinatura_dados_relatorio(cfg)}
+    return df, cfg
+
+
+def _dados_preparados_em_cache(tipo_relatorio: str, analista: str, mes: str, ano: str) -> Optional[Tuple[Any, Dict[str, Any]]]:
+    """(DataFrame, config) da sessão se ainda corresponderem aos arquivos em disco; senão None."""
+    chave = (tipo_relatorio, analista, mes, str(ano))
+    entrada = sessao.estado().get(CHAVE_CACHE_DADOS, {}).get(chave)
+    if entrada and servicos.assinatura_dados_relatorio(entrada["config"]) == entrada["assinatura"]:
+        logging.info(f"Reaproveitando dados preparados da sessão para {chave}.")
+        servicos.atualizar_indices_pdf(tipo_relatorio, entrada["config"])
+        return entrada["df"], entrada["config"]
+    return None
+
+
+def invalidar_dados_preparados() -> None:
+    """Descarta todos os datasets preparados desta sessão."""
+    sessao.estado().pop(CHAVE_CACHE_DADOS, None)
+
+
+def iniciar_envio(tipo_relatorio: str, analista: str, mes: str, ano: str) -> str:
+    """Agenda a criação dos rascunhos como tarefa em segundo plano e devolve o id.
+
+    Se a prévia já carregou os dados nesta sessão, a tarefa recebe uma cópia deles (a
+    sessão continua alterando a sua); senão a própria tarefa lê as planilhas, fora da
+    thread do script.
 
     Raises:
-        ErroProcessamento: Se ocorrer erro no processamento.
+        ErroProcessamento: Se não houver token de acesso na sessão.
     """
-    token_acesso = st.session_state.get("ms_token", {}).get("access_token")
-    user_info = st.session_state.get("user_info")
+    token_acesso = sessao.token_acesso()
+    user_info = sessao.info_usuario()
     if not token_acesso:
         logging.error("Tentativa de envio sem token de acesso presente na sessão.")
         raise ErroProcessamento("Usuário não autenticado. Faça login para enviar e-mails.")
-    try:
-        resultados = servicos.informa_processos(tipo_relatorio, analista, mes, ano, token_acesso, user_info=user_info)
-        return resultados
-    except ErroProcessamento:
-        raise
-    except Exception as e:
-        logging.exception("Erro inesperado em criar_rascunhos:")
-        raise ErroProcessamento(f"Erro inesperado ao criar rascunhos: {e}")
+    em_cache = _dados_preparados_em_cache(tipo_relatorio, analista, mes, ano)
+    return tarefas.submeter(
+        servicos.informa_processos,
+        {"tipo": tipo_relatorio, "analista": analista, "mes": mes, "ano": str(ano)},
+        dono=user_info.get("userPrincipalName"),
+        tipo_relatorio=tipo_relatorio, analista=analista, mes=mes, ano=str(ano),
+        token_acesso=token_acesso, user_info=user_info,
+        dados_preparados=servicos.copiar_dados_preparados(em_cache) if em_cache is not None else None,
+    )
+
+
+def iniciar_envio_massa(tipos_relatorio: List[str], analistas: List[str], mes: str, ano: str) -> str:
+    """Agenda o envio de vários relatórios para vários analistas como uma única tarefa.
+
+    Raises:
+        ErroProcessamento: Se não houver token de acesso ou nada foi selecionado.
+    """
+    token_acesso = sessao.token_acesso()
+    user_info = sessao.info_usuario()
+    if not token_acesso:
+        logging.error("Tentativa de envio em massa sem token de acesso presente na sessão.")
+        raise ErroProcessamento("Usuário não autenticado. Faça login para enviar e-mails.")
+    if not tipos_relatorio or not analistas:
+        raise ErroProcessamento("Selecione ao menos um relatório e um analista.")
+    return tarefas.submeter(
+        envio_massa.informa_processos_em_massa,
+        {"tipo": ", ".join(tipos_relatorio), "analista": ", ".join(analistas), "mes": mes, "ano": str(ano), "em_massa": True},
+        dono=user_info.get("userPrincipalName"),
+        tipos_relatorio=list(tipos_relatorio), analistas=list(analistas), mes=mes, ano=str(ano),
+        token_acesso=token_acesso, user_info=user_info,
+    )
+
+
+def acompanhar_envio(id_tarefa: str) -> Optional[Dict[str, Any]]:
+    """Estado atual da tarefa de envio (status, progresso por empresa, resultados)."""
+    return tarefas.obter_tarefa(id_tarefa)
+
+
+def envios_do_usuario() -> List[Dict[str, Any]]:
+    """Tarefas de envio do usuário logado, para retomar o acompanhamento após reconexão."""
+    dono = sessao.info_usuario().get("userPrincipalName")
+    return tarefas.listar_tarefas(dono) if dono else []
+
+
+def envio_em_andamento() -> Optional[Dict[str, Any]]:
+    """A tarefa de envio pendente ou em execução do usuário logado, se houver."""
+    return next((t for t in envios_do_usuario() if t["status"] in (tarefas.PENDENTE, tarefas.EXECUTANDO)), None)
 
 
 def visualizar_previa(tipo_relatorio: str, analista: str, mes: str, ano: str) -> Tuple[Any, Dict[str, Any]]:
@@ -42,9 +113,10 @@ def visualizar_previa(tipo_relatorio: str, analista: str, mes: str, ano: str) ->
 
     Retorna o DataFrame filtrado e a configuração utilizada.
     """
-    user_info = st.session_state.get("user_info")
     try:
-        df, cfg = servicos.visualizar_previa_dados(tipo_relatorio, analista, mes, ano, user_info=user_info)
+        df, cfg = obter_dados_preparados(tipo_relatorio, analista, mes, ano)
+        if df.empty:
+            raise ErroProcessamento(f"Nenhum registro encontrado para o analista '{analista}'")
         return df, cfg
     except ErroProcessamento:
         raise
@@ -0,0 +1,15 @@
+import streamlit as st
+from typing import Any, Dict, MutableMapping, Optional
+
+# Adaptador do Streamlit: único ponto do controller que toca st.session_state. O model/
+# publica avisos e progresso por progresso.notificar e não conhece o Streamlit; as
+# tarefas em segundo plano e a linha de comando registram seus próprios ouvintes.
+
+def estado() -> MutableMapping[str, Any]:
+    return st.session_state
+
+def token_acesso() -> Optional[str]:
+    return (st.session_state.get("ms_token") or {}).get("access_token")
+
+def info_usuario() -> Dict[str, Any]:
+    return st.session_state.get("user_info") or {}
@@ -0,0 +1,144 @@
+"""Pré-carregamento de um mês: deixa planilhas, contatos e pastas de PDFs prontos.
+
+Uso (linha de comando ou agendador de tarefas):
+    python -m apps.relatorios_ccee.model.aquecimento --mes MARÇO --ano 2025
+    python -m apps.relatorios_ccee.model.aquecimento --mes MARÇO --ano 2025 --relatorios SUM001,LFN001 --usuario malik.mourad --hidratar-pdfs
+
+Para cada relatório de DEFAULT_CONFIGS, resolve os caminhos do mês, lê a planilha de
+dados e a de contatos e indexa as pastas de PDFs. As leituras ficam nos instantâneos
+em disco (model/instantaneos.py), então a primeira prévia do mês no app já sai quente.
+Antes, apaga os instantâneos mais velhos que --reter-dias (ou todos, com --limpar).
+"""
+import sys
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+import pandas as pd
+from apps.relatorios_ccee.configuracoes.constantes import DEFAULT_CONFIGS, ENVIO_MASSA_CONFIGS, INSTANTANEOS_CONFIGS, MESES
+from apps.relatorios_ccee.model.medicoes import MedicaoExecucao, ativar_medicao, vincular_contexto
+from apps.relatorios_ccee.model.instantaneos import limpar_instantaneos
+from apps.relatorios_ccee.model import servicos, envio_massa
+
+def _hidratar_pdfs(config: Dict[str, Any]) -> int:
+    """Lê o primeiro bloco de cada PDF indexado, o que força o download de placeholders do OneDrive."""
+    lidos = 0
+    for indice in (config.get("_pdf_cache_main") or {}, config.get("_pdf_cache_sumario") or {}):
+        for caminho_pdf in indice.values():
+            try:
+                with open(caminho_pdf, "rb") as f:
+                    f.read(1)
+                lidos += 1
+            except OSError as e:
+                logging.warning(f"Não foi possível hidratar {caminho_pdf}: {e}")
+    return lidos
+
+def aquecer_relatorio(tipo_relatorio: str, mes: str, ano: str, user_info: Optional[Dict[str, Any]] = None, hidratar_pdfs: bool = False) -> Dict[str, Any]:
+    """Resolve os caminhos do relatório no mês e faz a parte da preparação que não depende do analista."""
+    inicio = time.perf_counter()
+    try:
+        config = servicos.resolver_config_relatorio(tipo_relatorio, mes, ano, user_info)
+    except Exception as e:
+        logging.error(f"Pré-carregamento de {tipo_relatorio} ({mes}/{ano}) falhou: {e}")
+        return _resultado(tipo_relatorio, mes, ano, inicio, erro=str(e))
+    return _aquecer_config(tipo_relatorio, config, mes, ano, hidratar_pdfs)
+
+def _resultado(tipo_relatorio: str, mes: str, ano: str, inicio: float, **campos: Any) -> Dict[str, Any]:
+    return {"tipo": tipo_relatorio, "mes": mes, "ano": str(ano), **campos, "tempo_s": round(time.perf_counter() - inicio, 3)}
+
+def _aquecer_config(tipo_relatorio: str, config: Dict[str, Any], mes: str, ano: str, hidratar_pdfs: bool, df_bruto: Optional[pd.DataFrame] = None, inicio: Optional[float] = None) -> Dict[str, Any]:
+    """Carrega dados, contatos e PDFs de uma config já resolvida (`df_bruto`: tabela já lida pelo grupo)."""
+    inicio = time.perf_counter() if inicio is None else inicio
+    campos: Dict[str, Any] = {"excel_dados": config.get("excel_dados")}
+    try:
+        df_dados, contatos = servicos.carregar_base_relatorio(tipo_relatorio, config, df_bruto=df_bruto)
+        campos.update({
+            "linhas": len(df_dados),
+            "contatos": len(contatos["df"]),
+            "pdfs": len(config.get("_pdf_cache_main") or {}) + len(config.get("_pdf_cache_sumario") or {}),
+        })
+        if hidratar_pdfs:
+            campos["pdfs_hidratados"] = _hidratar_pdfs(config)
+        campos["erro"] = None
+    except Exception as e:
+        logging.error(f"Pré-carregamento de {tipo_relatorio} ({mes}/{ano}) falhou: {e}")
+        campos["erro"] = str(e)
+    return _resultado(tipo_relatorio, mes, ano, inicio, **campos)
+
+def _aquecer_grupo(chave: envio_massa.ChaveGrupo, relatorios: List[Tuple[str, Dict[str, Any]]], mes: str, ano: str, hidratar_pdfs: bool) -> List[Dict[str, Any]]:
+    """Lê a tabela do grupo uma vez e pré-carrega, em sequência, cada relatório que a usa."""
+    inicio = time.perf_counter()
+    try:
+        df_bruto = envio_massa._ler_tabela_grupo(chave, relatorios)
+    except Exception as e:
+        logging.error(f"Pré-carregamento: falha ao ler {chave[0]}: {e}")
+        return [_resultado(tipo, mes, ano, inicio, excel_dados=chave[0], erro=f"Erro ao ler a planilha de dados: {e}") for tipo, _ in relatorios]
+    return [_aquecer_config(tipo, config, mes, ano, hidratar_pdfs, df_bruto=df_bruto, inicio=inicio) for tipo, config in relatorios]
+
+def aquecer_mes(mes: str, ano: str, tipos_relatorio: Optional[List[str]] = None, user_info: Optional[Dict[str, Any]] = None, hidratar_pdfs: bool = False, medicao: Optional[MedicaoExecucao] = None, ao_resultado: Optional[servicos.AoResultado] = None) -> List[Dict[str, Any]]:
+    """Pré-carrega todos os relatórios do mês (padrão: todos de DEFAULT_CONFIGS), em paralelo.
+
+    Relatórios que leem a mesma tabela (ver envio_massa.agrupar_por_planilha) formam um
+    grupo: a planilha é lida uma vez e o instantâneo é gravado por uma única thread.
+    Aceita `medicao` e `ao_resultado` para poder ser agendada com tarefas.submeter.
+    Um relatório com arquivos ausentes não interrompe os demais: o erro vai no resultado.
+    """
+    tipos = list(tipos_relatorio or DEFAULT_CONFIGS.keys())
+    medicao = medicao or MedicaoExecucao(aquecimento=True, mes=mes, ano=str(ano))
+    resultados: List[Dict[str, Any]] = []
+    with ativar_medicao(medicao):
+        grupos, erros = envio_massa.agrupar_por_planilha(tipos, mes, ano, user_info)
+        for tipo_relatorio, erro in erros.items():
+            resultados.append(_resultado(tipo_relatorio, mes, ano, time.perf_counter(), erro=erro))
+            if ao_resultado:
+                ao_resultado(resultados[-1])
+        workers = max(1, min(int(ENVIO_MASSA_CONFIGS.get("max_grupos_simultaneos", 3)), len(grupos)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aquecimento") as executor:
+            futuros = [executor.submit(vincular_contexto(_aquecer_grupo), chave, relatorios, mes, ano, hidratar_pdfs) for chave, relatorios in grupos.items()]
+            for futuro in futuros:
+                for resultado in futuro.result():
+                    resultados.append(resultado)
+                    if ao_resultado:
+                        ao_resultado(resultado)
+    ordem = {tipo: i for i, tipo in enumerate(tipos)}
+    resultados.sort(key=lambda r: ordem.get(r["tipo"], len(ordem)))
+    logging.info(f"Pré-carregamento de {mes}/{ano}: {sum(1 for r in resultados if not r['erro'])}/{len(resultados)} relatórios prontos.")
+    return resultados
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pré-carrega planilhas, contatos e pastas de PDFs de um mês.")
+    parser.add_argument("--mes", required=True, help="Nome do mês (ex.: MARÇO).")
+    parser.add_argument("--ano", required=True)
+    parser.add_argument("--relatorios", help="Relatórios separados por vírgula (padrão: todos de DEFAULT_CONFIGS).")
+    parser.add_argument("--usuario", help="Usuário de rede usado para resolver os caminhos do SharePoint/OneDrive.")
+    parser.add_argument("--hidratar-pdfs", action="store_true", help="Também baixa os PDFs que ainda forem placeholders do OneDrive.")
+    parser.add_argument("--reter-dias", type=float, default=INSTANTANEOS_CONFIGS.get("reter_dias"), help="Apaga antes os instantâneos gravados há mais dias que isso (padrão: INSTANTANEOS_CONFIGS['reter_dias']).")
+    parser.add_argument("--limpar", action="store_true", help="Apaga todos os instantâneos antes de pré-carregar.")
+    parser.add_argument("--saida", help="Grava o resultado neste arquivo JSON.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+
+    mes = args.mes.upper()
+    if mes not in MESES:
+        parser.error(f"Mês inválido: {args.mes}")
+    tipos = [t.strip() for t in args.relatorios.split(",") if t.strip()] if args.relatorios else None
+    desconhecidos = [t for t in tipos or [] if t not in DEFAULT_CONFIGS]
+    if desconhecidos:
+        parser.error(f"Relatórios fora de DEFAULT_CONFIGS: {', '.join(desconhecidos)}")
+    user_info = {"userPrincipalName": f"{args.usuario}@"} if args.usuario else None
+    if args.limpar or args.reter_dias is not None:
+        removidos = limpar_instantaneos(mais_antigos_que_dias=None if args.limpar else args.reter_dias)
+        logging.info(f"{removidos} instantâneo(s) removido(s).")
+    resultados = aquecer_mes(mes, args.ano, tipos, user_info=user_info, hidratar_pdfs=args.hidratar_pdfs)
+    for r in resultados:
+        situacao = f"erro: {r['erro']}" if r["erro"] else f"{r['linhas']} linhas, {r['contatos']} contatos, {r['pdfs']} PDFs"
+        print(f"{r['tipo']}\t{r['tempo_s']}s\t{situacao}")
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, ensure_ascii=False, indent=2, default=str)
+    return 0 if all(not r["erro"] for r in resultados) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
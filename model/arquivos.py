@@ -2,8 +2,12 @@ import pandas as pd
 import json
 import logging
 import os
+import re
+import time
+import threading
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
+from apps.relatorios_ccee.model.instantaneos import assinatura_arquivo, ler_instantaneo, gravar_instantaneo
 from pathlib import Path
 
 ROOT_DIR = Path(__file__).parent.parent.parent.parent
@@ -23,6 +27,166 @@ def ler_dados_excel(caminho_excel: str, nome_planilha: str, linha_cabecalho: int
         return pd.read_excel(Path(caminho_excel), sheet_name=nome_planilha, header=None)
     return pd.read_excel(Path(caminho_excel), sheet_name=nome_planilha, header=linha_cabecalho)
 
+MOTORES_EXCEL = ("calamine", "openpyxl")
+
+def escolher_motor_excel(preferido: Optional[str] = None) -> str:
+
+    """Escolhe o engine do pd.read_excel: o preferido se disponível, senão calamine, senão openpyxl.
+
+    O calamine (pacote opcional python-calamine, pandas >= 2.2) é bem mais rápido; o
+    openpyxl é aberto pelo pandas em modo read-only.
+    """
+
+    candidatos = [preferido] if preferido else []
+    candidatos += [m for m in MOTORES_EXCEL if m not in candidatos]
+    for motor in candidatos:
+        if motor == "calamine":
+            try:
+                import python_calamine  # noqa: F401
+            except ImportError:
+                continue
+        return motor
+    return "openpyxl"
+
+def ler_tabela_excel(caminho_excel: str, nome_planilha: str, linha_cabecalho: int, colunas: Optional[Iterable[str]] = None, motor: Optional[str] = None) -> pd.DataFrame:
+
+    """Lê a tabela de uma planilha carregando apenas as colunas pedidas.
+
+    Args:
+        colunas: nomes de cabeçalho a manter (comparados sem espaços nas pontas).
+            None carrega todas.
+        motor: engine preferido ("openpyxl" ou "calamine").
+    """
+
+    if not Path(caminho_excel).exists():
+        raise FileNotFoundError(f"Arquivo não encontrado: {caminho_excel}")
+    kwargs: Dict[str, Any] = {}
+    if colunas:
+        alvo = {str(c).strip() for c in colunas}
+        kwargs["usecols"] = lambda nome: str(nome).strip() in alvo
+    motor_escolhido = escolher_motor_excel(motor)
+    try:
+        return pd.read_excel(Path(caminho_excel), sheet_name=nome_planilha, header=linha_cabecalho, engine=motor_escolhido, **kwargs)
+    except ImportError as e:
+        if motor_escolhido == "openpyxl":
+            raise
+        logging.warning(f"Engine '{motor_escolhido}' falhou para {caminho_excel} ({e}); usando openpyxl.")
+        return pd.read_excel(Path(caminho_excel), sheet_name=nome_planilha, header=linha_cabecalho, engine="openpyxl", **kwargs)
+
+def ler_tabela_excel_em_cache(caminho_excel: str, nome_planilha: str, linha_cabecalho: int, colunas: Optional[Iterable[str]] = None, motor: Optional[str] = None) -> pd.DataFrame:
+
+    """Como ler_tabela_excel, mas reaproveita o instantâneo em disco enquanto o arquivo não mudar.
+
+    Sempre devolve uma cópia própria do DataFrame (os chamadores renomeiam colunas in place).
+    """
+
+    caminho = Path(caminho_excel)
+    if not caminho.exists():
+        raise FileNotFoundError(f"Arquivo não encontrado: {caminho_excel}")
+    colunas_chave = tuple(sorted({str(c).strip() for c in colunas})) if colunas else None
+    chave = (str(caminho.resolve(strict=False)), nome_planilha, int(linha_cabecalho), colunas_chave)
+    assinatura = assinatura_arquivo(caminho)
+    df = ler_instantaneo("tabelas", chave, assinatura)
+    if df is not None:
+        logging.info(f"Tabela de {caminho.name} ({nome_planilha}) lida do instantâneo em disco.")
+        return df
+    if linha_cabecalho == -1 or (colunas is None and motor is None):
+        df = ler_dados_excel(caminho_excel, nome_planilha, linha_cabecalho)
+    else:
+        df = ler_tabela_excel(caminho_excel, nome_planilha, linha_cabecalho, colunas=colunas, motor=motor)
+    gravar_instantaneo("tabelas", chave, assinatura, df)
+    return df
+
+def extrair_celulas_excel(caminho_excel: str, nome_planilha: str, celulas: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], Any]:
+
+    """Lê células fixas (linha, coluna — base 0, como iloc com header=None) em uma passada.
+
+    Abre a pasta de trabalho em modo read-only e percorre as linhas apenas até a maior
+    linha pedida, sem montar um DataFrame da planilha inteira. Células fora da área
+    usada da planilha não aparecem no resultado; células vazias retornam None.
+    """
+
+    from openpyxl import load_workbook
+
+    pedidas = {(int(r), int(c)) for r, c in celulas}
+    if not pedidas:
+        return {}
+    if not Path(caminho_excel).exists():
+        raise FileNotFoundError(f"Arquivo não encontrado: {caminho_excel}")
+    linha_max = max(r for r, _ in pedidas)
+    por_linha: Dict[int, list] = {}
+    for r, c in pedidas:
+        por_linha.setdefault(r, []).append(c)
+    encontradas: Dict[Tuple[int, int], Any] = {}
+    livro = load_workbook(Path(caminho_excel), read_only=True, data_only=True, keep_links=False)
+    try:
+        planilha = livro[nome_planilha]
+        # Sem a dimensão gravada (às vezes errada), cada linha vem só até a sua última
+        # célula, em vez de completada com None: a largura usada é a da maior linha lida.
+        planilha.reset_dimensions()
+        linhas = list(planilha.iter_rows(min_row=1, max_row=linha_max + 1, values_only=True))
+        largura = max((len(valores) for valores in linhas), default=0)
+        for r, valores in enumerate(linhas):
+            for c in por_linha.get(r, []):
+                if c < len(valores):
+                    encontradas[(r, c)] = valores[c]
+                elif c < largura:
+                    encontradas[(r, c)] = None
+    finally:
+        livro.close()
+    return encontradas
+
+_indices_pdf: Dict[str, Tuple[int, Dict[str, Path]]] = {}
+_trava_indices = threading.Lock()
+
+def normalizar_nome_anexo(nome_arquivo: str) -> str:
+
+    """Chave de busca de anexos: maiúsculas e separadores (espaço, _ e -) colapsados em '_'."""
+
+    return re.sub(r"[\s_-]+", "_", str(nome_arquivo).strip()).upper()
+
+def indexar_diretorio_pdfs(diretorio: str) -> Dict[str, Path]:
+
+    """Índice { NOME_NORMALIZADO.PDF: caminho } de um diretório, reaproveitado entre execuções.
+
+    O índice fica em memória por diretório junto com o mtime da pasta; enquanto o mtime
+    não muda, nenhuma listagem é feita. Quando muda (PDF novo/removido), a pasta é
+    relida e os caminhos já conhecidos são reaproveitados.
+    """
+
+    pasta = Path(diretorio)
+    try:
+        mtime = pasta.stat().st_mtime_ns
+    except OSError:
+        logging.warning(f"Tentativa de indexar diretório inexistente: {diretorio}")
+        return {}
+    chave = str(pasta.resolve(strict=False))
+    with _trava_indices:
+        em_cache = _indices_pdf.get(chave)
+    if em_cache and em_cache[0] == mtime:
+        return em_cache[1]
+    if not em_cache:
+        # Processo novo: aproveita a listagem gravada por outro processo (ex.: pré-carregamento).
+        guardado = ler_instantaneo("indices_pdf", chave, mtime)
+        if guardado is not None:
+            with _trava_indices:
+                _indices_pdf[chave] = (mtime, guardado)
+            logging.info(f"Diretório {diretorio} indexado a partir do instantâneo ({len(guardado)} arquivos).")
+            return guardado
+    anterior = em_cache[1] if em_cache else {}
+    indice: Dict[str, Path] = {}
+    with os.scandir(pasta) as entradas:
+        for entrada in entradas:
+            if entrada.name.lower().endswith(".pdf") and entrada.is_file():
+                nome = normalizar_nome_anexo(entrada.name)
+                indice[nome] = anterior.get(nome) or Path(entrada.path)
+    with _trava_indices:
+        _indices_pdf[chave] = (mtime, indice)
+    gravar_instantaneo("indices_pdf", chave, mtime, indice)
+    novos = len(set(indice) - set(anterior))
+    logging.info(f"Diretório indexado: {diretorio} ({len(indice)} arquivos, {novos} novos desde a última listagem)")
+    return indice
+
 def encontrar_anexo(diretorio_pdf: str, nome_arquivo: str) -> Optional[Path]:
 
     """Procura por um arquivo PDF no diretório especificado."""
@@ -33,6 +197,69 @@ def encontrar_anexo(diretorio_pdf: str, nome_arquivo: str) -> Optional[Path]:
     logging.warning(f"Anexo não encontrado no caminho principal: {caminho_anexo}")
     return None
 
+def ler_anexo(caminho_anexo: Path, tentativas: int = 4, espera_inicial: float = 0.5) -> bytes:
+
+    """Lê um anexo inteiro em uma única passagem, dentro do próprio processo.
+
+    Arquivos do OneDrive ainda não baixados (placeholders) ou bloqueados pelo cliente
+    de sincronização costumam falhar com PermissionError/OSError ou retornar vazio na
+    primeira leitura; nesses casos a leitura é repetida com espera crescente. Arquivo
+    inexistente ou que é um diretório falha na hora, sem esperar.
+    """
+
+    inicio = time.perf_counter()
+    ultimo_erro: Optional[Exception] = None
+    for tentativa in range(1, tentativas + 1):
+        try:
+            with open(caminho_anexo, "rb") as f:
+                conteudo = f.read()
+            if conteudo:
+                logging.info(f"Anexo {caminho_anexo.name} lido: {len(conteudo)} bytes em {(time.perf_counter() - inicio) * 1000:.0f} ms (tentativa {tentativa}).")
+                return conteudo
+            ultimo_erro = ErroProcessamento(f"Anexo {caminho_anexo.name} vazio (arquivo ainda não sincronizado?).")
+        except (FileNotFoundError, IsADirectoryError) as e:
+            raise ErroProcessamento(f"Não foi possível ler o anexo {caminho_anexo.name}: {e}")
+        except OSError as e:
+            ultimo_erro = e
+        if tentativa < tentativas:
+            logging.warning(f"Leitura de {caminho_anexo.name} falhou ({ultimo_erro}); tentando novamente.")
+            time.sleep(espera_inicial * (2 ** (tentativa - 1)))
+    raise ErroProcessamento(f"Não foi possível ler o anexo {caminho_anexo.name} após {tentativas} tentativas: {ultimo_erro}")
+
+def ler_anexo_em_blocos(caminho_anexo: Path, tamanho_bloco: int, tentativas: int = 4, espera_inicial: float = 0.5) -> Iterator[bytes]:
+
+    """Lê um anexo em blocos, com a mesma tolerância do ler_anexo a arquivos do OneDrive.
+
+    Se abrir o arquivo ou ler um bloco falhar (placeholder, arquivo bloqueado pela
+    sincronização) ou o arquivo vier vazio, a leitura é retomada do mesmo ponto com
+    espera crescente; `tentativas` conta falhas seguidas. Arquivo inexistente ou que é
+    um diretório falha na hora.
+    """
+
+    posicao = 0
+    falhas = 0
+    while True:
+        try:
+            with open(caminho_anexo, "rb") as f:
+                f.seek(posicao)
+                while True:
+                    bloco = f.read(tamanho_bloco)
+                    if not bloco:
+                        if posicao == 0:
+                            raise ErroProcessamento(f"Anexo {caminho_anexo.name} vazio (arquivo ainda não sincronizado?).")
+                        return
+                    posicao += len(bloco)
+                    falhas = 0
+                    yield bloco
+        except (FileNotFoundError, IsADirectoryError) as e:
+            raise ErroProcessamento(f"Não foi possível ler o anexo {caminho_anexo.name}: {e}")
+        except (OSError, ErroProcessamento) as e:
+            falhas += 1
+            if falhas >= tentativas:
+                raise ErroProcessamento(f"Não foi possível ler o anexo {caminho_anexo.name} após {tentativas} tentativas: {e}")
+            logging.warning(f"Leitura de {caminho_anexo.name} falhou no byte {posicao} ({e}); tentando novamente.")
+            time.sleep(espera_inicial * (2 ** (falhas - 1)))
+
 def carregar_templates_email() -> Dict[str, Any]:
 
     try:
@@ -0,0 +1,82 @@
+import os
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Any, Optional
+import msal
+from apps.relatorios_ccee.model.arquivos import ErroProcessamento
+
+# Autenticação sem navegador para execuções fora do Streamlit (ver cli.py).
+# As credenciais vêm das mesmas variáveis de ambiente do login web (.env).
+ESCOPOS_DELEGADOS = ["User.Read", "Mail.ReadWrite"]
+ESCOPOS_APLICATIVO = ["https://graph.microsoft.com/.default"]
+ARQUIVO_CACHE_TOKEN = Path(__file__).resolve().parent.parent / "cache" / "msal_token_cli.json"
+
+def _variavel(nome: str) -> str:
+    valor = os.environ.get(nome)
+    if not valor:
+        raise ErroProcessamento(f"Variável de ambiente {nome} não definida.")
+    return valor
+
+def _autoridade() -> str:
+    return f"https://login.microsoftonline.com/{_variavel('AZURE_TENANT_ID')}"
+
+def _carregar_cache(arquivo: Path) -> msal.SerializableTokenCache:
+    cache = msal.SerializableTokenCache()
+    if arquivo.exists():
+        cache.deserialize(arquivo.read_text(encoding="utf-8"))
+    return cache
+
+def _salvar_cache(cache: msal.SerializableTokenCache, arquivo: Path) -> None:
+    if not cache.has_state_changed:
+        return
+    arquivo.parent.mkdir(parents=True, exist_ok=True)
+    # O cache guarda o refresh token: só o dono do arquivo pode lê-lo.
+    descritor = os.open(arquivo, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(descritor, "w", encoding="utf-8") as f:
+        f.write(cache.serialize())
+
+def _verificar(resultado: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not resultado or "access_token" not in resultado:
+        erro = (resultado or {}).get("error_description") or (resultado or {}).get("error") or "sem resposta"
+        logging.error(f"Falha ao obter token: {erro}")
+        raise ErroProcessamento(f"Falha ao obter token: {erro}")
+    return resultado
+
+def obter_token_dispositivo(mostrar: Callable[[str], None] = print, arquivo_cache: Path = ARQUIVO_CACHE_TOKEN) -> Dict[str, Any]:
+    """Token delegado pelo fluxo de código de dispositivo (o usuário entra em outra máquina).
+
+    O token fica em cache em disco; enquanto o refresh token valer, execuções
+    agendadas renovam o acesso sem interação.
+
+    Raises:
+        ErroProcessamento: Se faltar configuração ou a autenticação falhar.
+    """
+    cache = _carregar_cache(arquivo_cache)
+    app = msal.PublicClientApplication(_variavel("AZURE_CLIENT_ID"), authority=_autoridade(), token_cache=cache)
+    resultado = None
+    contas = app.get_accounts()
+    if contas:
+        resultado = app.acquire_token_silent(ESCOPOS_DELEGADOS, account=contas[0])
+    if not resultado:
+        fluxo = app.initiate_device_flow(scopes=ESCOPOS_DELEGADOS)
+        if "user_code" not in fluxo:
+            raise ErroProcessamento(f"Não foi possível iniciar o login por código de dispositivo: {fluxo.get('error_description') or fluxo}")
+        mostrar(fluxo["message"])
+        resultado = app.acquire_token_by_device_flow(fluxo)
+    resultado = _verificar(resultado)
+    _salvar_cache(cache, arquivo_cache)
+    return resultado
+
+def obter_token_aplicativo() -> Dict[str, Any]:
+    """Token de aplicativo (client credentials), para execuções sem nenhum usuário.
+
+    Exige a permissão de aplicativo Mail.ReadWrite e uma caixa explícita
+    (GRAPH_CONFIGS["caixa_postal"]), pois não há /me.
+
+    Raises:
+        ErroProcessamento: Se faltar configuração ou a autenticação falhar.
+    """
+    app = msal.ConfidentialClientApplication(
+        _variavel("AZURE_CLIENT_ID"), authority=_autoridade(), client_credential=_variavel("AZURE_CLIENT_SECRET")
+    )
+    return _verificar(app.acquire_token_for_client(scopes=ESCOPOS_APLICATIVO))
@@ -0,0 +1,243 @@
+import json
+import time
+import base64
+import random
+import logging
+import threading
+import requests
+from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from apps.relatorios_ccee.configuracoes.constantes import GRAPH_CONFIGS
+
+GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+STATUS_THROTTLE = {429, 503, 504}
+
+_sessao: Optional[requests.Session] = None
+_trava = threading.Lock()
+
+def _obter_sessao() -> requests.Session:
+    """Cria (uma vez por processo) a sessão HTTP com pool de conexões keep-alive."""
+    global _sessao
+    if _sessao is None:
+        with _trava:
+            if _sessao is None:
+                tamanho_pool = int(GRAPH_CONFIGS.get("pool_tamanho", 10))
+                sessao = requests.Session()
+                adaptador = HTTPAdapter(pool_connections=tamanho_pool, pool_maxsize=tamanho_pool)
+                sessao.mount("https://", adaptador)
+                sessao.mount("http://", adaptador)
+                _sessao = sessao
+                logging.info(f"Sessão HTTP do Graph criada (pool={tamanho_pool}).")
+    return _sessao
+
+def segundos_retry_after(cabecalhos: Optional[Dict[str, Any]]) -> float:
+    """Extrai o Retry-After (em segundos) de cabeçalhos HTTP ou de uma sub-resposta $batch."""
+    if not cabecalhos:
+        return 0.0
+    valor = {str(k).lower(): v for k, v in cabecalhos.items()}.get("retry-after")
+    try:
+        return max(0.0, float(valor)) if valor is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+def espera_com_jitter(tentativa: int) -> float:
+    """Backoff exponencial com jitter: metade fixa, metade aleatória, limitado por backoff_max_s."""
+    base = float(GRAPH_CONFIGS.get("backoff_base_s", 1.0))
+    teto = float(GRAPH_CONFIGS.get("backoff_max_s", 60.0))
+    limite = min(teto, base * (2 ** max(0, tentativa - 1)))
+    return limite / 2 + random.uniform(0, limite / 2)
+
+def _falhou_antes_do_envio(erro: requests.exceptions.ConnectionError) -> bool:
+    """True se a conexão nem chegou a ser aberta (o corpo da requisição não saiu daqui)."""
+    if isinstance(erro, requests.exceptions.ConnectTimeout):
+        return True
+    motivo = getattr(erro.args[0], "reason", None) if erro.args else None
+    return isinstance(motivo, (NewConnectionError, ConnectTimeoutError))
+
+def _identificar_caixa(token_acesso: str) -> str:
+    """Identifica a caixa de correio pelo 'oid'/'upn' do JWT (sem validar assinatura)."""
+    try:
+        carga = token_acesso.split(".")[1]
+        dados = json.loads(base64.urlsafe_b64decode(carga + "=" * (-len(carga) % 4)))
+        return str(dados.get("oid") or dados.get("upn") or dados.get("preferred_username"))
+    except Exception:
+        return f"token-{hash(token_acesso)}"
+
+class LimitadorCaixa:
+    """Balde de tokens por caixa de correio, com pausa global após um 429.
+
+    `simultaneas` limita as requisições em curso na caixa (o Graph aceita 4 por caixa),
+    valendo para todas as threads do processo: envios em massa e tarefas concorrentes
+    somam no mesmo limite. Também acumula os contadores de retentativas e de tempo de
+    espera por throttling.
+    """
+
+    def __init__(self, taxa_por_segundo: float, capacidade: float, max_simultaneas: int = 4):
+        self.taxa = max(0.1, taxa_por_segundo)
+        self.capacidade = max(1.0, capacidade)
+        self.tokens = self.capacidade
+        self.ultimo = time.monotonic()
+        self.pausado_ate = 0.0
+        self.trava = threading.Lock()
+        self.simultaneas = threading.BoundedSemaphore(max(1, max_simultaneas))
+        self.metricas = {
+            "requisicoes": 0,
+            "retentativas": 0,
+            "respostas_throttle": 0,
+            "espera_throttle_s": 0.0,
+            "espera_balde_s": 0.0,
+        }
+
+    def consumir(self) -> None:
+        """Bloqueia até haver um token disponível (e a pausa por throttling ter passado)."""
+        esperado = 0.0
+        while True:
+            with self.trava:
+                agora = time.monotonic()
+                self.tokens = min(self.capacidade, self.tokens + (agora - self.ultimo) * self.taxa)
+                self.ultimo = agora
+                espera = max(0.0, self.pausado_ate - agora)
+                if espera == 0.0 and self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    self.metricas["requisicoes"] += 1
+                    self.metricas["espera_balde_s"] += esperado
+                    return
+                if espera == 0.0:
+                    espera = (1.0 - self.tokens) / self.taxa
+            time.sleep(espera)
+            esperado += espera
+
+    def registrar_throttle(self, espera: float, pausar_caixa: bool) -> None:
+        """Contabiliza uma retentativa; com pausar_caixa, segura todas as threads da caixa."""
+        with self.trava:
+            self.metricas["retentativas"] += 1
+            self.metricas["espera_throttle_s"] += espera
+            if pausar_caixa:
+                self.metricas["respostas_throttle"] += 1
+                self.pausado_ate = max(self.pausado_ate, time.monotonic() + espera)
+                self.tokens = 0.0
+
+_limitadores: Dict[str, LimitadorCaixa] = {}
+_trava_limitadores = threading.Lock()
+
+def _obter_limitador(caixa: str) -> LimitadorCaixa:
+    with _trava_limitadores:
+        limitador = _limitadores.get(caixa)
+        if limitador is None:
+            limitador = LimitadorCaixa(
+                float(GRAPH_CONFIGS.get("taxa_requisicoes_por_segundo", 10)),
+                float(GRAPH_CONFIGS.get("rajada_requisicoes", 20)),
+                int(GRAPH_CONFIGS.get("limite_concorrencia_caixa", 4))
+            )
+            _limitadores[caixa] = limitador
+        return limitador
+
+def obter_metricas_graph(token_acesso: Optional[str] = None) -> Dict[str, Any]:
+    """Retorna uma cópia dos contadores (de uma caixa, ou somados de todas)."""
+    with _trava_limitadores:
+        if token_acesso:
+            limitador = _limitadores.get(_identificar_caixa(token_acesso))
+            alvos = [limitador] if limitador else []
+        else:
+            alvos = list(_limitadores.values())
+    total: Dict[str, Any] = {}
+    for limitador in alvos:
+        with limitador.trava:
+            for chave, valor in limitador.metricas.items():
+                total[chave] = total.get(chave, 0) + valor
+    return total
+
+def metricas_desde(antes: Dict[str, Any], token_acesso: Optional[str] = None) -> Dict[str, Any]:
+    """Contadores acumulados desde o instantâneo `antes` (um obter_metricas_graph anterior)."""
+    depois = obter_metricas_graph(token_acesso)
+    return {chave: round(valor - antes.get(chave, 0), 3) for chave, valor in depois.items()}
+
+class ClienteGraph:
+    """Cliente do Microsoft Graph vinculado a um token, sobre a sessão HTTP compartilhada.
+
+    Os cabeçalhos de autenticação são montados uma única vez por token. A sessão é
+    compartilhada entre todos os clientes do processo, então o handshake TLS com
+    graph.microsoft.com acontece apenas quando o pool abre uma nova conexão.
+    """
+
+    def __init__(self, token_acesso: str):
+        self.token_acesso = token_acesso
+        self.limitador = _obter_limitador(_identificar_caixa(token_acesso))
+        self.cabecalhos = {
+            'Authorization': 'Bearer ' + token_acesso,
+            'Content-Type': 'application/json'
+        }
+        self.timeout = (
+            float(GRAPH_CONFIGS.get("timeout_conexao", 10)),
+            float(GRAPH_CONFIGS.get("timeout_leitura", 60))
+        )
+
+    def _url(self, caminho: str) -> str:
+        return caminho if caminho.startswith("http") else f"{GRAPH_BASE_URL}{caminho}"
+
+    def aguardar_throttle(self, espera: float, pausar_caixa: bool = True) -> None:
+        """Espera antes de uma retentativa, contabilizando-a nas métricas da caixa."""
+        self.limitador.registrar_throttle(espera, pausar_caixa)
+        time.sleep(espera)
+
+    def _requisitar(self, metodo: str, url: str, idempotente: bool = True, **kwargs: Any) -> requests.Response:
+        """Executa a requisição respeitando o balde da caixa e retentando o throttling do Graph.
+
+        Requisições idempotentes (GET/PUT) retentam 429/503/504 e falhas de conexão. Um POST
+        não idempotente (criar rascunho, $batch) só é repetido quando certamente não foi
+        executado: 429, outra resposta de throttling com Retry-After, ou conexão que nem
+        chegou a abrir; um 504 ou uma conexão caída depois do envio poderiam duplicar o
+        rascunho. Usa o Retry-After quando o Graph o envia; caso contrário, backoff
+        exponencial com jitter. Depois de `max_tentativas`, a última resposta é devolvida
+        (ou a exceção propagada) para o chamador tratar.
+        """
+        tentativas = max(1, int(GRAPH_CONFIGS.get("max_tentativas", 5)))
+        for tentativa in range(1, tentativas + 1):
+            self.limitador.consumir()
+            try:
+                with self.limitador.simultaneas:
+                    resposta = _obter_sessao().request(metodo, url, timeout=self.timeout, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                if tentativa == tentativas or not (idempotente or _falhou_antes_do_envio(e)):
+                    raise
+                espera = espera_com_jitter(tentativa)
+                logging.warning(f"Falha de conexão com o Graph ({e}); nova tentativa em {espera:.1f}s.")
+                self.aguardar_throttle(espera, pausar_caixa=False)
+                continue
+            retry_after = segundos_retry_after(resposta.headers)
+            repetivel = resposta.status_code in STATUS_THROTTLE and (idempotente or resposta.status_code == 429 or retry_after > 0)
+            if not repetivel or tentativa == tentativas:
+                return resposta
+            espera = retry_after or espera_com_jitter(tentativa)
+            logging.warning(f"Graph respondeu {resposta.status_code} em {metodo} {url}; aguardando {espera:.1f}s (tentativa {tentativa}/{tentativas}).")
+            self.aguardar_throttle(espera, pausar_caixa=resposta.status_code == 429)
+        return resposta
+
+    def get(self, caminho: str, **kwargs: Any) -> requests.Response:
+        return self._requisitar("GET", self._url(caminho), headers=self.cabecalhos, **kwargs)
+
+    def post(self, caminho: str, json: Optional[Dict[str, Any]] = None, idempotente: bool = False, **kwargs: Any) -> requests.Response:
+        """POST; passe idempotente=True só quando repetir não cria nada em duplicidade."""
+        return self._requisitar("POST", self._url(caminho), idempotente=idempotente, headers=self.cabecalhos, json=json, **kwargs)
+
+    def delete(self, caminho: str, **kwargs: Any) -> requests.Response:
+        return self._requisitar("DELETE", self._url(caminho), headers=self.cabecalhos, **kwargs)
+
+    def put_sem_autenticacao(self, url: str, data: bytes, headers: Dict[str, str]) -> requests.Response:
+        """PUT para URLs pré-autenticadas (ex.: uploadUrl), que rejeitam o header Authorization."""
+        return self._requisitar("PUT", url, data=data, headers=headers)
+
+_clientes: Dict[str, ClienteGraph] = {}
+
+def obter_cliente_graph(token_acesso: str) -> ClienteGraph:
+    """Retorna o cliente do token informado, reaproveitando-o entre chamadas."""
+    cliente = _clientes.get(token_acesso)
+    if cliente is None:
+        with _trava:
+            # Tokens expiram em ~1h; mantém só os mais recentes para não acumular.
+            if len(_clientes) >= int(GRAPH_CONFIGS.get("max_clientes_cache", 32)):
+                _clientes.clear()
+            cliente = _clientes.setdefault(token_acesso, ClienteGraph(token_acesso))
+    return cliente
@@ -0,0 +1,99 @@
+import logging
+import threading
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+from apps.relatorios_ccee.model.arquivos import ler_tabela_excel_em_cache
+
+COLUNAS_CONTATOS = {
+    "AGENTE": "Empresa",
+    "ANALISTA": "Analista",
+    "E-MAILS RELATÓRIOS CCEE": "Email"
+}
+
+# Cache do processo: compartilhado por todas as sessões do Streamlit.
+_contatos: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_travas: Dict[Tuple[str, str], threading.Lock] = {}
+_trava_global = threading.Lock()
+
+def _trava_da_chave(chave: Tuple[str, str]) -> threading.Lock:
+    with _trava_global:
+        return _travas.setdefault(chave, threading.Lock())
+
+COLUNA_CHAVE = "_chave_empresa"
+
+def normalizar_chave_empresa(serie: pd.Series) -> pd.Series:
+    """Chave de junção por Empresa: sem espaços nas pontas e sem diferença de caixa."""
+    return serie.astype("string").str.strip().str.casefold()
+
+def _indexar_contatos(df_contatos: pd.DataFrame) -> Dict[str, Any]:
+    """Pré-indexa os contatos por Analista, com a chave de Empresa já normalizada.
+
+    Cada partição por analista já traz a chave normalizada e o Email limpo (vazio vira
+    NaN), para que a junção com os dados só precise tocar nos agentes daquele analista.
+    """
+    por_analista = {}
+    if "Empresa" in df_contatos.columns:
+        df_contatos[COLUNA_CHAVE] = normalizar_chave_empresa(df_contatos["Empresa"])
+    if "Email" in df_contatos.columns:
+        email = df_contatos["Email"].astype("string").str.strip()
+        df_contatos["Email"] = email.mask(email == "").astype(object)
+    if "Analista" in df_contatos.columns:
+        analistas = df_contatos["Analista"].astype("string").str.strip()
+        por_analista = {analista: grupo for analista, grupo in df_contatos.groupby(analistas, sort=False)}
+    return {"df": df_contatos, "por_analista": por_analista}
+
+def obter_contatos(caminho_excel: str, nome_planilha: str) -> Dict[str, Any]:
+    """Retorna a planilha de contatos já lida e indexada, compartilhada entre sessões.
+
+    A planilha só é relida quando o mtime do arquivo muda. Sessões concorrentes pedindo
+    o mesmo arquivo esperam a mesma leitura em vez de cada uma abrir o Excel.
+
+    Returns:
+        {"df": DataFrame com colunas padronizadas, "por_analista": {analista: linhas},
+         "mtime": mtime do arquivo}.
+        Os DataFrames são compartilhados e não devem ser alterados pelo chamador.
+    """
+    caminho = Path(caminho_excel)
+    if not caminho.exists():
+        raise FileNotFoundError(f"Arquivo não encontrado: {caminho_excel}")
+    chave = (str(caminho.resolve(strict=False)), nome_planilha)
+    mtime = caminho.stat().st_mtime_ns
+    entrada = _contatos.get(chave)
+    if entrada and entrada["mtime"] == mtime:
+        return entrada
+    with _trava_da_chave(chave):
+        entrada = _contatos.get(chave)
+        if entrada and entrada["mtime"] == mtime:
+            return entrada
+        logging.info(f"Carregando contatos de: {caminho_excel}")
+        df_contatos = ler_tabela_excel_em_cache(caminho_excel, nome_planilha, 0)
+        df_contatos.rename(columns=COLUNAS_CONTATOS, inplace=True)
+        entrada = {**_indexar_contatos(df_contatos), "mtime": mtime}
+        _contatos[chave] = entrada
+        logging.info(f"Contatos indexados: {len(df_contatos)} linhas, {len(entrada['por_analista'])} analistas.")
+        return entrada
+
+def juntar_contatos_analista(df_dados: pd.DataFrame, contatos: Dict[str, Any], analista: str) -> Tuple[pd.DataFrame, List[str]]:
+    """Junta os dados do relatório apenas com os contatos do analista.
+
+    Equivale ao merge com todos os contatos seguido do filtro por Analista, mas usa a
+    partição pré-indexada e compara Empresa pela chave normalizada (espaços e caixa).
+
+    Returns:
+        (linhas do analista com as colunas de contato, agentes do analista que não
+        aparecem nos dados).
+    """
+    contatos_analista = contatos["por_analista"].get(str(analista).strip())
+    if contatos_analista is None or "Empresa" not in df_dados.columns:
+        return df_dados.iloc[0:0].copy(), []
+    chaves = normalizar_chave_empresa(df_dados["Empresa"])
+    presentes = contatos_analista[COLUNA_CHAVE].isin(chaves)
+    sem_dados = contatos_analista.loc[~presentes, "Empresa"].astype(str).str.strip().tolist()
+    colunas_contato = contatos_analista.drop(columns=["Empresa"]).loc[presentes]
+    df_juntado = (
+        df_dados.assign(**{COLUNA_CHAVE: chaves})
+        .merge(colunas_contato, on=COLUNA_CHAVE, how="inner")
+        .drop(columns=[COLUNA_CHAVE])
+    )
+    return df_juntado, sem_dados
@@ -0,0 +1,140 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+import pandas as pd
+from apps.relatorios_ccee.configuracoes.constantes import ENVIO_MASSA_CONFIGS
+from apps.relatorios_ccee.model.arquivos import ler_tabela_excel_em_cache, ErroProcessamento
+from apps.relatorios_ccee.model.medicoes import MedicaoExecucao, ativar_medicao, etapa, vincular_contexto
+from apps.relatorios_ccee.model import servicos
+import apps.relatorios_ccee.model.progresso as progresso
+
+ChaveGrupo = Tuple[str, str, int]
+
+def _chave_planilha(config: Dict[str, Any]) -> ChaveGrupo:
+    return (str(config["excel_dados"]), str(config["planilha_dados"]), int(config.get("linha_cabecalho", 0)))
+
+def agrupar_por_planilha(tipos_relatorio: List[str], mes: str, ano: str, user_info: Optional[Dict[str, Any]] = None) -> Tuple[Dict[ChaveGrupo, List[Tuple[str, Dict[str, Any]]]], Dict[str, str]]:
+    """Resolve a config de cada relatório e agrupa os que leem a mesma tabela.
+
+    Relatórios com a mesma planilha, aba e linha de cabeçalho (ex.: GFN001 e GFN - LEMBRETE
+    sobre o GFN003) caem no mesmo grupo e a tabela é lida uma vez. SUM001 e LFN001 não:
+    leem o LFN004 antes e depois da liquidação, que são arquivos diferentes.
+
+    Returns:
+        ({(arquivo, aba, cabeçalho): [(tipo, config), ...]}, {tipo: erro} dos que não resolveram).
+    """
+    grupos: Dict[ChaveGrupo, List[Tuple[str, Dict[str, Any]]]] = {}
+    erros: Dict[str, str] = {}
+    for tipo_relatorio in dict.fromkeys(tipos_relatorio):
+        try:
+            config = servicos.resolver_config_relatorio(tipo_relatorio, mes, ano, user_info)
+            grupos.setdefault(_chave_planilha(config), []).append((tipo_relatorio, config))
+        except Exception as e:
+            logging.error(f"Envio em massa: não foi possível resolver {tipo_relatorio}: {e}")
+            erros[tipo_relatorio] = str(e)
+    return grupos, erros
+
+def _ler_tabela_grupo(chave: ChaveGrupo, relatorios: List[Tuple[str, Dict[str, Any]]]) -> Optional[pd.DataFrame]:
+    """Lê a tabela do grupo uma única vez, com a união das colunas de todos os relatórios."""
+    if len(relatorios) < 2:
+        return None
+    arquivo, aba, cabecalho = chave
+    colunas = {coluna for _, config in relatorios for coluna in servicos.mapa_colunas_dados(config)}
+    logging.info(f"Envio em massa: lendo {arquivo} uma vez para {', '.join(t for t, _ in relatorios)}.")
+    with etapa("excel_dados"):
+        return ler_tabela_excel_em_cache(arquivo, aba, cabecalho, colunas=colunas, motor=relatorios[0][1].get("motor_excel"))
+
+def _resultado_falha(tipo_relatorio: str, analista: Optional[str], erro: str) -> Dict[str, Any]:
+    resultado = servicos._resultado_empresa({"Empresa": "—"}, servicos.SITUACAO_FALHOU, destinatario="", erro=erro)
+    return {"tipo": tipo_relatorio, "analista": analista or "—", **resultado}
+
+def _processar_grupo(chave: ChaveGrupo, relatorios: List[Tuple[str, Dict[str, Any]]], analistas: List[str], mes: str, ano: str, token_acesso: str, medicao: MedicaoExecucao, publicar: servicos.AoResultado, **kwargs: Any) -> List[Dict[str, Any]]:
+    """Prepara cada relatório do grupo a partir da tabela compartilhada e envia por analista, em sequência."""
+    resultados: List[Dict[str, Any]] = []
+    preparo = MedicaoExecucao()
+    try:
+        with ativar_medicao(preparo):
+            df_bruto = _ler_tabela_grupo(chave, relatorios)
+    except Exception as e:
+        logging.error(f"Envio em massa: falha ao ler {chave[0]}: {e}", exc_info=True)
+        for tipo_relatorio, _ in relatorios:
+            publicar(_resultado_falha(tipo_relatorio, None, f"Erro ao ler a planilha de dados: {e}"))
+        return resultados
+    for tipo_relatorio, config in relatorios:
+        try:
+            with ativar_medicao(preparo):
+                df_dados, contatos = servicos.carregar_base_relatorio(tipo_relatorio, config, df_bruto=df_bruto)
+        except ErroProcessamento as e:
+            publicar(_resultado_falha(tipo_relatorio, None, str(e)))
+            continue
+        for analista in analistas:
+            try:
+                medicao_envio = MedicaoExecucao(tipo=tipo_relatorio, analista=analista, mes=mes, ano=str(ano), envio_em_massa=medicao.id)
+                with ativar_medicao(medicao_envio):
+                    df_filtrado, config_analista = servicos._medir_preparo(servicos.filtrar_dados_analista, tipo_relatorio, analista, dict(config), df_dados, contatos)
+                if df_filtrado.empty:
+                    medicao.incorporar(medicao_envio.spans)
+                    continue
+                # A carga compartilhada entra só na medição do primeiro envio do grupo.
+                medicao_envio.incorporar(preparo.spans)
+                preparo.spans = []
+
+                def rotular(resultado: Dict[str, Any], tipo_relatorio: str = tipo_relatorio, analista: str = analista) -> None:
+                    publicar({"tipo": tipo_relatorio, "analista": analista, **resultado})
+
+                with progresso.rotulando_empresas(f"{tipo_relatorio} | {analista}"):
+                    criados = servicos.informa_processos(
+                        tipo_relatorio, analista, mes, ano, token_acesso,
+                        dados_preparados=(df_filtrado, config_analista), medicao=medicao_envio, ao_resultado=rotular, **kwargs
+                    )
+                medicao.incorporar(medicao_envio.spans)
+                resultados.extend({"tipo": tipo_relatorio, "analista": analista, **r} for r in criados)
+            except Exception as e:
+                logging.error(f"Envio em massa: falha em {tipo_relatorio} / {analista}: {e}", exc_info=True)
+                publicar(_resultado_falha(tipo_relatorio, analista, str(e)))
+    medicao.incorporar(preparo.spans)
+    return resultados
+
+def informa_processos_em_massa(tipos_relatorio: List[str], analistas: List[str], mes: str, ano: str, token_acesso: str, user_info: Optional[Dict[str, Any]] = None, max_workers: Optional[int] = None, modo_envio: Optional[str] = None, medicao: Optional[MedicaoExecucao] = None, ao_resultado: Optional[servicos.AoResultado] = None) -> List[Dict[str, Any]]:
+    """Cria os rascunhos de vários relatórios para vários analistas em uma execução.
+
+    Os relatórios são agrupados pela tabela de origem (agrupar_por_planilha): cada grupo
+    lê a planilha uma vez, os contatos vêm do cache do processo e os grupos rodam em
+    paralelo (ENVIO_MASSA_CONFIGS["max_grupos_simultaneos"]). Dentro do grupo, cada
+    relatório x analista passa por informa_processos, com medição própria.
+
+    Os resultados (e `ao_resultado`) trazem também "tipo" e "analista"; falhas de um
+    relatório ou analista inteiro aparecem como um resultado com empresa "—" e não
+    interrompem os demais. O retorno traz apenas os rascunhos criados.
+
+    Raises:
+        ErroProcessamento: Se o token estiver ausente.
+    """
+    if not token_acesso:
+        raise ErroProcessamento("Usuário não autenticado. Não é possível criar rascunhos.")
+    medicao = medicao or MedicaoExecucao(tipos=list(tipos_relatorio), analistas=list(analistas), mes=mes, ano=str(ano))
+
+    def publicar(resultado: Dict[str, Any]) -> None:
+        if ao_resultado:
+            try:
+                ao_resultado(resultado)
+            except Exception as e:
+                logging.warning(f"Falha ao publicar resultado de {resultado.get('empresa')}: {e}")
+
+    with ativar_medicao(medicao):
+        grupos, erros = agrupar_por_planilha(tipos_relatorio, mes, ano, user_info)
+    for tipo_relatorio, erro in erros.items():
+        publicar(_resultado_falha(tipo_relatorio, None, erro))
+    logging.info(f"Envio em massa: {len(tipos_relatorio)} relatório(s) em {len(grupos)} grupo(s) de planilha, {len(analistas)} analista(s).")
+    workers = max(1, min(int(ENVIO_MASSA_CONFIGS.get("max_grupos_simultaneos", 3)), len(grupos) or 1))
+    kwargs = {"user_info": user_info, "max_workers": max_workers, "modo_envio": modo_envio}
+    resultados: List[Dict[str, Any]] = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="envio-massa") as executor:
+        futuros = [
+            executor.submit(vincular_contexto(_processar_grupo), chave, relatorios, list(analistas), mes, ano, token_acesso, medicao, publicar, **kwargs)
+            for chave, relatorios in grupos.items()
+        ]
+        for futuro in futuros:
+            resultados.extend(futuro.result())
+    logging.info(f"Envio em massa concluído: {len(resultados)} rascunho(s) criado(s).")
+    return resultados
@@ -0,0 +1,74 @@
+import os
+import time
+import pickle
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, Optional, Tuple
+from apps.relatorios_ccee.configuracoes.constantes import INSTANTANEOS_CONFIGS
+
+# Instantâneos em disco: o valor de uma leitura cara (planilha, listagem de pasta)
+# junto com a assinatura da origem. Servem a qualquer processo que aponte para o
+# mesmo diretório, por isso o pré-carregamento feito pela linha de comando aquece
+# também as sessões do Streamlit.
+
+def assinatura_arquivo(caminho: Path) -> Tuple[int, int]:
+    """(mtime_ns, tamanho) da origem; não baixa placeholders do OneDrive."""
+    estado = Path(caminho).stat()
+    return (estado.st_mtime_ns, estado.st_size)
+
+def _arquivo_instantaneo(tipo: str, chave: Any) -> Path:
+    resumo = hashlib.sha1(repr(chave).encode("utf-8")).hexdigest()
+    return Path(INSTANTANEOS_CONFIGS["diretorio"]) / tipo / f"{resumo}.pkl"
+
+def ler_instantaneo(tipo: str, chave: Any, assinatura: Any) -> Optional[Any]:
+    """Valor guardado para `chave` se ainda corresponder à `assinatura`; senão None."""
+    if not INSTANTANEOS_CONFIGS.get("habilitado", True):
+        return None
+    arquivo = _arquivo_instantaneo(tipo, chave)
+    try:
+        with open(arquivo, "rb") as f:
+            # Só lê arquivos gravados por gravar_instantaneo no diretório do próprio app.
+            dado = pickle.load(f)  # nosec B301
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Instantâneo ilegível em {arquivo}: {e}")
+        return None
+    if dado.get("chave") != chave or dado.get("assinatura") != assinatura:
+        return None
+    return dado.get("valor")
+
+def gravar_instantaneo(tipo: str, chave: Any, assinatura: Any, valor: Any) -> None:
+    """Grava o instantâneo de forma atômica (arquivo temporário + os.replace)."""
+    if not INSTANTANEOS_CONFIGS.get("habilitado", True):
+        return
+    arquivo = _arquivo_instantaneo(tipo, chave)
+    try:
+        arquivo.parent.mkdir(parents=True, exist_ok=True)
+        descritor, temporario = tempfile.mkstemp(dir=arquivo.parent, suffix=".tmp")
+        with os.fdopen(descritor, "wb") as f:
+            pickle.dump({"chave": chave, "assinatura": assinatura, "valor": valor}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, arquivo)
+    except OSError as e:
+        logging.warning(f"Não foi possível gravar o instantâneo {arquivo}: {e}")
+
+def limpar_instantaneos(tipo: Optional[str] = None, mais_antigos_que_dias: Optional[float] = None) -> int:
+    """Remove os instantâneos (de um tipo ou todos) e devolve quantos foram apagados.
+
+    Com `mais_antigos_que_dias`, só apaga os gravados há mais tempo que isso.
+    """
+    raiz = Path(INSTANTANEOS_CONFIGS["diretorio"])
+    alvo = raiz / tipo if tipo else raiz
+    limite = time.time() - mais_antigos_que_dias * 86400 if mais_antigos_que_dias is not None else None
+    removidos = 0
+    for arquivo in alvo.rglob("*.pkl") if alvo.exists() else []:
+        try:
+            if limite is not None and arquivo.stat().st_mtime >= limite:
+                continue
+            arquivo.unlink()
+            removidos += 1
+        except OSError as e:
+            logging.warning(f"Não foi possível remover {arquivo}: {e}")
+    return removidos
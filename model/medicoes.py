@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import uuid
+import functools
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterator, Callable
+from apps.relatorios_ccee.configuracoes.constantes import MEDICOES_CONFIGS
+
+# Limites (em segundos) das faixas do histograma de cada etapa.
+FAIXAS_HISTOGRAMA = [0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+# Medição e empresa correntes. Threads do pool só as enxergam se a tarefa rodar
+# dentro de uma cópia do contexto (ver vincular_contexto).
+_medicao_atual: contextvars.ContextVar[Optional["MedicaoExecucao"]] = contextvars.ContextVar("medicao_atual", default=None)
+_empresa_atual: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("empresa_atual", default=None)
+
+def _rotulo_faixa(limite: Optional[float]) -> str:
+    return f"<={limite * 1000:g}ms" if limite is not None else f">{FAIXAS_HISTOGRAMA[-1] * 1000:g}ms"
+
+def _percentil(valores_ordenados: List[float], fracao: float) -> float:
+    if not valores_ordenados:
+        return 0.0
+    indice = min(len(valores_ordenados) - 1, max(0, int(round(fracao * (len(valores_ordenados) - 1)))))
+    return valores_ordenados[indice]
+
+class MedicaoExecucao:
+    """Tempos de uma execução de relatório: histograma por etapa e spans por empresa."""
+
+    def __init__(self, **atributos: Any):
+        self.id = uuid.uuid4().hex[:12]
+        self.inicio = datetime.now().isoformat(timespec="seconds")
+        self.atributos = atributos
+        self.spans: List[Dict[str, Any]] = []
+        self._relogio = time.perf_counter()
+        self._fim: Optional[float] = None
+        self._por_empresa: Dict[str, float] = {}
+        self._trava = threading.Lock()
+
+    def registrar(self, etapa: str, segundos: float, empresa: Optional[str] = None) -> None:
+        with self._trava:
+            self.spans.append({"etapa": etapa, "empresa": empresa, "segundos": segundos})
+            if empresa is not None:
+                self._por_empresa[str(empresa)] = self._por_empresa.get(str(empresa), 0.0) + segundos
+
+    def incorporar(self, spans: List[Dict[str, Any]]) -> None:
+        """Acrescenta spans medidos em outra execução (ex.: a preparação feita na prévia)."""
+        with self._trava:
+            for span in spans:
+                self.spans.append(dict(span))
+                if span.get("empresa") is not None:
+                    chave = str(span["empresa"])
+                    self._por_empresa[chave] = self._por_empresa.get(chave, 0.0) + span["segundos"]
+
+    def tempo_empresa(self, empresa: Optional[str]) -> float:
+        """Soma das etapas já medidas para a empresa, sem agregar a execução inteira."""
+        with self._trava:
+            return self._por_empresa.get(str(empresa), 0.0)
+
+    def resumo(self) -> Dict[str, Any]:
+        """Agrega os spans em estatísticas por etapa e tempos por empresa."""
+        with self._trava:
+            spans = list(self.spans)
+        por_etapa: Dict[str, List[float]] = {}
+        empresas: Dict[str, Dict[str, float]] = {}
+        for span in spans:
+            por_etapa.setdefault(span["etapa"], []).append(span["segundos"])
+            if span["empresa"] is not None:
+                tempos = empresas.setdefault(str(span["empresa"]), {})
+                tempos[span["etapa"]] = tempos.get(span["etapa"], 0.0) + span["segundos"]
+        etapas = {}
+        for etapa, valores in por_etapa.items():
+            valores.sort()
+            histograma = {_rotulo_faixa(limite): 0 for limite in FAIXAS_HISTOGRAMA + [None]}
+            for valor in valores:
+                limite = next((f for f in FAIXAS_HISTOGRAMA if valor <= f), None)
+                histograma[_rotulo_faixa(limite)] += 1
+            etapas[etapa] = {
+                "contagem": len(valores),
+                "total_s": round(sum(valores), 4),
+                "media_s": round(sum(valores) / len(valores), 4),
+                "p50_s": round(_percentil(valores, 0.5), 4),
+                "p95_s": round(_percentil(valores, 0.95), 4),
+                "max_s": round(valores[-1], 4),
+                "histograma": {faixa: n for faixa, n in histograma.items() if n},
+            }
+        return {
+            "execucao": self.id,
+            "inicio": self.inicio,
+            **self.atributos,
+            "duracao_s": round((self._fim or time.perf_counter()) - self._relogio, 4),
+            "etapas": etapas,
+            "empresas": {empresa: {k: round(v, 4) for k, v in tempos.items()} for empresa, tempos in empresas.items()},
+        }
+
+    def gravar_jsonl(self, caminho_arquivo: Optional[str] = None) -> Dict[str, Any]:
+        """Encerra a medição e acrescenta o resumo como uma linha JSON no arquivo de medições."""
+        self._fim = self._fim or time.perf_counter()
+        resumo = self.resumo()
+        caminho_arquivo = caminho_arquivo or MEDICOES_CONFIGS.get("arquivo_jsonl")
+        if caminho_arquivo:
+            try:
+                os.makedirs(os.path.dirname(caminho_arquivo) or ".", exist_ok=True)
+                with open(caminho_arquivo, "a", encoding="utf-8") as arquivo:
+                    arquivo.write(json.dumps(resumo, ensure_ascii=False, default=str) + "\n")
+            except OSError as e:
+                logging.warning(f"Não foi possível gravar as medições em {caminho_arquivo}: {e}")
+        return resumo
+
+@contextmanager
+def ativar_medicao(medicao: "MedicaoExecucao") -> Iterator["MedicaoExecucao"]:
+    """Torna a medição a corrente enquanto o bloco executa."""
+    marca = _medicao_atual.set(medicao)
+    try:
+        yield medicao
+    finally:
+        _medicao_atual.reset(marca)
+
+def medicao_atual() -> Optional[MedicaoExecucao]:
+    return _medicao_atual.get()
+
+def empresa_atual() -> Optional[str]:
+    return _empresa_atual.get()
+
+@contextmanager
+def empresa(nome: Optional[str]) -> Iterator[None]:
+    """Associa as etapas medidas dentro do bloco à empresa informada."""
+    marca = _empresa_atual.set(nome)
+    try:
+        yield
+    finally:
+        _empresa_atual.reset(marca)
+
+@contextmanager
+def etapa(nome: str) -> Iterator[None]:
+    """Mede o bloco como uma etapa da medição corrente; sem medição ativa, não faz nada."""
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicao.registrar(nome, time.perf_counter() - inicio, _empresa_atual.get())
+
+def vincular_contexto(funcao: Callable[..., Any]) -> Callable[..., Any]:
+    """Prende `funcao` a uma cópia do contexto atual, para submetê-la a um pool de threads.
+
+    Chame uma vez por tarefa: a mesma cópia não pode ser usada por duas threads ao mesmo tempo.
+    """
+    return functools.partial(contextvars.copy_context().run, funcao)
@@ -0,0 +1,74 @@
+import re
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple, FrozenSet
+from jinja2 import Environment, BaseLoader, Template, meta
+from apps.relatorios_ccee.model.arquivos import carregar_templates_email, TEMPLATES_JSON_PATH
+
+# Ambiente único compartilhado: o Environment do Jinja2 é seguro para render concorrente.
+_ambiente = Environment(loader=BaseLoader())
+_trava = threading.Lock()
+_estado: Dict[str, Any] = {"assinatura": None, "templates": {}, "compilados": {}}
+
+ModeloCompilado = Tuple[Optional[Template], FrozenSet[str], Optional[str]]
+
+def normalizar_placeholders(texto: Any) -> Any:
+    """Converte placeholders legados '{x}' para a sintaxe Jinja2 '{{ x }}'."""
+    return re.sub(r"\{(\w+)\}", r"{{ \1 }}", texto) if isinstance(texto, str) else texto
+
+def compilar_modelo(texto: str) -> ModeloCompilado:
+    """Normaliza, compila e extrai as variáveis não declaradas de um template.
+
+    Returns:
+        (template, variáveis não declaradas, mensagem de erro). Em caso de falha o
+        template é None e a mensagem descreve o erro de sintaxe.
+    """
+    fonte = normalizar_placeholders(texto)
+    try:
+        variaveis = frozenset(meta.find_undeclared_variables(_ambiente.parse(fonte)))
+        return _ambiente.from_string(fonte), variaveis, None
+    except Exception as e:
+        logging.error(f"Erro ao compilar template Jinja2: {e}")
+        return None, frozenset(), str(e)
+
+def _coletar_textos(bloco: Any, destino: Dict[str, ModeloCompilado]) -> None:
+    """Percorre o JSON de templates compilando assuntos e corpos (incl. variantes)."""
+    if not isinstance(bloco, dict):
+        return
+    for chave, valor in bloco.items():
+        if isinstance(valor, dict):
+            _coletar_textos(valor, destino)
+        elif isinstance(valor, str) and (chave == "assunto_template" or chave.startswith("corpo_html")):
+            if valor not in destino:
+                destino[valor] = compilar_modelo(valor)
+
+def _assinatura_arquivo() -> Optional[Tuple[int, int]]:
+    try:
+        info = TEMPLATES_JSON_PATH.stat()
+        return info.st_mtime_ns, info.st_size
+    except OSError:
+        return None
+
+def _atualizar_se_necessario() -> Dict[str, Any]:
+    assinatura = _assinatura_arquivo()
+    with _trava:
+        if assinatura is not None and assinatura == _estado["assinatura"]:
+            return _estado
+        templates = carregar_templates_email()
+        compilados: Dict[str, ModeloCompilado] = {}
+        for bloco in templates.values():
+            _coletar_textos(bloco, compilados)
+        _estado.update({"assinatura": assinatura, "templates": templates, "compilados": compilados})
+        logging.info(f"Templates de e-mail compilados: {len(compilados)} textos de {len(templates)} relatórios.")
+        return _estado
+
+def obter_templates() -> Dict[str, Any]:
+    """Retorna o JSON de templates, relendo o arquivo apenas quando o mtime muda."""
+    return _atualizar_se_necessario()["templates"]
+
+def obter_modelo_compilado(texto: str) -> ModeloCompilado:
+    """Busca o template já compilado; textos fora do JSON são compilados sob demanda."""
+    compilado = _atualizar_se_necessario()["compilados"].get(texto)
+    if compilado is None:
+        compilado = compilar_modelo(texto)
+    return compilado
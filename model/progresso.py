@@ -0,0 +1,66 @@
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+from apps.relatorios_ccee.model.medicoes import empresa_atual
+
+# Estados por empresa publicados durante um envio.
+PREPARADO = "preparado"
+RENDERIZADO = "renderizado"
+IGNORADO = "ignorado"
+ANEXOS_CARREGADOS = "anexos_carregados"
+RASCUNHO_CRIADO = "rascunho_criado"
+FALHOU = "falhou"
+# Aviso para quem acompanha (ex.: anexo ignorado); não muda o estado da empresa.
+AVISO = "aviso"
+
+# ouvinte(empresa, estado, detalhes); empresa é None para eventos do envio todo.
+# É a única saída do model/ para a interface: o Streamlit, as tarefas em segundo plano
+# e a linha de comando são só ouvintes diferentes (o model nunca importa streamlit).
+OuvinteProgresso = Callable[[Optional[str], str, dict], None]
+
+_ouvinte: contextvars.ContextVar[Optional[OuvinteProgresso]] = contextvars.ContextVar("ouvinte_progresso", default=None)
+
+@contextmanager
+def ouvindo_progresso(ouvinte: Optional[OuvinteProgresso]) -> Iterator[None]:
+    """Encaminha ao `ouvinte` os eventos de progresso publicados dentro do bloco."""
+    marca = _ouvinte.set(ouvinte)
+    try:
+        yield
+    finally:
+        _ouvinte.reset(marca)
+
+@contextmanager
+def rotulando_empresas(rotulo: str) -> Iterator[None]:
+    """Prefixa com `rotulo` as empresas dos eventos publicados dentro do bloco.
+
+    Usado quando vários relatórios/analistas publicam no mesmo ouvinte e a mesma
+    empresa aparece em mais de um deles.
+    """
+    ouvinte = _ouvinte.get()
+    if ouvinte is None:
+        yield
+        return
+
+    def rotular(empresa: Optional[str], estado: str, detalhes: dict) -> None:
+        if "empresas" in detalhes:
+            detalhes = {**detalhes, "empresas": [f"{rotulo} | {nome}" for nome in detalhes["empresas"] or []]}
+        ouvinte(f"{rotulo} | {empresa}" if empresa is not None else None, estado, detalhes)
+
+    with ouvindo_progresso(rotular):
+        yield
+
+def notificar(estado: str, empresa: Optional[str] = None, **detalhes: Any) -> None:
+    """Publica um evento; sem `empresa`, usa a empresa corrente (medicoes.empresa)."""
+    ouvinte = _ouvinte.get()
+    if ouvinte is None:
+        return
+    try:
+        ouvinte(empresa if empresa is not None else empresa_atual(), estado, detalhes)
+    except Exception as e:
+        # Um ouvinte com defeito não pode derrubar o envio.
+        logging.warning(f"Falha ao publicar progresso '{estado}': {e}")
+
+def avisar(mensagem: str, empresa: Optional[str] = None, **detalhes: Any) -> None:
+    """Publica um aviso (AVISO) para a interface; quem chama continua registrando no log."""
+    notificar(AVISO, empresa=empresa, mensagem=mensagem, **detalhes)
@@ -1,109 +1,126 @@
 import pandas as pd
 import logging
-from apps.relatorios_ccee.model.arquivos import ler_dados_excel
-from apps.relatorios_ccee.model.utils_dados import converter_numero_br 
+from apps.relatorios_ccee.model.arquivos import extrair_celulas_excel
+from apps.relatorios_ccee.model.utils_dados import converter_serie_br, formatar_serie_moeda, formatar_serie_data
 
-def preparar_contexto_lfres(context, row, config, tipo_relatorio, **kwargs):
+# Células fixas (linha, coluna em base 0, como iloc com header=None) lidas por relatório.
+CELULAS_FIXAS = {
+    "GFN001": [(23, 0)],
+    "GFN - LEMBRETE": [(23, 0)],
+    "SUM001": [(23, 0), (23, 1)],
+    "LFRCAP001": [(34, 0)],
+    "LFRES001": [(26, 0), (26, 1)],
+}
 
-    situacao = str(row.get("Situacao", "")).strip()
-    data_linha = row.get("Data")
-    if data_linha is not None and not pd.isna(data_linha) and str(data_linha).strip() != "":
-        context["data"] = data_linha
-    else:
-        try:
-            df_raw_data_lfres = ler_dados_excel(config["excel_dados"], config["planilha_dados"], -1)
-            data_debito = df_raw_data_lfres.iloc[26, 0]
-            data_credito = df_raw_data_lfres.iloc[26, 1]
-            context["data"] = data_credito if situacao == "Crédito" else data_debito
-        except Exception as e:
-            logging.warning(f"LFRES: Não foi possível extrair a data do Excel: {e}")
-            context["data"] = None
+def celulas_necessarias(tipo_relatorio, config):
+    """Lista as células fixas que os handlers do relatório vão consultar (incl. extra_fields)."""
+    celulas = list(CELULAS_FIXAS.get(tipo_relatorio, []))
+    for field in config.get("extra_fields", []):
+        celulas.append((int(field.get("row", 0)), int(field.get("col", 0))))
+    return celulas
 
-    logging.info(f"LFRES: TipoAgente='{context.get('TipoAgente')}', Valor={context.get('valor')}, Situacao='{situacao}'")
-    return context
-
-def preparar_contexto_lfn001(context, row, config, tipo_relatorio, **kwargs):
+def carregar_celulas_fixas(tipo_relatorio, config):
+    """Extrai de uma vez todas as células fixas do relatório e guarda em config['_celulas_planilha']."""
+    celulas = celulas_necessarias(tipo_relatorio, config)
+    try:
+        config["_celulas_planilha"] = extrair_celulas_excel(config["excel_dados"], config["planilha_dados"], celulas) if celulas else {}
+    except Exception as e:
+        logging.warning(f"[{tipo_relatorio}] Não foi possível extrair as células fixas do Excel: {e}")
+        config["_celulas_planilha"] = {}
+    config["_celulas_consultadas"] = set(celulas)
+    return config["_celulas_planilha"]
 
-    from model.utils_dados import converter_numero_br
-    context["ValorLiquidacao"] = converter_numero_br(row.get("ValorLiquidacao", 0))
-    context["ValorLiquidado"] = converter_numero_br(row.get("ValorLiquidado", 0))
-    context["ValorInadimplencia"] = converter_numero_br(row.get("ValorInadimplencia", 0))
-    return context
+def ler_celula(config, linha, coluna):
+    """Valor de uma célula fixa; usa o que foi extraído na preparação e só abre o Excel se faltar.
 
-def preparar_contexto_gfn(context, row, config, tipo_relatorio, **kwargs):
+    Raises:
+        IndexError: Se a coordenada está fora da área usada da planilha.
+    """
+    chave = (int(linha), int(coluna))
+    celulas = config.setdefault("_celulas_planilha", {})
+    consultadas = config.setdefault("_celulas_consultadas", set())
+    if chave not in consultadas:
+        celulas.update(extrair_celulas_excel(config["excel_dados"], config["planilha_dados"], [chave]))
+        consultadas.add(chave)
+    if chave not in celulas:
+        raise IndexError(f"Coordenada {chave} fora da planilha.")
+    return celulas[chave]
 
+def _celula_ou_none(config, linha, coluna, tipo_relatorio, descricao):
     try:
-        df_raw_gfn = ler_dados_excel(config["excel_dados"], config["planilha_dados"], -1)
-        data_aporte = df_raw_gfn.iloc[23, 0]
-        context["dataaporte"] = data_aporte
+        return ler_celula(config, linha, coluna)
     except Exception as e:
-        logging.warning(f"GFN: Não foi possível extrair a data do aporte do Excel: {e}")
-        context["dataaporte"] = None
-    return context
+        logging.warning(f"{tipo_relatorio}: Não foi possível extrair {descricao} do Excel: {e}")
+        return None
 
-def preparar_contexto_sum(context, row, config, tipo_relatorio, parsed_valor, **kwargs):
+def _coluna(df, nome, padrao=None):
+    return df[nome] if nome in df.columns else pd.Series(padrao, index=df.index, dtype=object)
 
-    if tipo_relatorio == "SUM001":
-        try:
-            df_raw_sum = ler_dados_excel(config["excel_dados"], config["planilha_dados"], -1)
-            data_debito, data_credito = df_raw_sum.iloc[23, 0], df_raw_sum.iloc[23, 1]
-        except Exception:
-            data_debito, data_credito = None, None
-        situacao = str(row.get("Situacao", "")).strip()
-        # Define a situação para selecionar a variante do template
-        context["situacao"] = situacao
-        # Define a data com base na situação
-        context["data_liquidacao"] = data_credito if situacao == "Crédito" else data_debito
-        # Para débito, garante valor negativo; para crédito, valor positivo
-        context["valor"] = abs(parsed_valor) if situacao == "Crédito" else -abs(parsed_valor)
-    if tipo_relatorio in ["LFRCAP001", "RCAP002"]:
-        if tipo_relatorio == "LFRCAP001":
-            try:
-                df_raw_lfrcap = ler_dados_excel(config["excel_dados"], config["planilha_dados"], -1)
-                data_aporte = df_raw_lfrcap.iloc[34, 0]
-                context["dataaporte"] = data_aporte
-            except Exception as e:
-                logging.warning(f"LFRCAP001: Não foi possível extrair a data do aporte do Excel: {e}")
-                context["dataaporte"] = None
-        else:
-             context["dataaporte"] = row.get("Data")
-    return context
-def preparar_contexto_lfrcap(context, row, config, tipo_relatorio, **kwargs):
+def _situacao(df):
+    return _coluna(df, "Situacao", "").fillna("").astype(str).str.strip()
+
+def _numerico(serie):
+    return converter_serie_br(serie).fillna(0.0)
+
+def preparar_contexto_lfres(ctx, df, config, tipo_relatorio):
+
+    situacao = _situacao(df)
+    data = ctx["data"].astype(object)
+    ausente = data.isna() | (data.astype(str).str.strip() == "")
+    if ausente.any():
+        data_debito = _celula_ou_none(config, 26, 0, "LFRES", "a data de débito")
+        data_credito = _celula_ou_none(config, 26, 1, "LFRES", "a data de crédito")
+        fallback = pd.Series(data_debito, index=df.index, dtype=object).mask(situacao == "Crédito", data_credito)
+        ctx["data"] = data.mask(ausente, fallback)
+    logging.info(f"LFRES: {len(df)} linhas, {int(ausente.sum())} sem data na tabela.")
+
+def preparar_contexto_lfn001(ctx, df, config, tipo_relatorio):
+
+    for col in ["ValorLiquidacao", "ValorLiquidado", "ValorInadimplencia"]:
+        ctx[col] = _numerico(_coluna(df, col, 0))
+
+def preparar_contexto_gfn(ctx, df, config, tipo_relatorio):
+
+    ctx["dataaporte"] = _celula_ou_none(config, 23, 0, "GFN", "a data do aporte")
+
+def preparar_contexto_sum(ctx, df, config, tipo_relatorio):
+
+    data_debito = _celula_ou_none(config, 23, 0, "SUM001", "a data de débito")
+    data_credito = _celula_ou_none(config, 23, 1, "SUM001", "a data de crédito")
+    situacao = _situacao(df)
+    credito = situacao == "Crédito"
+    # Define a situação para selecionar a variante do template
+    ctx["situacao"] = situacao
+    # Define a data com base na situação
+    ctx["data_liquidacao"] = pd.Series(data_debito, index=df.index, dtype=object).mask(credito, data_credito)
+    # Para débito, garante valor negativo; para crédito, valor positivo
+    valor_abs = ctx["valor"].abs()
+    ctx["valor"] = valor_abs.where(credito, -valor_abs)
+
+def preparar_contexto_lfrcap(ctx, df, config, tipo_relatorio):
     if tipo_relatorio == "LFRCAP001":
-        try:
-            df_raw_lfrcap = ler_dados_excel(config["excel_dados"], config["planilha_dados"], -1)
-            data_aporte = df_raw_lfrcap.iloc[34, 0]
-            context["dataaporte"] = data_aporte
-        except Exception as e:
-            logging.warning(f"LFRCAP001: Não foi possível extrair a data do Excel: {e}")
-            context["dataaporte"] = None
+        ctx["dataaporte"] = _celula_ou_none(config, 34, 0, "LFRCAP001", "a data do aporte")
     else: # RCAP002
-         context["dataaporte"] = row.get("Data")
-    return context
+        ctx["dataaporte"] = _coluna(df, "Data")
 
-def processador_generico_relatorio(context, row, config, tipo_relatorio, **kwargs):
+def processador_generico_relatorio(ctx, df, config, tipo_relatorio):
     """
     Handler universal que processa extrações baseadas puramente no JSON de configuração.
     Permite definir: 'extra_fields': [{'name': 'data_venc', 'row': 23, 'col': 1}]
     """
-    extra_fields = config.get("extra_fields", [])
-    if extra_fields:
+    for field in config.get("extra_fields", []):
+        field_name = field.get("name")
+        r = int(field.get("row", 0))
+        c = int(field.get("col", 0))
         try:
-            df_raw = ler_dados_excel(config["excel_dados"], config["planilha_dados"], -1)
-            for field in extra_fields:
-                field_name = field.get("name")
-                r = int(field.get("row", 0))
-                c = int(field.get("col", 0))
-                try:
-                    val = df_raw.iloc[r, c]
-                    context[field_name] = val
-                    logging.info(f"[{tipo_relatorio}] Extraído '{field_name}' da celula ({r},{c}): {val}")
-                except IndexError:
-                    logging.warning(f"[{tipo_relatorio}] Erro ao extrair '{field_name}': Coordenada ({r},{c}) inválida.")
-                    context[field_name] = "N/D"
+            val = ler_celula(config, r, c)
+            ctx[field_name] = val
+            logging.info(f"[{tipo_relatorio}] Extraído '{field_name}' da celula ({r},{c}): {val}")
+        except IndexError:
+            logging.warning(f"[{tipo_relatorio}] Erro ao extrair '{field_name}': Coordenada ({r},{c}) inválida.")
+            ctx[field_name] = "N/D"
         except Exception as e:
             logging.error(f"[{tipo_relatorio}] Erro ao carregar Excel para extração genérica: {e}")
-    return context
 
 PROCESSADORES_RELATORIO = {
 
@@ -114,4 +131,43 @@ PROCESSADORES_RELATORIO = {
     "SUM001": preparar_contexto_sum,
     "LFRCAP001": preparar_contexto_lfrcap,
     "RCAP002": preparar_contexto_lfrcap,
-}
\ No newline at end of file
+}
+
+COLUNAS_MOEDA_CONTEXTO = ["valor", "ValorLiquidacao", "ValorLiquidado", "ValorInadimplencia"]
+COLUNAS_DATA_CONTEXTO = ["data", "dataaporte", "data_liquidacao"]
+
+def preparar_contextos(df, tipo_relatorio, dados_comuns, config):
+    """Monta, coluna a coluna, os contextos de renderização de todas as linhas do DataFrame.
+
+    Converte valores, aplica o handler do relatório (situação, sinal, datas das células
+    fixas), formata moeda e datas de uma vez e devolve uma lista de dicionários prontos
+    para o template, na mesma ordem das linhas. O valor numérico fica em
+    'valor_numerico' para a seleção de variantes.
+    """
+    ctx = pd.DataFrame(index=df.index)
+    ctx["empresa"] = _coluna(df, "Empresa")
+    ctx["data"] = _coluna(df, "Data")
+    ctx["valor"] = _numerico(_coluna(df, "Valor", 0))
+    handler = PROCESSADORES_RELATORIO.get(tipo_relatorio, processador_generico_relatorio)
+    try:
+        handler(ctx, df, config, tipo_relatorio)
+    except Exception as e:
+        logging.error(f"Erro no handler {tipo_relatorio}: {e}", exc_info=True)
+    ctx["valor_numerico"] = ctx["valor"]
+    for col in COLUNAS_MOEDA_CONTEXTO:
+        if col in ctx.columns:
+            ctx[col] = formatar_serie_moeda(ctx[col])
+    for col in COLUNAS_DATA_CONTEXTO:
+        if col in ctx.columns:
+            ctx[col] = formatar_serie_data(ctx[col])
+    # Chaves internas da configuração (caches, índices) não entram no template.
+    base = {**dados_comuns, **{k: v for k, v in config.items() if not str(k).startswith("_")}}
+    base.update({
+        "mesext": dados_comuns.get("mes_long"),
+        "mes": dados_comuns.get("mes_num"),
+        "ano": dados_comuns.get("ano"),
+        "assinatura": dados_comuns.get("analista"),
+    })
+    registros = df.to_dict("records")
+    derivados = ctx.to_dict("records")
+    return [{**registro, **base, **derivado} for registro, derivado in zip(registros, derivados)]
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import re
 import bleach
+import threading
 from pathlib import Path
 from typing import Iterable, Tuple
 
@@ -27,10 +28,20 @@ ATRIBUTOS_PERMITIDOS = {
     #"*": ["style"],
 }
 
+# Um Cleaner por thread (e, portanto, por processo do render paralelo): montá-lo a cada
+# chamada custa mais que a limpeza de um e-mail, e o parser dele não pode ser compartilhado.
+_local = threading.local()
+
+def _limpador() -> bleach.Cleaner:
+    limpador = getattr(_local, "limpador", None)
+    if limpador is None:
+        limpador = _local.limpador = bleach.Cleaner(tags=TAGS_PERMITIDAS, attributes=ATRIBUTOS_PERMITIDOS, strip=True)
+    return limpador
+
 def sanitizar_html(html: str) -> str:
     if not isinstance(html, str):
         return ""
-    return bleach.clean(html, tags=TAGS_PERMITIDAS, attributes=ATRIBUTOS_PERMITIDOS, strip=True)
+    return _limpador().clean(html)
 
 def sanitizar_assunto(assunto: str) -> str:
     if not isinstance(assunto, str):
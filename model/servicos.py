@@ -1,38 +1,44 @@
 import pandas as pd
 import re
 import os
+import copy
+import atexit
 import base64
 import mimetypes
 import requests
-import shutil
-import tempfile
-import subprocess
-import tempfile
+import time
+from urllib.parse import quote
+import queue
 import logging
+import logging.handlers
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path as caminho
-from typing import Dict, List, Any, Optional, Tuple
-from jinja2 import Environment, BaseLoader, meta
-from apps.relatorios_ccee.configuracoes.constantes import MESES
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterator
+from apps.relatorios_ccee.configuracoes.constantes import MESES, GRAPH_CONFIGS, CONFIG_FILE, RENDER_CONFIGS
 from apps.relatorios_ccee.configuracoes.gerenciador import carregar_configuracoes, construir_caminhos_relatorio
 from apps.relatorios_ccee.model.seguranca import sanitizar_html, sanitizar_assunto
-from apps.relatorios_ccee.model.utils_dados import converter_numero_br, formatar_moeda, formatar_data
-from apps.relatorios_ccee.model.arquivos import ler_dados_excel, encontrar_anexo, carregar_templates_email, ErroProcessamento
-from .relatorios import PROCESSADORES_RELATORIO, processador_generico_relatorio
+from apps.relatorios_ccee.model.utils_dados import converter_numero_br, formatar_moeda, formatar_data, tipar_colunas_relatorio
+from apps.relatorios_ccee.model.arquivos import ler_tabela_excel_em_cache, encontrar_anexo, ler_anexo, ler_anexo_em_blocos, indexar_diretorio_pdfs, normalizar_nome_anexo, ErroProcessamento
+from apps.relatorios_ccee.model.contatos import obter_contatos, juntar_contatos_analista
+from apps.relatorios_ccee.model.cliente_graph import obter_cliente_graph, obter_metricas_graph, segundos_retry_after, espera_com_jitter, STATUS_THROTTLE, metricas_desde
+from apps.relatorios_ccee.model.modelos_email import obter_templates, obter_modelo_compilado
+from apps.relatorios_ccee.model.medicoes import MedicaoExecucao, ativar_medicao, medicao_atual, empresa, etapa, vincular_contexto
+import apps.relatorios_ccee.model.progresso as progresso
+from .relatorios import preparar_contextos, carregar_celulas_fixas
 
-def criar_rascunho_graph(token_acesso: str, destinatario: str, assunto: str, corpo: str, anexos: List[caminho]) -> bool:
-    """Cria um rascunho de e-mail na caixa do usuário logado via MS Graph API.
+GRAPH_MESSAGES_URL = "/me/messages"
+GRAPH_BATCH_URL = "/$batch"
 
-    Raises:
-        ErroProcessamento: Em caso de falha na criação do rascunho ou ausência de token.
-    """
-    if not token_acesso:
-        logging.error("Tentativa de criar rascunho sem token de acesso.")
-        raise ErroProcessamento("Token de acesso inválido ou ausente.")
-    graph_url = "https://graph.microsoft.com/v1.0/me/messages"
-    headers = {
-        'Authorization': 'Bearer ' + token_acesso,
-        'Content-Type': 'application/json'
-    }
+def url_mensagens() -> str:
+    """/me/messages, ou /users/{caixa}/messages com GRAPH_CONFIGS["caixa_postal"] (token de aplicativo)."""
+    caixa = GRAPH_CONFIGS.get("caixa_postal")
+    return f"/users/{quote(caixa)}/messages" if caixa else GRAPH_MESSAGES_URL
+
+def montar_payload_rascunho(destinatario: str, assunto: str, corpo: str, anexos: List[caminho]) -> Dict[str, Any]:
+    """Monta o JSON de uma mensagem do Graph (destinatários, corpo HTML e anexos inline)."""
     lista_destinatarios = []
     if destinatario:
         enderecos = [addr.strip() for addr in destinatario.split(';') if addr.strip() and '@' in addr] # Checagem básica
@@ -40,7 +46,7 @@ def criar_rascunho_graph(token_acesso: str, destinatario: str, assunto: str, cor
              lista_destinatarios = [{"emailAddress": {"address": addr}} for addr in enderecos]
         else:
              logging.warning(f"Nenhum destinatário válido encontrado em: {destinatario}")
-             st.warning(f"Tentando criar rascunho sem destinatário válido para linha com '{destinatario}'.")
+             progresso.avisar(f"Tentando criar rascunho sem destinatário válido para linha com '{destinatario}'.")
     
     payload_email = {
         "subject": assunto,
@@ -56,127 +62,326 @@ def criar_rascunho_graph(token_acesso: str, destinatario: str, assunto: str, cor
     LIMITE_TAMANHO_ANEXO_MB = 25
     for caminho_anexo in anexos:
         if caminho_anexo and caminho_anexo.exists():
-            caminho_temporario_str = None
             try:
-                origem_str = str(caminho_anexo.resolve())
-                
-                fd, caminho_temporario_str = tempfile.mkstemp(suffix=".pdf")
-                os.close(fd)
-
-                comando = f'copy /Y /B "{origem_str}" "{caminho_temporario_str}"'
-                
-                processo = subprocess.run(
-                    comando, 
-                    shell=True, 
-                    stdout=subprocess.PIPE, 
-                    stderr=subprocess.PIPE
-                )
-                
-                if processo.returncode != 0 or not os.path.exists(caminho_temporario_str) or os.path.getsize(caminho_temporario_str) == 0:
-                    erro_msg = processo.stderr.decode("cp850", errors="ignore") or "Erro desconhecido no copy"
-                    logging.error(f"CMD Copy falhou para {caminho_anexo.name}: {erro_msg}")
-                    st.warning(f"Windows não conseguiu copiar o anexo {caminho_anexo.name}. Erro: {erro_msg}")
-                    continue
-
-                tamanho_arquivo = os.path.getsize(caminho_temporario_str)
+                tamanho_arquivo = caminho_anexo.stat().st_size
                 if tamanho_total_anexos + tamanho_arquivo > LIMITE_TAMANHO_ANEXO_MB * 1024 * 1024:
                     logging.warning(f"Anexo {caminho_anexo.name} excede o limite.")
-                    st.warning(f"Anexo {caminho_anexo.name} muito grande, ignorado.")
-                    try: os.remove(caminho_temporario_str)
-                    except: pass
+                    progresso.avisar(f"Anexo {caminho_anexo.name} muito grande, ignorado.")
                     continue
-
-                with open(caminho_temporario_str, "rb") as f:
-                    conteudo_bytes = f.read()
-
-                try: os.remove(caminho_temporario_str)
-                except: pass 
-
-                conteudo_b64 = base64.b64encode(conteudo_bytes).decode('utf-8')
+                with etapa("leitura_anexo"):
+                    conteudo_bytes = ler_anexo(caminho_anexo)
                 tipo_mime, _ = mimetypes.guess_type(caminho_anexo.name)
-
                 payload_email["attachments"].append({
                     "@odata.type": "#microsoft.graph.fileAttachment",
                     "name": caminho_anexo.name,
                     "contentType": tipo_mime or "application/octet-stream",
-                    "contentBytes": conteudo_b64
+                    "contentBytes": base64.b64encode(conteudo_bytes).decode('utf-8')
                 })
-                
-                tamanho_total_anexos += tamanho_arquivo
-
+                tamanho_total_anexos += len(conteudo_bytes)
             except Exception as e:
                 logging.error(f"Erro CRÍTICO ao processar anexo {caminho_anexo.name}: {e}", exc_info=True)
-                st.warning(f"Erro ao anexar {caminho_anexo.name}: {e}")
-                if caminho_temporario_str and os.path.exists(caminho_temporario_str):
-                    try: os.remove(caminho_temporario_str)
-                    except: pass
+                progresso.avisar(f"Erro ao anexar {caminho_anexo.name}: {e}")
         else:
              logging.warning(f"Anexo não encontrado ou caminho inválido: {caminho_anexo}")
+    progresso.notificar(progresso.ANEXOS_CARREGADOS, anexos=len(payload_email["attachments"]))
+    return payload_email
+def separar_anexos_por_tamanho(anexos: List[caminho]) -> Tuple[List[caminho], List[caminho]]:
+    """Separa anexos que cabem inline no JSON dos que exigem sessão de upload do Graph.
+
+    Além do limite por arquivo (anexo_inline_max_bytes), a soma dos anexos inline da
+    mensagem, já em base64, fica dentro de anexos_inline_total_max_bytes: o Graph recusa
+    requisições (e sub-requisições de $batch) acima de ~4 MB. O que passar do orçamento
+    vai por sessão de upload, na ordem dos anexos.
+    """
+    limite = int(GRAPH_CONFIGS.get("anexo_inline_max_bytes", 3 * 1024 * 1024))
+    orcamento = int(GRAPH_CONFIGS.get("anexos_inline_total_max_bytes", 3 * 1024 * 1024))
+    inline, grandes = [], []
+    for caminho_anexo in anexos:
+        try:
+            if caminho_anexo and caminho_anexo.exists():
+                tamanho = caminho_anexo.stat().st_size
+                if tamanho > limite or _tamanho_base64(tamanho) > orcamento:
+                    grandes.append(caminho_anexo)
+                    continue
+                orcamento -= _tamanho_base64(tamanho)
+        except OSError as e:
+            logging.warning(f"Não foi possível obter o tamanho de {caminho_anexo}: {e}")
+        inline.append(caminho_anexo)
+    return inline, grandes
+def anexar_por_sessao_upload(token_acesso: str, id_mensagem: str, caminho_anexo: caminho) -> None:
+    """Anexa um arquivo grande a um rascunho existente via createUploadSession.
+
+    O arquivo é lido do disco em blocos e enviado com Content-Range, sem carregar
+    o conteúdo inteiro em memória nem codificá-lo em base64.
+
+    Raises:
+        ErroProcessamento: Em caso de falha ao abrir a sessão ou enviar algum bloco.
+    """
+    tamanho = caminho_anexo.stat().st_size
+    limite = int(GRAPH_CONFIGS.get("anexo_max_bytes", 150 * 1024 * 1024))
+    if tamanho > limite:
+        raise ErroProcessamento(f"Anexo {caminho_anexo.name} excede o limite de {limite // (1024 * 1024)} MB.")
+    tipo_mime, _ = mimetypes.guess_type(caminho_anexo.name)
+    corpo_sessao = {"AttachmentItem": {
+        "attachmentType": "file",
+        "name": caminho_anexo.name,
+        "size": tamanho,
+        "contentType": tipo_mime or "application/octet-stream"
+    }}
+    cliente = obter_cliente_graph(token_acesso)
+    tamanho_bloco = int(GRAPH_CONFIGS.get("upload_bloco_bytes", 10 * 320 * 1024))
     try:
-        response = requests.post(graph_url, headers=headers, json=payload_email)
-        if response.status_code == 201:
-            logging.info(f"Rascunho criado com sucesso para {destinatario or 'sem destinatário'}")
-            return True
-        else:
-            detalhes_erro = response.json().get('error', {})
-            mensagem_erro = detalhes_erro.get('message', 'Erro desconhecido da API Graph.')
-            logging.error(f"Erro ao criar rascunho via Graph API ({response.status_code}) para {destinatario}: {response.text}")
-            raise ErroProcessamento(f"Erro da API ao criar rascunho ({response.status_code}): {mensagem_erro}")
+        # Repetir só abre outra sessão de upload; nenhum anexo é duplicado.
+        response = cliente.post(f"{url_mensagens()}/{id_mensagem}/attachments/createUploadSession", json=corpo_sessao, idempotente=True)
+        if response.status_code not in (200, 201):
+            logging.error(f"Erro ao abrir sessão de upload para {caminho_anexo.name} ({response.status_code}): {response.text}")
+            raise ErroProcessamento(f"Erro da API ao abrir sessão de upload ({response.status_code}) para {caminho_anexo.name}.")
+        url_upload = response.json().get("uploadUrl")
+        inicio = 0
+        for bloco in ler_anexo_em_blocos(caminho_anexo, tamanho_bloco):
+            if inicio + len(bloco) > tamanho:
+                raise ErroProcessamento(f"Anexo {caminho_anexo.name} mudou de tamanho durante o upload.")
+            fim = inicio + len(bloco) - 1
+            resposta_bloco = cliente.put_sem_autenticacao(url_upload, data=bloco, headers={
+                'Content-Type': 'application/octet-stream',
+                'Content-Length': str(len(bloco)),
+                'Content-Range': f"bytes {inicio}-{fim}/{tamanho}"
+            })
+            if resposta_bloco.status_code not in (200, 201):
+                logging.error(f"Falha no upload de {caminho_anexo.name} (bytes {inicio}-{fim}): {resposta_bloco.status_code} {resposta_bloco.text}")
+                raise ErroProcessamento(f"Erro da API no upload de {caminho_anexo.name} ({resposta_bloco.status_code}).")
+            inicio = fim + 1
+        if inicio < tamanho:
+            raise ErroProcessamento(f"Anexo {caminho_anexo.name} terminou antes do tamanho esperado.")
+        logging.info(f"Anexo {caminho_anexo.name} ({tamanho} bytes) enviado via sessão de upload.")
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Erro de conexão durante upload de {caminho_anexo.name}: {e}")
+        raise ErroProcessamento(f"Erro de conexão no upload de {caminho_anexo.name}: {e}")
+def _anexar_grandes(token_acesso: str, id_mensagem: Optional[str], grandes: List[caminho]) -> None:
+    if not grandes:
+        return
+    if not id_mensagem:
+        raise ErroProcessamento("Rascunho criado sem id retornado; anexos grandes não enviados.")
+    for caminho_anexo in grandes:
+        try:
+            with etapa("upload_anexo"):
+                anexar_por_sessao_upload(token_acesso, id_mensagem, caminho_anexo)
+        except ErroProcessamento as e:
+            raise ErroProcessamento(_descartar_rascunho_incompleto(token_acesso, id_mensagem, f"o anexo {caminho_anexo.name} falhou: {e}"))
+def _descartar_rascunho_incompleto(token_acesso: str, id_mensagem: str, motivo: str) -> str:
+    """Apaga o rascunho que ficou sem um anexo, para o reenvio não deixar duplicata.
+
+    Returns:
+        Mensagem de erro para o item: diz se o rascunho foi descartado ou, se não deu,
+        o id a remover manualmente.
+    """
+    try:
+        response = obter_cliente_graph(token_acesso).delete(f"{url_mensagens()}/{quote(id_mensagem)}")
+        if response.status_code in (200, 204, 404):
+            logging.info(f"Rascunho {id_mensagem} descartado: {motivo}")
+            return f"Rascunho descartado porque {motivo}"
+        logging.error(f"Não foi possível descartar o rascunho {id_mensagem} ({response.status_code}): {response.text}")
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Erro de conexão ao descartar o rascunho {id_mensagem}: {e}")
+    return f"Rascunho {id_mensagem} criado incompleto ({motivo}); remova-o da caixa antes de reenviar."
+def criar_rascunho_graph(token_acesso: str, destinatario: str, assunto: str, corpo: str, anexos: List[caminho]) -> bool:
+    """Cria um rascunho de e-mail na caixa do usuário logado via MS Graph API.
+
+    Anexos acima de GRAPH_CONFIGS["anexo_inline_max_bytes"] são enviados depois da
+    criação do rascunho, por sessão de upload.
+
+    Raises:
+        ErroProcessamento: Em caso de falha na criação do rascunho ou ausência de token.
+    """
+    if not token_acesso:
+        logging.error("Tentativa de criar rascunho sem token de acesso.")
+        raise ErroProcessamento("Token de acesso inválido ou ausente.")
+    cliente = obter_cliente_graph(token_acesso)
+    anexos_inline, anexos_grandes = separar_anexos_por_tamanho(anexos)
+    payload_email = montar_payload_rascunho(destinatario, assunto, corpo, anexos_inline)
+    try:
+        with etapa("graph_post"):
+            response = cliente.post(url_mensagens(), json=payload_email)
     except requests.exceptions.RequestException as e:
         logging.error(f"Erro de conexão com a API Graph ao criar rascunho: {e}")
         raise ErroProcessamento(f"Erro de conexão ao tentar criar rascunho: {e}")
-    except Exception as e:
-        logging.error(f"Erro inesperado em create_graph_draft: {e}", exc_info=True)
-        raise ErroProcessamento(f"Erro inesperado ao criar rascunho: {e}")
+    if response.status_code != 201:
+        try:
+            mensagem_erro = response.json().get('error', {}).get('message', 'Erro desconhecido da API Graph.')
+        except ValueError:
+            mensagem_erro = 'Erro desconhecido da API Graph.'
+        logging.error(f"Erro ao criar rascunho via Graph API ({response.status_code}) para {destinatario}: {response.text}")
+        raise ErroProcessamento(f"Erro da API ao criar rascunho ({response.status_code}): {mensagem_erro}")
+    logging.info(f"Rascunho criado com sucesso para {destinatario or 'sem destinatário'}")
+    if anexos_grandes:
+        _anexar_grandes(token_acesso, response.json().get("id"), anexos_grandes)
+    return True
+def _bytes_json(texto: Any) -> int:
+    """Bytes de `texto` serializado em JSON (não-ASCII vira escape), sem serializá-lo."""
+    return len(str(texto or "").encode("ascii", "backslashreplace"))
+
+def _tamanho_base64(tamanho: int) -> int:
+    return 4 * ((tamanho + 2) // 3)
+
+def estimar_tamanho_mensagem(assunto: str, corpo: str, anexos_inline: List[caminho]) -> int:
+    """Bytes aproximados do JSON da mensagem antes de ler os anexos (pelo tamanho em disco)."""
+    total = 1024 + _bytes_json(assunto) + _bytes_json(corpo)
+    for caminho_anexo in anexos_inline:
+        try:
+            total += 256 + _tamanho_base64(caminho_anexo.stat().st_size)
+        except (OSError, AttributeError):
+            continue
+    return total
+
+def _tamanho_payload(payload: Dict[str, Any]) -> int:
+    """Bytes aproximados de um payload já montado (o base64 dos anexos domina)."""
+    total = 1024 + _bytes_json(payload.get("subject")) + _bytes_json((payload.get("body") or {}).get("content"))
+    for anexo in payload.get("attachments") or []:
+        total += 256 + len(anexo.get("contentBytes") or "")
+    return total
+
+def _agrupar_lotes(indices: List[int], tamanhos: List[int], max_itens: int, max_bytes: int) -> List[List[int]]:
+    """Agrupa índices em lotes de até `max_itens` requisições e `max_bytes` de payload."""
+    lotes: List[List[int]] = []
+    atual: List[int] = []
+    bytes_atual = 0
+    for i in indices:
+        if atual and (len(atual) >= max_itens or bytes_atual + tamanhos[i] > max_bytes):
+            lotes.append(atual)
+            atual, bytes_atual = [], 0
+        atual.append(i)
+        bytes_atual += tamanhos[i]
+    if atual:
+        lotes.append(atual)
+    return lotes
+def _enviar_envelope(cliente: Any, lote: List[int], payloads: List[Dict[str, Any]], resultados: List[Dict[str, Optional[str]]]) -> Tuple[List[int], float]:
+    """Envia um envelope $batch e atualiza `resultados` dos índices do lote.
+
+    O throttling do envelope inteiro já é retentado pelo ClienteGraph; aqui só voltam para
+    reenvio as sub-requisições que o Graph recusou com 429 (ou throttling com Retry-After),
+    ou seja, que certamente não criaram a mensagem. Falha de conexão, 5xx e sub-resposta
+    ausente são definitivas: o rascunho pode ter sido criado e reenviar o duplicaria.
+
+    Returns:
+        (índices a reenviar, maior Retry-After recebido).
+    """
+    url = url_mensagens()
+    corpo_lote = {"requests": [
+        {"id": str(i), "method": "POST", "url": url,
+         "headers": {"Content-Type": "application/json"}, "body": payloads[i]}
+        for i in lote
+    ]}
+    try:
+        with etapa("graph_lote"):
+            response = cliente.post(GRAPH_BATCH_URL, json=corpo_lote)
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Erro de conexão com a API Graph ao enviar lote: {e}")
+        for i in lote:
+            resultados[i]["erro"] = f"Erro de conexão ao tentar criar rascunho: {e}"
+        return [], 0.0
+    if response.status_code != 200:
+        logging.error(f"Lote $batch rejeitado ({response.status_code}): {response.text}")
+        for i in lote:
+            resultados[i]["erro"] = f"Erro da API ao criar rascunho em lote ({response.status_code})."
+        return [], 0.0
+    retentar: List[int] = []
+    espera = 0.0
+    respondidos = set()
+    for sub in response.json().get("responses", []):
+        try:
+            i = int(sub.get("id"))
+        except (TypeError, ValueError):
+            continue
+        respondidos.add(i)
+        status = int(sub.get("status", 0))
+        if status == 201:
+            resultados[i] = {"id": (sub.get("body") or {}).get("id"), "erro": None}
+            continue
+        mensagem = (sub.get("body") or {}).get("error", {}).get("message", "Erro desconhecido da API Graph.")
+        resultados[i]["erro"] = f"Erro da API ao criar rascunho ({status}): {mensagem}"
+        retry_after = segundos_retry_after(sub.get("headers"))
+        if status == 429 or (status in STATUS_THROTTLE and retry_after > 0):
+            logging.warning(f"Sub-requisição {i} do lote recusada por throttling ({status}): {mensagem}")
+            retentar.append(i)
+            espera = max(espera, retry_after)
+        else:
+            logging.error(f"Sub-requisição {i} do lote falhou ({status}): {mensagem}")
+    for i in lote:
+        if i not in respondidos:
+            resultados[i]["erro"] = "O Graph não devolveu resposta para este rascunho no lote."
+    return retentar, espera
+def criar_rascunhos_em_lote(token_acesso: str, payloads: List[Dict[str, Any]], ao_concluir: Optional[Callable[[int, Dict[str, Optional[str]]], None]] = None) -> List[Dict[str, Optional[str]]]:
+    """Cria vários rascunhos usando envelopes JSON $batch do Graph (até 20 por chamada).
+
+    Cada sub-resposta é mapeada de volta ao índice do payload. Apenas as sub-requisições
+    recusadas por throttling (ver _enviar_envelope) são reenviadas, respeitando o
+    Retry-After, até o maior entre `batch_tentativas` e `max_tentativas`.
+    `ao_concluir(indice, resultado)` é chamado assim que cada payload chega ao estado
+    final (criado, erro definitivo ou tentativas esgotadas), envelope a envelope.
+
+    Returns:
+        Lista alinhada com `payloads` de dicionários {"id": id da mensagem, "erro": mensagem};
+        "erro" é None quando o rascunho foi criado.
+
+    Raises:
+        ErroProcessamento: Se o token estiver ausente.
+    """
+    if not token_acesso:
+        logging.error("Tentativa de criar rascunhos em lote sem token de acesso.")
+        raise ErroProcessamento("Token de acesso inválido ou ausente.")
+    cliente = obter_cliente_graph(token_acesso)
+    max_itens = min(int(GRAPH_CONFIGS.get("batch_tamanho", 20)), 20)
+    max_bytes = int(GRAPH_CONFIGS.get("batch_max_bytes", 4 * 1024 * 1024))
+    tentativas = max(1, int(GRAPH_CONFIGS.get("batch_tentativas", 5)), int(GRAPH_CONFIGS.get("max_tentativas", 5)))
+    tamanhos = [_tamanho_payload(p) for p in payloads]
+    resultados: List[Dict[str, Optional[str]]] = [{"id": None, "erro": "Rascunho não processado."} for _ in payloads]
+    pendentes = list(range(len(payloads)))
+    for tentativa in range(1, tentativas + 1):
+        retentar: List[int] = []
+        espera = 0.0
+        for lote in _agrupar_lotes(pendentes, tamanhos, max_itens, max_bytes):
+            retentar_lote, espera_lote = _enviar_envelope(cliente, lote, payloads, resultados)
+            retentar.extend(retentar_lote)
+            espera = max(espera, espera_lote)
+            if ao_concluir:
+                for i in lote:
+                    if i not in retentar_lote or tentativa == tentativas:
+                        ao_concluir(i, resultados[i])
+        pendentes = sorted(set(retentar))
+        if not pendentes:
+            break
+        if tentativa == tentativas:
+            for i in pendentes:
+                logging.error(f"Rascunho {i} do lote ainda recusado por throttling após {tentativas} tentativas: {resultados[i]['erro']}")
+        if tentativa < tentativas:
+            espera = espera or espera_com_jitter(tentativa)
+            logging.warning(f"{len(pendentes)} rascunhos serão reenviados em {espera:.1f}s (tentativa {tentativa + 1}/{tentativas}).")
+            cliente.aguardar_throttle(espera)
+    return resultados
 def renderizar_email_modelo(tipo_relatorio: str, row: Dict[str, Any], dados_comuns: Dict[str, Any], config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    templates = carregar_templates_email()
+    """Renderiza o e-mail de uma única linha (usado na prévia)."""
+    contexto = preparar_contextos(pd.DataFrame([row]), tipo_relatorio, dados_comuns, config)[0]
+    return renderizar_contexto(tipo_relatorio, contexto, dados_comuns, config)
+def renderizar_contexto(tipo_relatorio: str, context: Dict[str, Any], dados_comuns: Dict[str, Any], config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Renderiza um contexto já preparado por relatorios.preparar_contextos.
+
+    Faz apenas o que depende da linha: escolha da variante, busca dos anexos e render
+    dos templates compilados. Retorna None quando a variante é SKIP.
+    """
+    templates = obter_templates()
     template_key = "LFRES" if tipo_relatorio.startswith("LFRES") else tipo_relatorio
     report_config = templates.get(template_key)
     if not report_config:
         raise ErroProcessamento(f"Template para '{template_key}' não encontrado.")
-    context = {**row, **dados_comuns, **config}
-    context.update({
-        "empresa": row.get("Empresa"),
-        "mesext": dados_comuns.get("mes_long"),
-        "mes": dados_comuns.get("mes_num"),
-        "ano": dados_comuns.get("ano"),
-        "data": row.get("Data"),
-        "assinatura": dados_comuns.get("analista"),
-        "valor": converter_numero_br(row.get("Valor", 0))
-    })
-    logging.info(f"Processando {context.get('empresa', 'N/A')} - Tipo: {tipo_relatorio} - Valor original: '{row.get('Valor', 0)}' -> Parseado: {context.get('valor', 'N/A')}")
-    if tipo_relatorio in PROCESSADORES_RELATORIO:
-        handler_func = PROCESSADORES_RELATORIO[tipo_relatorio]
-        try:
-            context = handler_func(context, row, config, tipo_relatorio=tipo_relatorio, parsed_valor=context.get('valor'))
-        except Exception as e:
-             logging.error(f"Erro no handler específico {tipo_relatorio}: {e}")
-    else:
-        try:
-            context = processador_generico_relatorio(context, row, config, tipo_relatorio=tipo_relatorio)
-        except Exception as e:
-             logging.error(f"Erro no handler genérico {tipo_relatorio}: {e}")
     selected_template, variant_name = definir_variante_template(template_key, report_config, context)
     logging.info(f"Variante selecionada para {context.get('empresa')}: {variant_name}")
     if variant_name == "SKIP":
         logging.info(f"Pulando {context.get('empresa')} (lógica da variante SKIP)")
         return None
-    for key in ["valor", "ValorLiquidacao", "ValorLiquidado", "ValorInadimplencia"]:
-        if key in context and context[key] is not None:
-            try:
-                 if not isinstance(context[key], str) or "R$" not in context[key]:
-                      context[key] = formatar_moeda(context[key])
-            except Exception:
-                 logging.warning(f"Não foi possível formatar '{key}' como moeda para {context.get('empresa')}.")
-                 context[key] = str(context[key])
-    date_keys = ["data", "dataaporte", "data_liquidacao"]
-    for key in date_keys:
-        if key in context and context.get(key) is not None:
-             context[key] = formatar_data(context[key])
     anexos = []
-    nome_arquivo = gerar_nome_arquivo(str(row.get("Empresa","Desconhecida")), tipo_relatorio, dados_comuns.get("mes_long", "").upper(), str(dados_comuns.get("ano","")))
+    nome_arquivo = gerar_nome_arquivo(str(context.get("Empresa","Desconhecida")), tipo_relatorio, dados_comuns.get("mes_long", "").upper(), str(dados_comuns.get("ano","")))
     main_cache = config.get("_pdf_cache_main", {})
-    caminho = main_cache.get(nome_arquivo.upper())
+    caminho = main_cache.get(normalizar_nome_anexo(nome_arquivo))
     if caminho:
         anexos.append(caminho)
         logging.info(f"Anexo principal encontrado (Cache) para {context.get('empresa')}: {nome_arquivo}")
@@ -193,9 +398,9 @@ def renderizar_email_modelo(tipo_relatorio: str, row: Dict[str, Any], dados_comu
     else:
         logging.debug(f"Anexo não encontrado no cache e sem diretório configurado: {nome_arquivo}")
     if tipo_relatorio == "GFN001":
-        nome_arquivo_sum = gerar_nome_arquivo(str(row.get("Empresa","Desconhecida")), "SUM001", dados_comuns.get("mes_long", "").upper(), str(dados_comuns.get("ano","")))
+        nome_arquivo_sum = gerar_nome_arquivo(str(context.get("Empresa","Desconhecida")), "SUM001", dados_comuns.get("mes_long", "").upper(), str(dados_comuns.get("ano","")))
         sum_cache = config.get("_pdf_cache_sumario", {})
-        sum_caminho = sum_cache.get(nome_arquivo_sum.upper())
+        sum_caminho = sum_cache.get(normalizar_nome_anexo(nome_arquivo_sum))
         if sum_caminho:
             anexos.append(sum_caminho)
             logging.info(f"Anexo SUM001 encontrado (Cache): {nome_arquivo_sum}")
@@ -204,31 +409,29 @@ def renderizar_email_modelo(tipo_relatorio: str, row: Dict[str, Any], dados_comu
     assunto_tpl = selected_template.get("assunto_template", f"{tipo_relatorio} - {context.get('empresa')}") # Default mais seguro
     corpo_tpl = selected_template.get("corpo_html", "")
     if tipo_relatorio == "LFN001":
-        situacao_lfn = str(row.get("Situacao","")).strip().lower()
-        logging.info(f"LFN001 Debug - Empresa: {context.get('empresa')}, Situacao (raw): '{row.get('Situacao')}', Situacao (norm): '{situacao_lfn}'")
+        situacao_lfn = str(context.get("Situacao","")).strip().lower()
+        logging.info(f"LFN001 Debug - Empresa: {context.get('empresa')}, Situacao (raw): '{context.get('Situacao')}', Situacao (norm): '{situacao_lfn}'")
         if "crédito" in situacao_lfn or "credito" in situacao_lfn:
             corpo_tpl = selected_template.get("corpo_html_credit", corpo_tpl)
         elif "débito" in situacao_lfn or "debito" in situacao_lfn:
             corpo_tpl = selected_template.get("corpo_html_debit", corpo_tpl)
     logging.debug(f"Contexto final para renderização ({context.get('empresa')}): {context}")
-    env = Environment(loader=BaseLoader())
-    def normalize(s: str):
-        return re.sub(r"\{(\w+)\}", r"{{ \1 }}", s) if isinstance(s, str) else s
-    variaveis_ausentes = []
+    modelo_assunto, _, erro_assunto = obter_modelo_compilado(assunto_tpl)
+    modelo_corpo, vars_nao_declaradas, erro_corpo = obter_modelo_compilado(corpo_tpl)
+    variaveis_ausentes = list(vars_nao_declaradas)
+    for k in vars_nao_declaradas:
+        if k not in context:
+            context[k] = f"[{k} N/D]"
+            logging.warning(f"Placeholder '{k}' não encontrado no contexto para {context.get('empresa')}.")
     try:
-        parsed_corpo = env.parse(normalize(corpo_tpl))
-        vars_nao_declaradas = meta.find_undeclared_variables(parsed_corpo)
-        variaveis_ausentes = list(vars_nao_declaradas)
-        for k in vars_nao_declaradas:
-            if k not in context:
-                context[k] = f"[{k} N/D]"
-                logging.warning(f"Placeholder '{k}' não encontrado no contexto para {context.get('empresa')}.")
-    except Exception as e:
-        logging.error(f"Erro ao analisar template Jinja2 para {context.get('empresa')}: {e}")
-        corpo_tpl = f"<p>Erro ao processar o template do e-mail: {e}</p>"
-    try:
-        assunto = env.from_string(normalize(assunto_tpl)).render(context)
-        corpo = env.from_string(normalize(corpo_tpl)).render(context)
+        if erro_assunto:
+            raise ErroProcessamento(erro_assunto)
+        assunto = modelo_assunto.render(context)
+        if erro_corpo:
+            logging.error(f"Erro ao analisar template Jinja2 para {context.get('empresa')}: {erro_corpo}")
+            corpo = f"<p>Erro ao processar o template do e-mail: {erro_corpo}</p>"
+        else:
+            corpo = modelo_corpo.render(context)
     except Exception as e:
         logging.error(f"Erro ao renderizar template Jinja2 para {context.get('empresa')}: {e}", exc_info=True)
         assunto = f"ERRO NO TEMPLATE - {tipo_relatorio} - {context.get('empresa')}"
@@ -245,6 +448,129 @@ def renderizar_email_modelo(tipo_relatorio: str, row: Dict[str, Any], dados_comu
         "final_data": context
     }
     return result
+# (contexto, e-mail renderizado, erro); e-mail None sem erro = variante SKIP.
+ItemRenderizado = Tuple[Dict[str, Any], Optional[Dict[str, Any]], Optional[Exception]]
+
+# Chaves da config lidas por renderizar_contexto; só elas seguem para os processos do render.
+_CHAVES_CONFIG_RENDER = ("diretorio_pdfs", "_pdf_cache_main", "_pdf_cache_sumario")
+# Pool de render compartilhado pelo processo: criado no primeiro envio grande e reaproveitado
+# pelos seguintes (e pelas tarefas simultâneas), para não pagar o spawn a cada envio.
+_pool_render: Dict[str, Any] = {"pool": None, "repasse_log": None}
+_trava_pool_render = threading.Lock()
+
+class _RepasseLog(logging.Handler):
+    """Entrega aos loggers deste processo os registros vindos dos processos do render."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        logging.getLogger(record.name if record.name != "root" else None).handle(record)
+
+def _inicializar_processo_render(fila_log: Any, nivel_log: int) -> None:
+    """Prepara um processo do pool: log de volta ao processo principal e templates compilados.
+
+    O sanitizador é criado no primeiro uso (um por thread, ver seguranca.sanitizar_html).
+    """
+    raiz = logging.getLogger()
+    raiz.handlers[:] = [logging.handlers.QueueHandler(fila_log)]
+    raiz.setLevel(nivel_log)
+    obter_templates()
+
+def _obter_pool_render(processos: int) -> ProcessPoolExecutor:
+    """Pool de render do processo, criado na primeira chamada."""
+    with _trava_pool_render:
+        if _pool_render["pool"] is None:
+            contexto_mp = multiprocessing.get_context(RENDER_CONFIGS.get("metodo_inicio") or None)
+            fila_log = contexto_mp.Queue()
+            repasse_log = logging.handlers.QueueListener(fila_log, _RepasseLog())
+            repasse_log.start()
+            _pool_render["repasse_log"] = repasse_log
+            _pool_render["pool"] = ProcessPoolExecutor(
+                max_workers=processos, mp_context=contexto_mp, initializer=_inicializar_processo_render,
+                initargs=(fila_log, logging.getLogger().getEffectiveLevel())
+            )
+        return _pool_render["pool"]
+
+def encerrar_pool_render() -> None:
+    """Encerra o pool de render compartilhado (se existir); o próximo envio grande cria outro."""
+    with _trava_pool_render:
+        pool, repasse_log = _pool_render["pool"], _pool_render["repasse_log"]
+        _pool_render.update(pool=None, repasse_log=None)
+    if pool is not None:
+        # Espera os processos saírem para o último log chegar ao repasse antes de fechá-lo.
+        pool.shutdown(wait=True, cancel_futures=True)
+    if repasse_log is not None:
+        repasse_log.stop()
+
+atexit.register(encerrar_pool_render)
+
+def _renderizar_fatia(tipo_relatorio: str, dados_comuns: Dict[str, Any], config: Dict[str, Any], fatia: List[Dict[str, Any]]) -> List[Tuple[Optional[Dict[str, Any]], Optional[Tuple[bool, str]], float]]:
+    """Roda no processo do pool: renderiza a fatia em ordem, devolvendo (e-mail, erro, segundos) por contexto.
+
+    O erro volta como (é ErroProcessamento?, mensagem) para não depender de a exceção ser serializável.
+    """
+    saida = []
+    for context in fatia:
+        inicio = time.perf_counter()
+        try:
+            saida.append((renderizar_contexto(tipo_relatorio, context, dados_comuns, config), None, time.perf_counter() - inicio))
+        except Exception as e:
+            saida.append((None, (isinstance(e, ErroProcessamento), str(e)), time.perf_counter() - inicio))
+    return saida
+
+def _renderizar_sequencial(tipo_relatorio: str, contextos: List[Dict[str, Any]], dados_comuns: Dict[str, Any], config: Dict[str, Any]) -> Iterator[ItemRenderizado]:
+    for context in contextos:
+        try:
+            with empresa(context.get("Empresa")), etapa("render"):
+                dados_email = renderizar_contexto(tipo_relatorio, context, dados_comuns, config)
+        except Exception as e:
+            yield context, None, e
+            continue
+        yield context, dados_email, None
+
+def renderizar_contextos(tipo_relatorio: str, contextos: List[Dict[str, Any]], dados_comuns: Dict[str, Any], config: Dict[str, Any]) -> Iterator[ItemRenderizado]:
+    """Renderiza os contextos e os devolve na ordem original, como (contexto, e-mail, erro).
+
+    Abaixo de RENDER_CONFIGS["limiar_contextos"] empresas o render roda nesta thread.
+    Acima disso, os contextos vão em fatias para o pool de processos compartilhado (ver
+    _obter_pool_render), cada fatia levando só a parte da config que o render usa; o log
+    dos processos volta para os handlers deste. Cada fatia é devolvida assim que
+    termina, mantida a ordem, e já alimenta o envio (ver _enviar_em_fluxo). Se o pool
+    falhar, ele é descartado e o restante é renderizado aqui mesmo.
+    """
+    processos = max(1, int(RENDER_CONFIGS.get("processos") or 1))
+    if processos <= 1 or len(contextos) < int(RENDER_CONFIGS.get("limiar_contextos", 200)):
+        yield from _renderizar_sequencial(tipo_relatorio, contextos, dados_comuns, config)
+        return
+    tamanho = int(RENDER_CONFIGS.get("tamanho_fatia") or max(1, -(-len(contextos) // (processos * 4))))
+    fatias = [contextos[i:i + tamanho] for i in range(0, len(contextos), tamanho)]
+    config_render = {chave: config[chave] for chave in _CHAVES_CONFIG_RENDER if chave in config}
+    logging.info(f"Renderizando {len(contextos)} empresas em {len(fatias)} fatias no pool de {processos} processos.")
+    medicao = medicao_atual()
+    entregues = 0
+    falha: Optional[Exception] = None
+    futuros: List[Any] = []
+    try:
+        pool = _obter_pool_render(processos)
+        futuros = [pool.submit(_renderizar_fatia, tipo_relatorio, dados_comuns, config_render, fatia) for fatia in fatias]
+        for fatia, futuro in zip(fatias, futuros):
+            saida = futuro.result()
+            for context, (dados_email, erro, segundos) in zip(fatia, saida):
+                if medicao:
+                    medicao.registrar("render", segundos, context.get("Empresa"))
+                excecao = (ErroProcessamento if erro[0] else RuntimeError)(erro[1]) if erro else None
+                # O processo preencheu os placeholders ausentes na sua cópia do contexto.
+                yield (dados_email["final_data"] if dados_email else context), dados_email, excecao
+                entregues += 1
+    except Exception as e:
+        falha = e
+    finally:
+        # Interrompido ou com falha: libera o pool das fatias deste envio ainda na fila.
+        for futuro in futuros:
+            futuro.cancel()
+    if falha is not None:
+        if isinstance(falha, BrokenProcessPool):
+            encerrar_pool_render()
+        logging.warning(f"Render em processos falhou ({falha}); renderizando as {len(contextos) - entregues} empresas restantes nesta thread.")
+        yield from _renderizar_sequencial(tipo_relatorio, contextos[entregues:], dados_comuns, config)
 def gerar_nome_arquivo(company: str, tipo_relatorio: str, mes: str, ano: str) -> str:
     company_clean = str(company).strip()
     company_part = re.sub(r"[\s_-]+", "_", company_clean).upper()
@@ -276,7 +602,7 @@ def definir_variante_template(tipo_relatorio: str, report_config: Dict[str, Any]
             return merged, variant_name
     # Lógica específica para LFRES
     if tipo_relatorio.startswith("LFRES"):
-        raw_val = context.get("valor", 0.0)
+        raw_val = context.get("valor_numerico", context.get("valor", 0.0))
         try:
             valor = float(raw_val)
         except (ValueError, TypeError):
@@ -300,39 +626,103 @@ def definir_variante_template(tipo_relatorio: str, report_config: Dict[str, Any]
         return variantes.get("ZERO_VALOR", {}), "ZERO_VALOR"
     first_key = next(iter(variantes), "Padrao")
     return variantes.get(first_key, report_config), first_key
-def carregar_e_processar_dados(config: Dict[str, Any]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+def mapa_colunas_dados(config: Dict[str, Any]) -> Dict[str, str]:
+    """{cabeçalho na planilha: coluna padronizada} a partir de config["colunas_dados"]."""
+    return dict(item.split(":") for item in config["colunas_dados"].split(","))
+def carregar_e_processar_dados(config: Dict[str, Any], df_bruto: Optional[pd.DataFrame] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Lê a tabela de dados e os contatos; com `df_bruto`, só recorta dele as colunas do relatório."""
     cabecalho = int(config.get("linha_cabecalho", 0))
-    logging.info(f"Carregando dados de: {config['excel_dados']}")
-    df_dados = ler_dados_excel(config["excel_dados"], config["planilha_dados"], cabecalho)
-    logging.info(f"Carregando contatos de: {config['excel_contatos']}")
-    df_contatos = ler_dados_excel(config["excel_contatos"], config["planilha_contatos"], 0)
-    column_mapping = dict(item.split(":") for item in config["colunas_dados"].split(","))
+    column_mapping = mapa_colunas_dados(config)
+    if df_bruto is None:
+        logging.info(f"Carregando dados de: {config['excel_dados']}")
+        with etapa("excel_dados"):
+            df_dados = ler_tabela_excel_em_cache(config["excel_dados"], config["planilha_dados"], cabecalho, colunas=column_mapping.keys(), motor=config.get("motor_excel"))
+    else:
+        alvo = {str(c).strip() for c in column_mapping}
+        df_dados = df_bruto[[c for c in df_bruto.columns if str(c).strip() in alvo]].copy()
+    with etapa("excel_contatos"):
+        contatos = obter_contatos(config["excel_contatos"], config["planilha_contatos"])
     df_dados.rename(columns=column_mapping, inplace=True)
-    df_contatos.rename(columns={
-        "AGENTE": "Empresa", 
-        "ANALISTA": "Analista", 
-        "E-MAILS RELATÓRIOS CCEE": "Email"
-    }, inplace=True)
-    return df_dados, df_contatos
+    return tipar_colunas_relatorio(df_dados), contatos
 def _indexar_diretorio(directory: str) -> Dict[str, caminho]:
     """
-    Lista todos os arquivos PDF de um diretório e retorna um dicionário
-    { "NOME_DO_ARQUIVO.PDF": caminho_Completo } para busca rápida (O(1)).
-    A chave é armazenada em MAIÚSCULO para garantir busca case-insensitive.
+    Retorna o índice { "NOME_NORMALIZADO.PDF": caminho_Completo } dos PDFs do diretório
+    para busca O(1). A listagem só é refeita quando o mtime da pasta muda
+    (ver arquivos.indexar_diretorio_pdfs).
     """
     if not directory:
         return {}
-    caminho_obj = caminho(directory)
-    if not caminho_obj.exists():
-        logging.warning(f"Tentativa de indexar diretório inexistente: {directory}")
-        return {}
-    cache = {f.name.upper(): f for f in caminho_obj.glob("*.pdf")}
-    logging.info(f"Diretório indexado: {directory} ({len(cache)} arquivos encontrados)")
-    return cache
+    return indexar_diretorio_pdfs(directory)
+def atualizar_indices_pdf(tipo_relatorio: str, config: Dict[str, Any]) -> None:
+    """Preenche/atualiza os índices de PDFs da configuração (barato se as pastas não mudaram)."""
+    if "diretorio_pdfs" in config:
+        config["_pdf_cache_main"] = _indexar_diretorio(config["diretorio_pdfs"])
+        if tipo_relatorio == "GFN001":
+            base_dir = caminho(config["diretorio_pdfs"])
+            try:
+                if base_dir.parent and base_dir.parent.parent:
+                    sum_dir = base_dir.parent.parent / "Sumário" / "SUM001 - Memória_de_Cálculo"
+                    if sum_dir.exists():
+                        config["_pdf_cache_sumario"] = _indexar_diretorio(str(sum_dir))
+                    else:
+                        logging.warning(f"Diretório de sumário não encontrado: {sum_dir}")
+            except Exception as e:
+                logging.error(f"Erro ao tentar indexar diretório de sumários: {e}")
+def assinatura_dados_relatorio(config: Dict[str, Any]) -> Tuple[Optional[int], ...]:
+    """mtimes dos arquivos que alimentam um dataset preparado (dados, contatos e configuração).
+
+    Usada para decidir se um resultado de _preparar_dados_relatorio guardado em cache
+    ainda corresponde aos arquivos em disco.
+    """
+    def _mtime(caminho_arquivo: Optional[str]) -> Optional[int]:
+        try:
+            return os.stat(caminho_arquivo).st_mtime_ns if caminho_arquivo else None
+        except OSError:
+            return None
+    return tuple(_mtime(c) for c in (config.get("excel_dados"), config.get("excel_contatos"), str(CONFIG_FILE)))
 def _preparar_dados_relatorio(tipo_relatorio: str, analista: str, mes: str, ano: str, user_info: Optional[Dict[str, Any]] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
     """
     Função interna para carregar configs e dados.
     A decisão de usar caminho de REDE ou LOCAL agora é feita automaticamente pelo config_manager.
+    Os tempos de cada etapa vão para a medição ativa; sem uma (ex.: prévia), ficam em
+    config["_tempos_preparo"] até o primeiro envio que reaproveitar os dados.
+    """
+    return _medir_preparo(_resolver_e_carregar, tipo_relatorio, analista, mes, ano, user_info)
+def preparar_dados_config(tipo_relatorio: str, analista: str, config: Dict[str, Any]) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Como _preparar_dados_relatorio, mas para uma config com os caminhos já resolvidos.
+
+    Lê os dados e os contatos de config["excel_dados"]/["excel_contatos"] e indexa
+    config["diretorio_pdfs"], sem consultar config_relatorios.json nem o SharePoint.
+    """
+    return _medir_preparo(_carregar_dados_config, tipo_relatorio, analista, config)
+def _medir_preparo(funcao, *args: Any) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    externa = medicao_atual()
+    medicao = MedicaoExecucao()
+    with ativar_medicao(medicao):
+        df_filtrado, config = funcao(*args)
+    if externa is not None:
+        externa.incorporar(medicao.spans)
+    else:
+        config["_tempos_preparo"] = list(medicao.spans)
+    return df_filtrado, config
+def _resolver_e_carregar(tipo_relatorio: str, analista: str, mes: str, ano: str, user_info: Optional[Dict[str, Any]]) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    config = resolver_config_relatorio(tipo_relatorio, mes, ano, user_info)
+    return _carregar_dados_config(tipo_relatorio, analista, config)
+def copiar_dados_preparados(dados_preparados: Tuple[pd.DataFrame, Dict[str, Any]]) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Cópia independente de um (DataFrame, config) preparado, para entregar a outra thread.
+
+    Os tempos de preparo passam para a cópia e saem do original, para que só o primeiro
+    envio que reaproveitar os dados os contabilize.
+    """
+    df_filtrado, config = dados_preparados
+    copia = copy.deepcopy(config)
+    config.pop("_tempos_preparo", None)
+    return df_filtrado.copy(), copia
+def resolver_config_relatorio(tipo_relatorio: str, mes: str, ano: str, user_info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Config do relatório com os caminhos do mês (dados, contatos, PDFs) já resolvidos.
+
+    Raises:
+        ErroProcessamento: Se o relatório não estiver configurado.
     """
     all_configs = carregar_configuracoes()
     config = all_configs.get(tipo_relatorio)
@@ -344,46 +734,261 @@ def _preparar_dados_relatorio(tipo_relatorio: str, analista: str, mes: str, ano:
     username_rede = email_usuario.split("@")[0] if (email_usuario and "@" in email_usuario) else None
     if username_rede:
         logging.info(f"Usuário identificado para preferência de caminhos: {username_rede}")
-    try:
+    with etapa("caminhos"):
         caminhos = construir_caminhos_relatorio(tipo_relatorio, ano, mes, username=username_rede)
-        config.update(caminhos)
-        df_dados, df_contatos = carregar_e_processar_dados(config)
+    config.update(caminhos)
+    return config
+def _carregar_dados_config(tipo_relatorio: str, analista: str, config: Dict[str, Any]) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    df_dados, contatos = carregar_base_relatorio(tipo_relatorio, config)
+    return filtrar_dados_analista(tipo_relatorio, analista, config, df_dados, contatos)
+def carregar_base_relatorio(tipo_relatorio: str, config: Dict[str, Any], df_bruto: Optional[pd.DataFrame] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Parte da preparação que não depende do analista: dados, contatos, células fixas e PDFs.
+
+    `df_bruto` é a tabela já lida da planilha (ver carregar_e_processar_dados), para
+    relatórios que compartilham a mesma pasta de trabalho.
+
+    Raises:
+        ErroProcessamento: Se os arquivos não forem encontrados ou não puderem ser lidos.
+    """
+    try:
+        df_dados, contatos = carregar_e_processar_dados(config, df_bruto=df_bruto)
+        with etapa("celulas_fixas"):
+            carregar_celulas_fixas(tipo_relatorio, config)
     except FileNotFoundError as e:
         logging.error(f"Arquivos não encontrados (nem rede nem local): {e}")
         raise ErroProcessamento(f"Arquivos base não encontrados. Verifique a existência das pastas ou arquivos Excel.")
     except Exception as e:
          logging.error(f"Erro inesperado ao carregar dados iniciais: {e}", exc_info=True)
          raise ErroProcessamento(f"Erro inesperado ao carregar dados: {e}")
-    if "diretorio_pdfs" in config:
-        config["_pdf_cache_main"] = _indexar_diretorio(config["diretorio_pdfs"])
-        if tipo_relatorio == "GFN001":
-            base_dir = caminho(config["diretorio_pdfs"])
-            try:
-                if base_dir.parent and base_dir.parent.parent:
-                    sum_dir = base_dir.parent.parent / "Sumário" / "SUM001 - Memória_de_Cálculo"
-                    if sum_dir.exists():
-                        config["_pdf_cache_sumario"] = _indexar_diretorio(str(sum_dir))
-                    else:
-                        logging.warning(f"Diretório de sumário não encontrado: {sum_dir}")
-            except Exception as e:
-                logging.error(f"Erro ao tentar indexar diretório de sumários: {e}")
-    df_merged = pd.merge(df_dados, df_contatos, on="Empresa", how="left")
-    if "Analista" not in df_merged.columns:
+    with etapa("indices_pdf"):
+        atualizar_indices_pdf(tipo_relatorio, config)
+    if "Analista" not in contatos["df"].columns:
         raise ErroProcessamento("Coluna 'Analista' ausente nos dados. Verifique a configuração e a planilha de contatos.")
-    df_filtrado = df_merged[df_merged["Analista"] == analista].copy()
+    return df_dados, contatos
+def filtrar_dados_analista(tipo_relatorio: str, analista: str, config: Dict[str, Any], df_dados: pd.DataFrame, contatos: Dict[str, Any]) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Junta os dados do relatório com os contatos do analista (config recebe `_agentes_sem_dados`)."""
+    with etapa("juncao_contatos"):
+        df_filtrado, sem_dados = juntar_contatos_analista(df_dados, contatos, analista)
+    config["_agentes_sem_dados"] = sem_dados
+    if sem_dados:
+        logging.warning(f"{len(sem_dados)} agente(s) de '{analista}' sem linha no relatório {tipo_relatorio}: {', '.join(sem_dados)}")
     if df_filtrado.empty:
         logging.warning(f"Nenhum dado encontrado para o analista '{analista}' após filtro.")
         return df_filtrado, config
-    missing_email_mask = df_filtrado["Email"].isna() | (df_filtrado["Email"].str.strip() == "")
-    if missing_email_mask.any():
-        df_filtrado.loc[missing_email_mask, "Email"] = "EMAIL_NAO_ENCONTRADO"
+    # O índice de contatos já guarda o Email sem espaços e com vazios como NaN.
+    if "Email" in df_filtrado.columns:
+        df_filtrado["Email"] = df_filtrado["Email"].fillna("EMAIL_NAO_ENCONTRADO")
     return df_filtrado, config
-def informa_processos(tipo_relatorio: str, analista: str, mes: str, ano: str, token_acesso: str, user_info: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+# Situação de cada resultado publicado durante o envio (mesmos nomes dos estados de progresso).
+SITUACAO_CRIADO = progresso.RASCUNHO_CRIADO
+SITUACAO_FALHOU = progresso.FALHOU
+SITUACAO_IGNORADO = progresso.IGNORADO
+
+AoResultado = Callable[[Dict[str, Any]], None]
+AoConcluirItem = Callable[[Dict[str, Any]], None]
+
+def _criar_rascunho_item(token_acesso: str, item: Dict[str, Any], ao_concluir: Optional[AoConcluirItem] = None) -> Dict[str, Any]:
+    """Cria o rascunho de um item já renderizado, registrando o erro no próprio item."""
+    with empresa(item["row"].get("Empresa")):
+        _criar_rascunho_item_medido(token_acesso, item)
+        if ao_concluir:
+            ao_concluir(item)
+        return item
+def _criar_rascunho_item_medido(token_acesso: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    dados_email = item["dados_email"]
+    try:
+        criar_rascunho_graph(
+            token_acesso,
+            item["destinatario"],
+            dados_email["assunto"],
+            dados_email["corpo"],
+            dados_email["anexos"]
+        )
+        item["criado"] = True
+        progresso.notificar(progresso.RASCUNHO_CRIADO)
+    except ErroProcessamento as e:
+        item["erro"] = str(e)
+        logging.error(f"Falha ao criar rascunho para {item['row'].get('Empresa')}: {e}")
+    except Exception as e:
+        item["erro"] = str(e)
+        logging.error(f"Erro inesperado ao criar rascunho para {item['row'].get('Empresa')}: {e}", exc_info=True)
+    if item.get("erro"):
+        progresso.notificar(progresso.FALHOU, erro=item["erro"])
+    return item
+def _preparar_item_lote(item: Dict[str, Any], ao_concluir: Optional[AoConcluirItem] = None) -> Optional[int]:
+    """Separa os anexos do item (inline x sessão de upload) e estima o tamanho da mensagem.
+
+    Nada é lido do disco aqui. Devolve None (e conclui o item como falha) se não der.
+    """
+    dados_email = item["dados_email"]
+    try:
+        with empresa(item["row"].get("Empresa")):
+            item["anexos_inline"], item["anexos_grandes"] = separar_anexos_por_tamanho(dados_email["anexos"])
+            return estimar_tamanho_mensagem(dados_email["assunto"], dados_email["corpo"], item["anexos_inline"])
+    except Exception as e:
+        item["erro"] = str(e)
+        logging.error(f"Erro ao montar rascunho para {item['row'].get('Empresa')}: {e}", exc_info=True)
+        progresso.notificar(progresso.FALHOU, empresa=item["row"].get("Empresa"), erro=item["erro"])
+        if ao_concluir:
+            ao_concluir(item)
+        return None
+def _enviar_rascunhos_em_lote(token_acesso: str, itens: List[Dict[str, Any]], ao_concluir: Optional[AoConcluirItem] = None) -> List[Dict[str, Any]]:
+    """Monta os payloads dos itens e os envia via $batch, marcando sucesso/erro em cada item.
+
+    Chamado com os itens de um envelope (ver _enviar_em_fluxo), para que só os anexos em
+    base64 desse envelope fiquem em memória. `ao_concluir(item)` é chamado assim que o
+    item chega ao estado final.
+    """
+    prontos = []
+    payloads = []
+    for item in itens:
+        if "anexos_inline" not in item and _preparar_item_lote(item, ao_concluir) is None:
+            continue
+        dados_email = item["dados_email"]
+        try:
+            with empresa(item["row"].get("Empresa")):
+                payloads.append(montar_payload_rascunho(item["destinatario"], dados_email["assunto"], dados_email["corpo"], item.pop("anexos_inline")))
+            prontos.append(item)
+        except Exception as e:
+            item["erro"] = str(e)
+            logging.error(f"Erro ao montar rascunho para {item['row'].get('Empresa')}: {e}", exc_info=True)
+            progresso.notificar(progresso.FALHOU, empresa=item["row"].get("Empresa"), erro=item["erro"])
+            if ao_concluir:
+                ao_concluir(item)
+
+    def finalizar(indice: int, resultado: Dict[str, Optional[str]]) -> None:
+        item = prontos[indice]
+        erro = resultado["erro"]
+        with empresa(item["row"].get("Empresa")):
+            if erro is None:
+                try:
+                    _anexar_grandes(token_acesso, resultado["id"], item.pop("anexos_grandes", []))
+                    item["criado"] = True
+                    progresso.notificar(progresso.RASCUNHO_CRIADO)
+                except ErroProcessamento as e:
+                    erro = str(e)
+            if erro is not None:
+                item["erro"] = erro
+                logging.error(f"Falha ao criar rascunho para {item['row'].get('Empresa')}: {erro}")
+                progresso.notificar(progresso.FALHOU, erro=erro)
+            if ao_concluir:
+                ao_concluir(item)
+
+    if prontos:
+        criar_rascunhos_em_lote(token_acesso, payloads, ao_concluir=finalizar)
+    return itens
+def _enviar_em_fluxo(token_acesso: str, itens: Iterator[Dict[str, Any]], modo: str, max_workers: int, ao_concluir: Optional[AoConcluirItem] = None) -> None:
+    """Cria os rascunhos à medida que `itens` (o render) os produz, sem esperar o render inteiro.
+
+    Os itens passam por uma fila limitada, consumida por threads de envio: no modo
+    "individual", até `max_workers` threads (e o limite por caixa) criam um rascunho
+    cada; no modo "lote", uma thread junta os itens e despacha um envelope $batch a cada
+    `batch_tamanho` itens ou `batch_max_bytes` estimados pelo tamanho dos anexos, ou
+    assim que o render fica `lote_espera_max_s` sem produzir; os anexos só são lidos e
+    codificados na hora de montar o envelope.
+    A fila cheia segura o render, então a memória fica limitada a alguns envelopes.
+    `ao_concluir(item)` é chamado na thread de envio, assim que o item termina.
+    """
+    if modo == "lote":
+        consumidores = 1
+        capacidade = 2 * min(int(GRAPH_CONFIGS.get("batch_tamanho", 20)), 20)
+    else:
+        consumidores = max(1, min(int(max_workers or 1), int(GRAPH_CONFIGS.get("limite_concorrencia_caixa", 4))))
+        capacidade = 2 * consumidores
+    fila: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=capacidade)
+
+    def consumir_individual() -> None:
+        while True:
+            item = fila.get()
+            if item is None:
+                return
+            _criar_rascunho_item(token_acesso, item, ao_concluir)
+
+    def consumir_lote() -> None:
+        max_itens = min(int(GRAPH_CONFIGS.get("batch_tamanho", 20)), 20)
+        max_bytes = int(GRAPH_CONFIGS.get("batch_max_bytes", 4 * 1024 * 1024))
+        espera_max = float(GRAPH_CONFIGS.get("lote_espera_max_s", 0.2))
+        pendentes: List[Dict[str, Any]] = []
+        bytes_pendentes = 0
+        while True:
+            try:
+                item = fila.get(timeout=espera_max if pendentes else None)
+            except queue.Empty:
+                item = False
+            tamanho = _preparar_item_lote(item, ao_concluir) if item else None
+            # O envelope sai quando o próximo item não cabe nele, no fim, ou quando o render para.
+            if pendentes and (not item or (tamanho is not None and bytes_pendentes + tamanho > max_bytes)):
+                _enviar_rascunhos_em_lote(token_acesso, pendentes, ao_concluir)
+                pendentes, bytes_pendentes = [], 0
+            if tamanho is not None:
+                pendentes.append(item)
+                bytes_pendentes += tamanho
+                if len(pendentes) >= max_itens:
+                    _enviar_rascunhos_em_lote(token_acesso, pendentes, ao_concluir)
+                    pendentes, bytes_pendentes = [], 0
+            if item is None:
+                return
+
+    alvo = consumir_lote if modo == "lote" else consumir_individual
+    logging.info(f"Envio em fluxo no modo '{modo}' com {consumidores} thread(s) de envio.")
+    # Cada thread leva uma cópia do contexto, para as etapas caírem na medição do envio.
+    threads = [threading.Thread(target=vincular_contexto(alvo), name=f"graph-rascunho-{n}", daemon=True) for n in range(consumidores)]
+    for thread in threads:
+        thread.start()
+    try:
+        for item in itens:
+            fila.put(item)
+    finally:
+        for _ in threads:
+            fila.put(None)
+        for thread in threads:
+            thread.join()
+def _resultado_empresa(row: Dict[str, Any], situacao: str, destinatario: Optional[str] = None, anexos: int = 0, erro: Optional[str] = None) -> Dict[str, Any]:
+    """Resultado publicado para uma empresa (linha da tabela de resultados)."""
+    return {
+        "empresa": row.get("Empresa", "N/A"),
+        "data": row.get("data") or formatar_data(row.get("Data")),
+        "valor": formatar_moeda(row.get("Valor", 0)),
+        "email": destinatario if destinatario is not None else row.get("Email", ""),
+        "contagem_anexos": anexos,
+        "situacao_envio": situacao,
+        "erro": erro,
+    }
+def informa_processos(tipo_relatorio: str, analista: str, mes: str, ano: str, token_acesso: str, user_info: Optional[Dict[str, Any]] = None, max_workers: Optional[int] = None, modo_envio: Optional[str] = None, dados_preparados: Optional[Tuple[pd.DataFrame, Dict[str, Any]]] = None, medicao: Optional[MedicaoExecucao] = None, ao_resultado: Optional[AoResultado] = None) -> List[Dict[str, Any]]:
     """
     Processa relatórios, renderiza e-mails e tenta criar rascunhos via API Graph.
+
+    O envio começa enquanto o render ainda corre (ver _enviar_em_fluxo). No modo "lote" os
+    rascunhos vão em envelopes $batch; no modo "individual" são criados em paralelo por até
+    `max_workers` threads, respeitando o limite por caixa do Graph. Os padrões vêm de GRAPH_CONFIGS.
+    `dados_preparados` permite reaproveitar o (DataFrame, config) já carregado na prévia.
+    Os tempos por etapa vão para `medicao` (criada aqui se não for informada) e são
+    gravados em MEDICOES_CONFIGS["arquivo_jsonl"] ao final.
+
+    `ao_resultado(resultado)` recebe o resultado de cada empresa assim que ela termina
+    (criada, ignorada ou com falha, ver "situacao_envio"), possivelmente de outra thread.
+    O retorno traz apenas os rascunhos criados, na ordem em que terminaram.
     """
+    medicao = medicao or MedicaoExecucao(tipo=tipo_relatorio, analista=analista, mes=mes, ano=str(ano))
+    try:
+        with ativar_medicao(medicao):
+            resultados = _processar_envio(tipo_relatorio, analista, mes, ano, token_acesso, user_info, max_workers, modo_envio, dados_preparados, ao_resultado)
+    finally:
+        resumo = medicao.gravar_jsonl()
+    logging.info(f"Tempos por etapa ({resumo['execucao']}): " + ", ".join(f"{nome}={dados['total_s']:.2f}s" for nome, dados in resumo["etapas"].items()))
+    return resultados
+def _processar_envio(tipo_relatorio: str, analista: str, mes: str, ano: str, token_acesso: str, user_info: Optional[Dict[str, Any]], max_workers: Optional[int], modo_envio: Optional[str], dados_preparados: Optional[Tuple[pd.DataFrame, Dict[str, Any]]], ao_resultado: Optional[AoResultado] = None) -> List[Dict[str, Any]]:
     logging.info(f"Iniciando processamento: {tipo_relatorio}, Analista: {analista}, {mes}/{ano}")
-    df_filtrado, config = _preparar_dados_relatorio(tipo_relatorio, analista, mes, ano, user_info=user_info)
+    if dados_preparados is not None:
+        df_filtrado, config = dados_preparados
+        # ler_celula grava as células fixas na config: trabalha numa cópia rasa para não
+        # alterar a do chamador.
+        config = {**config,
+                  "_celulas_planilha": dict(config.get("_celulas_planilha", {})),
+                  "_celulas_consultadas": set(config.get("_celulas_consultadas", ()))}
+        medicao_atual().incorporar(config.pop("_tempos_preparo", []))
+    else:
+        df_filtrado, config = _preparar_dados_relatorio(tipo_relatorio, analista, mes, ano, user_info=user_info)
     if df_filtrado.empty:
         return []
     dados_comuns = {
@@ -397,58 +1002,86 @@ def informa_processos(tipo_relatorio: str, analista: str, mes: str, ano: str, to
     render_errors = 0
     api_errors = 0
     skipped_count = 0
+    trava = threading.Lock()
+    medicao = medicao_atual()
+
+    def publicar(resultado: Dict[str, Any]) -> None:
+        # Chamado do laço de render e das threads de envio; a contagem fica sob a trava.
+        nonlocal contagem_criados
+        resultado["tempo_s"] = round(medicao.tempo_empresa(resultado["empresa"]), 3) if medicao else None
+        with trava:
+            if resultado["situacao_envio"] == SITUACAO_CRIADO:
+                contagem_criados += 1
+                resultado["contagem_criados"] = contagem_criados
+                results_success.append(resultado)
+            else:
+                resultado["contagem_criados"] = contagem_criados
+        if ao_resultado:
+            try:
+                ao_resultado(resultado)
+            except Exception as e:
+                logging.warning(f"Falha ao publicar resultado de {resultado['empresa']}: {e}")
+
+    def concluir_item(item: Dict[str, Any]) -> None:
+        nonlocal api_errors
+        if not item.get("criado"):
+            with trava:
+                api_errors += 1
+        publicar(_resultado_empresa(
+            item["row"], SITUACAO_CRIADO if item.get("criado") else SITUACAO_FALHOU,
+            destinatario=item["destinatario"], anexos=len(item["dados_email"].get("anexos", [])), erro=item.get("erro")
+        ))
+
     if not token_acesso:
         logging.error("Erro: Token de acesso ausente ao tentar enviar rascunhos.")
         raise ErroProcessamento("Usuário não autenticado. Não é possível criar rascunhos.")
-    for idx, row in df_filtrado.iterrows():
-        try:
-            logging.info(f"--- Processando Linha {idx+1}/{len(df_filtrado)}: {row.get('Empresa', 'N/A')} ---")
-            dados_email = renderizar_email_modelo(tipo_relatorio, row.to_dict(), dados_comuns, config)
-            if dados_email is None:
-                skipped_count += 1
-                continue
-            destinatario_email = row.get("Email", "")
-            # Validação simples antes de chamar a API
-            if not destinatario_email or "EMAIL_NAO_ENCONTRADO" in destinatario_email:
-                 logging.warning(f"E-mail inválido para {row.get('Empresa')}. Pulando.")
-                 api_errors += 1
-                 continue
+    # Os contadores da caixa são do processo; o log mostra só o que mudou durante este envio.
+    metricas_antes = obter_metricas_graph(token_acesso)
+    with etapa("contextos"):
+        contextos = preparar_contextos(df_filtrado, tipo_relatorio, dados_comuns, config)
+    total = len(contextos)
+    progresso.notificar(progresso.PREPARADO, total=total, empresas=[c.get("Empresa") for c in contextos])
+
+    def itens_renderizados() -> Iterator[Dict[str, Any]]:
+        # Produz os itens prontos para envio; ignorados e falhas de render são publicados aqui.
+        nonlocal render_errors, api_errors, skipped_count
+        for idx, (context, dados_email, erro_render) in enumerate(renderizar_contextos(tipo_relatorio, contextos, dados_comuns, config)):
             try:
-                criar_rascunho_graph(
-                    token_acesso,
-                    destinatario_email,
-                    dados_email["assunto"],
-                    dados_email["corpo"],
-                    dados_email["anexos"]
-                )
-                contagem_criados += 1
-                data_final = dados_email.get("final_data", {}).get("data") or row.get("Data")
-                results_success.append({
-                    "empresa": row.get("Empresa", "N/A"),
-                    "data": formatar_data(data_final),
-                    "valor": formatar_moeda(row.get("Valor", 0)),
-                    "email": destinatario_email,
-                    "contagem_anexos": len(dados_email.get("anexos", [])),
-                    "contagem_criados": contagem_criados
-                })
-            except ErroProcessamento as e:
-                api_errors += 1
-                logging.error(f"Falha ao criar rascunho para {row.get('Empresa')}: {e}")
-        except ErroProcessamento as rpe:
-             render_errors += 1
-             logging.error(f"Erro processamento: {rpe}")
-             continue
-        except Exception as e:
-            render_errors += 1
-            logging.error(f"Erro inesperado: {e}")
-            continue
-    logging.info(f"Fim do processamento. Criados: {contagem_criados}. Erros Render: {render_errors}. Erros API: {api_errors}")
+                logging.info(f"--- Processando Linha {idx+1}/{total}: {context.get('Empresa', 'N/A')} ---")
+                if erro_render is not None:
+                    raise erro_render
+                if dados_email is None:
+                    skipped_count += 1
+                    progresso.notificar(progresso.IGNORADO, empresa=context.get("Empresa"))
+                    publicar(_resultado_empresa(context, SITUACAO_IGNORADO))
+                    continue
+                destinatario_email = context.get("Email", "")
+                # Validação simples antes de chamar a API
+                if not destinatario_email or "EMAIL_NAO_ENCONTRADO" in destinatario_email:
+                     logging.warning(f"E-mail inválido para {context.get('Empresa')}. Pulando.")
+                     with trava:
+                         api_errors += 1
+                     progresso.notificar(progresso.FALHOU, empresa=context.get("Empresa"), erro="E-mail não encontrado.")
+                     publicar(_resultado_empresa(context, SITUACAO_FALHOU, destinatario="", erro="E-mail não encontrado."))
+                     continue
+                progresso.notificar(progresso.RENDERIZADO, empresa=context.get("Empresa"))
+            except ErroProcessamento as rpe:
+                 render_errors += 1
+                 logging.error(f"Erro processamento: {rpe}")
+                 progresso.notificar(progresso.FALHOU, empresa=context.get("Empresa"), erro=str(rpe))
+                 publicar(_resultado_empresa(context, SITUACAO_FALHOU, erro=str(rpe)))
+                 continue
+            except Exception as e:
+                render_errors += 1
+                logging.error(f"Erro inesperado: {e}")
+                progresso.notificar(progresso.FALHOU, empresa=context.get("Empresa"), erro=str(e))
+                publicar(_resultado_empresa(context, SITUACAO_FALHOU, erro=str(e)))
+                continue
+            yield {"row": context, "dados_email": dados_email, "destinatario": destinatario_email}
+
+    modo = modo_envio or GRAPH_CONFIGS.get("modo_envio", "individual")
+    workers = max_workers if max_workers is not None else GRAPH_CONFIGS.get("max_workers", 1)
+    _enviar_em_fluxo(token_acesso, itens_renderizados(), modo, workers, ao_concluir=concluir_item)
+    logging.info(f"Fim do processamento. Criados: {contagem_criados}. Ignorados: {skipped_count}. Erros Render: {render_errors}. Erros API: {api_errors}")
+    logging.info(f"Métricas Graph da caixa neste envio: {metricas_desde(metricas_antes, token_acesso)}")
     return results_success
-def visualizar_previa_dados(tipo_relatorio: str, analista: str, mes: str, ano: str, user_info: Optional[Dict[str, Any]] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
-    """
-    Carrega dados para pré-visualização.
-    """
-    df_filtrado, config = _preparar_dados_relatorio(tipo_relatorio, analista, mes, ano, user_info=user_info)
-    if df_filtrado.empty:
-        raise ErroProcessamento(f"Nenhum registro encontrado para o analista '{analista}'")
-    return df_filtrado, config
\ No newline at end of file
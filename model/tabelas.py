@@ -1,5 +1,5 @@
 import pandas as pd
-from apps.relatorios_ccee.model.utils_dados import formatar_moeda, formatar_data
+from apps.relatorios_ccee.model.utils_dados import formatar_serie_moeda, formatar_serie_data
 
 def tratar_valores_df(df: pd.DataFrame, colunas_moeda=None, colunas_data=None, mapa_preenchimento=None):
 
@@ -9,9 +9,10 @@ def tratar_valores_df(df: pd.DataFrame, colunas_moeda=None, colunas_data=None, m
 
     for col in df.columns:
         if col in colunas_moeda or any(v in col.lower() for v in ["valor", "inadimplência"]):
-            df[col] = df[col].apply(lambda x: "R$ 0,00" if pd.isna(x) or x in [None, 0, 0.0, "0", "0.0", "nan", "None"] else formatar_moeda(x))
+            # Vazios, zeros e textos não numéricos viram 'R$ 0,00'.
+            df[col] = formatar_serie_moeda(df[col])
         if col in colunas_data or "data" in col.lower():
-            df[col] = df[col].apply(lambda x: "Data não informada" if pd.isna(x) else formatar_data(x))
+            df[col] = formatar_serie_data(df[col])
         if col in mapa_preenchimento:
             df[col] = df[col].fillna(mapa_preenchimento[col])
-    return df
\ No newline at end of file
+    return df
@@ -0,0 +1,164 @@
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Callable
+from apps.relatorios_ccee.configuracoes.constantes import TAREFAS_CONFIGS
+from apps.relatorios_ccee.model.medicoes import MedicaoExecucao
+from apps.relatorios_ccee.model.arquivos import ErroProcessamento
+import apps.relatorios_ccee.model.progresso as progresso
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluida"
+FALHOU = "falhou"
+
+# Estados finais de uma empresa (não mudam mais dentro do envio).
+ESTADOS_FINAIS_EMPRESA = {progresso.RASCUNHO_CRIADO, progresso.FALHOU, progresso.IGNORADO}
+
+class Tarefa:
+    """Um envio em segundo plano e o progresso de cada empresa."""
+
+    def __init__(self, descricao: Dict[str, Any], dono: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.descricao = descricao
+        self.dono = dono
+        self.status = PENDENTE
+        self.criada_em = time.time()
+        self.iniciada_em: Optional[float] = None
+        self.concluida_em: Optional[float] = None
+        self.total: Optional[int] = None
+        self.empresas: Dict[str, Dict[str, Any]] = {}
+        self.resultados: List[Dict[str, Any]] = []
+        self.tempos: Optional[Dict[str, Any]] = None
+        self.erro: Optional[str] = None
+        self.avisos: List[str] = []
+        self.trava = threading.Lock()
+
+    def registrar_progresso(self, empresa: Optional[str], estado: str, detalhes: Dict[str, Any]) -> None:
+        """Ouvinte de progresso.notificar: guarda o estado mais recente de cada empresa."""
+        with self.trava:
+            if estado == progresso.PREPARADO:
+                # Soma: um envio em massa publica um PREPARADO por relatório/analista.
+                self.total = (self.total or 0) + int(detalhes.get("total") or 0)
+                for nome in detalhes.get("empresas") or []:
+                    self.empresas.setdefault(str(nome), {"estado": PENDENTE})
+                return
+            if estado == progresso.AVISO:
+                mensagem = detalhes.get("mensagem", "")
+                self.avisos.append(f"{empresa}: {mensagem}" if empresa is not None else mensagem)
+                return
+            if empresa is None:
+                return
+            entrada = self.empresas.setdefault(str(empresa), {"estado": PENDENTE})
+            if entrada["estado"] in ESTADOS_FINAIS_EMPRESA:
+                return
+            entrada["estado"] = estado
+            if detalhes.get("erro"):
+                entrada["erro"] = detalhes["erro"]
+            if "anexos" in detalhes:
+                entrada["anexos"] = detalhes["anexos"]
+
+    def registrar_resultado(self, resultado: Dict[str, Any]) -> None:
+        """Ouvinte de resultados (ao_resultado): acumula cada empresa assim que ela termina."""
+        with self.trava:
+            self.resultados.append(resultado)
+
+    def instantaneo(self) -> Dict[str, Any]:
+        """Cópia do estado atual, segura para ser lida por outra thread (ex.: a página)."""
+        with self.trava:
+            contagem: Dict[str, int] = {}
+            for entrada in self.empresas.values():
+                contagem[entrada["estado"]] = contagem.get(entrada["estado"], 0) + 1
+            finalizadas = sum(n for estado, n in contagem.items() if estado in ESTADOS_FINAIS_EMPRESA)
+            return {
+                "id": self.id,
+                "descricao": dict(self.descricao),
+                "dono": self.dono,
+                "status": self.status,
+                "criada_em": self.criada_em,
+                "iniciada_em": self.iniciada_em,
+                "concluida_em": self.concluida_em,
+                "total": self.total,
+                "finalizadas": finalizadas,
+                "contagem": contagem,
+                "empresas": {nome: dict(entrada) for nome, entrada in self.empresas.items()},
+                "resultados": list(self.resultados),
+                "tempos": self.tempos,
+                "erro": self.erro,
+                "avisos": list(self.avisos),
+            }
+
+_tarefas: Dict[str, Tarefa] = {}
+_trava = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+def _obter_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _trava:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=int(TAREFAS_CONFIGS.get("max_tarefas_simultaneas", 4)), thread_name_prefix="tarefa-envio")
+    return _executor
+
+def _descartar_antigas() -> None:
+    limite = time.time() - float(TAREFAS_CONFIGS.get("reter_concluidas_s", 6 * 3600))
+    with _trava:
+        for id_tarefa in [i for i, t in _tarefas.items() if t.concluida_em and t.concluida_em < limite]:
+            del _tarefas[id_tarefa]
+
+def _executar(tarefa: Tarefa, funcao: Callable[..., List[Dict[str, Any]]], kwargs: Dict[str, Any]) -> None:
+    medicao = MedicaoExecucao(**tarefa.descricao)
+    with tarefa.trava:
+        tarefa.status = EXECUTANDO
+        tarefa.iniciada_em = time.time()
+    try:
+        with progresso.ouvindo_progresso(tarefa.registrar_progresso):
+            funcao(medicao=medicao, ao_resultado=tarefa.registrar_resultado, **kwargs)
+        with tarefa.trava:
+            tarefa.status = CONCLUIDA
+    except Exception as e:
+        logging.error(f"Tarefa {tarefa.id} falhou: {e}", exc_info=True)
+        with tarefa.trava:
+            tarefa.erro = str(e)
+            tarefa.status = FALHOU
+    finally:
+        with tarefa.trava:
+            tarefa.tempos = medicao.resumo()
+            tarefa.concluida_em = time.time()
+        logging.info(f"Tarefa {tarefa.id} terminou com status '{tarefa.status}'.")
+
+def submeter(funcao: Callable[..., List[Dict[str, Any]]], descricao: Dict[str, Any], dono: Optional[str] = None, **kwargs: Any) -> str:
+    """Agenda `funcao(medicao=..., ao_resultado=..., **kwargs)` no pool de tarefas e devolve o id.
+
+    `funcao` deve aceitar os argumentos `medicao` e `ao_resultado` (como
+    servicos.informa_processos) e publicar o andamento com progresso.notificar. Os
+    resultados ficam na tarefa à medida que chegam, inclusive se ela falhar no meio.
+
+    Raises:
+        ErroProcessamento: Se o mesmo dono já tem uma tarefa pendente ou em execução com a
+            mesma descrição (um segundo clique criaria todos os rascunhos em dobro).
+    """
+    _descartar_antigas()
+    tarefa = Tarefa(descricao, dono=dono)
+    with _trava:
+        repetida = next((t for t in _tarefas.values() if t.dono == dono and t.descricao == descricao and t.status in (PENDENTE, EXECUTANDO)), None)
+        if repetida is not None:
+            logging.warning(f"Tarefa recusada: {descricao} já está em andamento na tarefa {repetida.id} (dono: {dono}).")
+            raise ErroProcessamento("Este envio já está em andamento; aguarde o término antes de enviar de novo.")
+        _tarefas[tarefa.id] = tarefa
+    _obter_executor().submit(_executar, tarefa, funcao, kwargs)
+    logging.info(f"Tarefa {tarefa.id} agendada: {descricao} (dono: {dono}).")
+    return tarefa.id
+
+def obter_tarefa(id_tarefa: str) -> Optional[Dict[str, Any]]:
+    """Instantâneo da tarefa, ou None se o id não existe (ou já foi descartado)."""
+    tarefa = _tarefas.get(id_tarefa)
+    return tarefa.instantaneo() if tarefa else None
+
+def listar_tarefas(dono: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Tarefas conhecidas (de um dono, se informado), das mais recentes para as mais antigas."""
+    with _trava:
+        tarefas = [t for t in _tarefas.values() if dono is None or t.dono == dono]
+    return [t.instantaneo() for t in sorted(tarefas, key=lambda t: t.criada_em, reverse=True)]
@@ -38,3 +38,93 @@ def formatar_data(date_value: Any) -> str:
         return pd.to_datetime(date_value).strftime("%d/%m/%Y")
     except (ValueError, TypeError):
         return "Data Inválida"
+
+def _mascara_texto(serie: pd.Series) -> pd.Series:
+    """Marca as posições da Series que guardam texto (str), sem percorrê-la em Python."""
+    try:
+        return serie.str.len().notna()
+    except AttributeError:
+        # Series object sem nenhum texto: o pandas recusa o acessor .str.
+        return pd.Series(False, index=serie.index)
+
+def converter_serie_br(serie: pd.Series, vazio: Optional[float] = 0.0) -> pd.Series:
+    """Equivalente de converter_numero_br para uma Series inteira.
+
+    Trata '(1.234,56)' como negativo, remove 'R$', NBSP, espaços e o separador de
+    milhar. Valores vazios ou inválidos viram `vazio` (0.0 por padrão; NaN para preservar
+    ausências). Números já numéricos são mantidos.
+    """
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype("float64")
+    # Colunas mistas (object) podem trazer floats do Excel ao lado de textos: esses
+    # não passam pela limpeza, senão o ponto decimal seria lido como milhar. O
+    # acessor .str devolve NaN para o que não é texto, o que separa os dois casos.
+    eh_texto = _mascara_texto(serie)
+    numeros = pd.to_numeric(serie.mask(eh_texto), errors="coerce")
+    texto = serie.astype("string").str.strip()
+    negativo = (texto.str.startswith("(") & texto.str.endswith(")")).fillna(False).astype(bool)
+    texto = texto.mask(negativo, texto.str[1:-1])
+    texto = (texto.str.replace("R$", "", regex=False).str.replace("r$", "", regex=False)
+             .str.replace("\xa0", "", regex=False).str.replace(" ", "", regex=False)
+             .str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+             .str.replace(r"[^0-9\.-]", "", regex=True))
+    convertidos = pd.to_numeric(texto, errors="coerce").astype("float64")
+    convertidos = convertidos.mask(negativo, -convertidos)
+    convertidos = convertidos.where(eh_texto, numeros)
+    ausente = serie.isna()
+    convertidos = convertidos.mask(convertidos.isna() & ~ausente, 0.0)
+    return convertidos.mask(ausente, vazio).astype("float64")
+
+COLUNAS_NUMERICAS = ["Valor", "ValorLiquidacao", "ValorLiquidado", "ValorInadimplencia"]
+COLUNAS_DATA = ["Data"]
+
+def tipar_colunas_relatorio(df: pd.DataFrame) -> pd.DataFrame:
+    """Converte as colunas padronizadas de valor para float e as de data para datetime."""
+    for col in COLUNAS_NUMERICAS:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = converter_serie_br(df[col], vazio=float("nan"))
+    for col in COLUNAS_DATA:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = _tipar_datas(df[col])
+    return df
+
+def _tipar_datas(serie: pd.Series) -> pd.Series:
+    """Converte uma coluna de datas mista (texto dd/mm/aaaa, ISO, datetime do Excel).
+
+    Células preenchidas que não viram data mantêm o valor original, para não serem
+    tratadas como ausentes mais adiante.
+    """
+    serie = serie.astype(object)
+    datas = _serie_para_datetime(serie, dayfirst=True)
+    ausente = serie.isna() | (serie.astype(str).str.strip() == "")
+    falhou = datas.isna() & ~ausente
+    if not falhou.any():
+        return datas
+    return datas.astype(object).mask(falhou, serie)
+
+_TROCA_SEPARADORES = str.maketrans(",.", ".,")
+
+def formatar_serie_moeda(serie: pd.Series) -> pd.Series:
+    """Equivalente de formatar_moeda para uma Series inteira; vazios/inválidos viram 'R$ 0,00'."""
+    valores = pd.to_numeric(serie, errors="coerce").fillna(0.0).astype("float64")
+    # Zera o que arredonda para zero (débito de valor zero, -0.001) para não virar 'R$ -0,00'.
+    valores = valores.mask(valores.abs() < 0.005, 0.0)
+    # A formatação fica por elemento de propósito: nem o operador % do NumPy nem o .str
+    # agrupam milhares, e inserir os pontos por regex custa ~5x mais que o f-string.
+    formatados = pd.Series([f"R$ {v:,.2f}" for v in valores.to_numpy()], index=serie.index, dtype=object)
+    return formatados.str.translate(_TROCA_SEPARADORES)
+
+def _serie_para_datetime(serie: pd.Series, dayfirst: bool = False) -> pd.Series:
+    try:
+        return pd.to_datetime(serie, errors="coerce", format="mixed", dayfirst=dayfirst)
+    except (TypeError, ValueError):
+        return pd.to_datetime(serie, errors="coerce", dayfirst=dayfirst)
+
+def formatar_serie_data(serie: pd.Series) -> pd.Series:
+    """Equivalente de formatar_data para uma Series inteira (dd/mm/aaaa)."""
+    serie = serie.astype(object)
+    datas = _serie_para_datetime(serie)
+    resultado = datas.dt.strftime("%d/%m/%Y").astype(object)
+    resultado[datas.isna()] = "Data Inválida"
+    resultado[serie.isna()] = "Data não informada"
+    return resultado
@@ -0,0 +1,57 @@
+import sys
+import types
+import importlib.util
+from pathlib import Path
+import pytest
+
+# O código importa a si mesmo como apps.relatorios_ccee (no projeto principal este
+# repositório fica em apps/). Rodando os testes direto neste checkout, registra-o com
+# esse nome antes de importar qualquer módulo.
+try:
+    import apps.relatorios_ccee  # noqa: F401
+except ModuleNotFoundError:
+    _raiz = Path(__file__).resolve().parent.parent
+    _apps = types.ModuleType("apps")
+    _apps.__path__ = []
+    sys.modules["apps"] = _apps
+    _spec = importlib.util.spec_from_file_location("apps.relatorios_ccee", _raiz / "__init__.py", submodule_search_locations=[str(_raiz)])
+    _pacote = importlib.util.module_from_spec(_spec)
+    sys.modules["apps.relatorios_ccee"] = _pacote
+    _spec.loader.exec_module(_pacote)
+    _apps.relatorios_ccee = _pacote
+
+from apps.relatorios_ccee.configuracoes.constantes import GRAPH_CONFIGS, INSTANTANEOS_CONFIGS
+from apps.relatorios_ccee.benchmarks.graph_simulado import ServidorGraphSimulado
+from apps.relatorios_ccee.model import cliente_graph
+
+@pytest.fixture(autouse=True)
+def instantaneos_isolados(tmp_path, monkeypatch):
+    """Instantâneos em disco num diretório temporário, nunca no cache/ do app."""
+    monkeypatch.setitem(INSTANTANEOS_CONFIGS, "diretorio", str(tmp_path / "instantaneos"))
+
+@pytest.fixture
+def graph(monkeypatch):
+    """Graph simulado local, sem latência, com retentativas e balde de tokens acelerados."""
+    with ServidorGraphSimulado(latencia_s=0.0, retry_after_s=0.01, semente=1) as servidor:
+        monkeypatch.setattr(cliente_graph, "GRAPH_BASE_URL", servidor.url)
+        monkeypatch.setitem(GRAPH_CONFIGS, "backoff_base_s", 0.01)
+        monkeypatch.setitem(GRAPH_CONFIGS, "taxa_requisicoes_por_segundo", 1000)
+        monkeypatch.setitem(GRAPH_CONFIGS, "rajada_requisicoes", 1000)
+        monkeypatch.setitem(GRAPH_CONFIGS, "caixa_postal", None)
+        yield servidor
+
+@pytest.fixture
+def token(request):
+    """Token único por teste: cada um ganha seu próprio limitador de caixa."""
+    return f"token-{request.node.nodeid}"
+
+@pytest.fixture
+def fixar_429(graph, monkeypatch):
+    """Troca o sorteio de 429 do Graph simulado por uma sequência fixa (depois dela, nunca 429).
+
+    No $batch, o primeiro sorteio é o do envelope e os seguintes, um por sub-requisição.
+    """
+    def fixar(sequencia):
+        valores = iter(sequencia)
+        monkeypatch.setattr(graph, "_sortear_429", lambda: next(valores, False))
+    return fixar
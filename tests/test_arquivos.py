@@ -0,0 +1,63 @@
+import os
+import time
+from datetime import datetime
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from apps.relatorios_ccee.model.arquivos import ErroProcessamento, extrair_celulas_excel, indexar_diretorio_pdfs, ler_anexo, ler_anexo_em_blocos
+
+ABA = "Dados"
+
+@pytest.fixture
+def planilha(tmp_path):
+    livro = Workbook()
+    folha = livro.active
+    folha.title = ABA
+    folha["A1"] = "Título"
+    folha["C3"] = 1234.56
+    folha["B5"] = datetime(2025, 3, 15)
+    folha["D5"] = "texto"
+    folha["A8"] = 7
+    caminho = tmp_path / "dados.xlsx"
+    livro.save(caminho)
+    return caminho
+
+def test_extrair_celulas_excel_equivale_a_read_excel_sem_cabecalho(planilha):
+    grade = pd.read_excel(planilha, sheet_name=ABA, header=None)
+    coordenadas = [(r, c) for r in range(grade.shape[0]) for c in range(grade.shape[1])]
+    extraidas = extrair_celulas_excel(str(planilha), ABA, coordenadas)
+    for r, c in coordenadas:
+        esperado = grade.iat[r, c]
+        if pd.isna(esperado):
+            assert extraidas[(r, c)] is None
+        else:
+            assert extraidas[(r, c)] == esperado
+
+def test_extrair_celulas_excel_omite_coordenadas_fora_da_planilha(planilha):
+    extraidas = extrair_celulas_excel(str(planilha), ABA, [(2, 2), (50, 0), (0, 30)])
+    assert extraidas == {(2, 2): 1234.56}
+
+def test_extrair_celulas_excel_arquivo_ausente(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        extrair_celulas_excel(str(tmp_path / "nao_existe.xlsx"), ABA, [(0, 0)])
+
+@pytest.mark.parametrize("ler", [ler_anexo, lambda caminho: b"".join(ler_anexo_em_blocos(caminho, 4))])
+def test_leitura_de_anexo_ausente_ou_diretorio_falha_sem_esperar(tmp_path, ler):
+    for caminho in (tmp_path / "ausente.pdf", tmp_path):
+        inicio = time.monotonic()
+        with pytest.raises(ErroProcessamento):
+            ler(caminho)
+        assert time.monotonic() - inicio < 0.4
+
+def test_ler_anexo_em_blocos_reconstroi_o_arquivo(tmp_path):
+    caminho = tmp_path / "a.pdf"
+    caminho.write_bytes(bytes(range(256)) * 3)
+    assert b"".join(ler_anexo_em_blocos(caminho, 100)) == caminho.read_bytes()
+
+def test_indice_de_pdfs_acompanha_o_mtime_da_pasta(tmp_path):
+    (tmp_path / "Empresa A_SUM001_mar_25.pdf").write_bytes(b"%PDF")
+    assert list(indexar_diretorio_pdfs(str(tmp_path))) == ["EMPRESA_A_SUM001_MAR_25.PDF"]
+    (tmp_path / "EMPRESA-B_SUM001_mar_25.pdf").write_bytes(b"%PDF")
+    futuro = time.time() + 5
+    os.utime(tmp_path, (futuro, futuro))
+    assert sorted(indexar_diretorio_pdfs(str(tmp_path))) == ["EMPRESA_A_SUM001_MAR_25.PDF", "EMPRESA_B_SUM001_MAR_25.PDF"]
@@ -0,0 +1,45 @@
+import os
+import time
+import pandas as pd
+from openpyxl import Workbook
+from apps.relatorios_ccee.model.contatos import COLUNAS_CONTATOS, juntar_contatos_analista, obter_contatos
+
+ABA = "Planilha1"
+
+def _gravar_contatos(caminho, linhas):
+    livro = Workbook()
+    folha = livro.active
+    folha.title = ABA
+    folha.append(list(COLUNAS_CONTATOS.keys()))
+    for linha in linhas:
+        folha.append(linha)
+    livro.save(caminho)
+
+def test_contatos_sao_reaproveitados_ate_o_arquivo_mudar(tmp_path):
+    caminho = tmp_path / "contatos.xlsx"
+    _gravar_contatos(caminho, [["Agente A", "Ana", "a@x.com"]])
+    primeira = obter_contatos(str(caminho), ABA)
+    assert obter_contatos(str(caminho), ABA) is primeira
+    _gravar_contatos(caminho, [["Agente A", "Ana", "a@x.com"], ["Agente B", "Ana", "b@x.com"]])
+    futuro = time.time() + 5
+    os.utime(caminho, (futuro, futuro))
+    segunda = obter_contatos(str(caminho), ABA)
+    assert segunda is not primeira
+    assert len(segunda["df"]) == 2
+
+def test_juncao_usa_so_os_contatos_do_analista_e_normaliza_empresa(tmp_path):
+    caminho = tmp_path / "contatos.xlsx"
+    _gravar_contatos(caminho, [
+        ["Agente A", "Ana", " a@x.com "],
+        ["AGENTE B ", "Ana", ""],
+        ["Agente C", "Ana", "c@x.com"],
+        ["Agente A", "Bruno", "outro@x.com"],
+    ])
+    contatos = obter_contatos(str(caminho), ABA)
+    dados = pd.DataFrame({"Empresa": ["agente a", "Agente B", "Agente D"], "Valor": [1.0, 2.0, 3.0]})
+    juntado, sem_dados = juntar_contatos_analista(dados, contatos, "Ana")
+    assert juntado["Valor"].tolist() == [1.0, 2.0]
+    assert juntado["Email"][0] == "a@x.com"
+    assert pd.isna(juntado["Email"][1])
+    assert sem_dados == ["Agente C"]
+    assert juntar_contatos_analista(dados, contatos, "Ninguém")[0].empty
@@ -0,0 +1,71 @@
+import time
+from apps.relatorios_ccee.configuracoes.constantes import GRAPH_CONFIGS
+from apps.relatorios_ccee.model import servicos
+from apps.relatorios_ccee.model.cliente_graph import LimitadorCaixa, obter_cliente_graph
+
+def _payloads(quantidade):
+    return [servicos.montar_payload_rascunho(f"agente{i}@exemplo.com", f"Assunto {i}", "<p>corpo</p>", []) for i in range(quantidade)]
+
+def _resultados_iniciais(quantidade):
+    return [{"id": None, "erro": "Rascunho não processado."} for _ in range(quantidade)]
+
+def test_envelope_devolve_para_reenvio_so_as_sub_requisicoes_com_429(graph, token, fixar_429):
+    fixar_429([False, True, False, True])
+    payloads = _payloads(3)
+    resultados = _resultados_iniciais(3)
+    retentar, espera = servicos._enviar_envelope(obter_cliente_graph(token), [0, 1, 2], payloads, resultados)
+    assert retentar == [0, 2]
+    assert espera == graph.retry_after_s
+    assert resultados[1]["erro"] is None and resultados[1]["id"].startswith("msg-")
+    assert "429" in resultados[0]["erro"] and resultados[0]["id"] is None
+    assert graph.contadores["mensagens_criadas"] == 1
+
+def test_lote_reenvia_os_429_ate_criar_todos(graph, token, fixar_429):
+    fixar_429([False, True, True, True, False, True])
+    concluidos = []
+    resultados = servicos.criar_rascunhos_em_lote(token, _payloads(3), ao_concluir=lambda i, r: concluidos.append(i))
+    assert all(r["erro"] is None and r["id"] for r in resultados)
+    assert sorted(concluidos) == [0, 1, 2]
+    assert graph.contadores["mensagens_criadas"] == 3
+
+def test_lote_reporta_falha_quando_as_tentativas_acabam(graph, token, fixar_429, monkeypatch):
+    monkeypatch.setitem(GRAPH_CONFIGS, "batch_tentativas", 1)
+    monkeypatch.setitem(GRAPH_CONFIGS, "max_tentativas", 1)
+    fixar_429([False, True, False])
+    concluidos = []
+    resultados = servicos.criar_rascunhos_em_lote(token, _payloads(2), ao_concluir=lambda i, r: concluidos.append(i))
+    assert "429" in resultados[0]["erro"]
+    assert resultados[1]["erro"] is None
+    assert sorted(concluidos) == [0, 1]
+
+def _arquivo(pasta, nome, tamanho):
+    caminho = pasta / nome
+    caminho.write_bytes(b"x" * tamanho)
+    return caminho
+
+def test_anexos_inline_respeitam_limite_por_arquivo_e_orcamento_da_mensagem(tmp_path, monkeypatch):
+    monkeypatch.setitem(GRAPH_CONFIGS, "anexo_inline_max_bytes", 1000)
+    # 600 bytes viram 800 em base64: cabe um só no orçamento de 1000.
+    monkeypatch.setitem(GRAPH_CONFIGS, "anexos_inline_total_max_bytes", 1000)
+    primeiro = _arquivo(tmp_path, "a.pdf", 600)
+    segundo = _arquivo(tmp_path, "b.pdf", 600)
+    grande = _arquivo(tmp_path, "c.pdf", 1500)
+    pequeno = _arquivo(tmp_path, "d.pdf", 100)
+    inline, por_upload = servicos.separar_anexos_por_tamanho([primeiro, segundo, grande, pequeno])
+    assert inline == [primeiro, pequeno]
+    assert por_upload == [segundo, grande]
+
+def test_anexo_do_tamanho_exato_do_orcamento_fica_inline(tmp_path, monkeypatch):
+    monkeypatch.setitem(GRAPH_CONFIGS, "anexo_inline_max_bytes", 3000)
+    monkeypatch.setitem(GRAPH_CONFIGS, "anexos_inline_total_max_bytes", 800)
+    exato = _arquivo(tmp_path, "a.pdf", 600)
+    assert servicos.separar_anexos_por_tamanho([exato]) == ([exato], [])
+
+def test_balde_de_tokens_segura_alem_da_rajada():
+    limitador = LimitadorCaixa(taxa_por_segundo=50, capacidade=2)
+    inicio = time.monotonic()
+    for _ in range(3):
+        limitador.consumir()
+    assert time.monotonic() - inicio >= 0.015
+    assert limitador.metricas["requisicoes"] == 3
+    assert limitador.metricas["espera_balde_s"] > 0
@@ -0,0 +1,50 @@
+import math
+from datetime import datetime
+import pandas as pd
+import pytest
+from apps.relatorios_ccee.model.utils_dados import (
+    converter_numero_br, converter_serie_br, formatar_moeda, formatar_serie_moeda,
+    formatar_serie_data, tipar_colunas_relatorio,
+)
+
+TEXTOS_BR = ["R$ 1.234,56", "(1.234,56)", "-10,5", " 2.000 ", "R$\xa0987,00", "abc", "", "1.000.000,01"]
+
+def test_converter_serie_br_equivale_a_converter_numero_br():
+    serie = pd.Series(TEXTOS_BR, dtype=object)
+    esperado = [converter_numero_br(v) for v in TEXTOS_BR]
+    assert converter_serie_br(serie).tolist() == esperado
+
+def test_converter_serie_br_nao_reinterpreta_floats_do_excel_em_coluna_mista():
+    serie = pd.Series([1234.5, "1.234,50", 7], dtype=object)
+    assert converter_serie_br(serie).tolist() == [1234.5, 1234.5, 7.0]
+
+def test_converter_serie_br_preserva_ausentes_quando_pedido():
+    convertidos = converter_serie_br(pd.Series(["1,5", None, "xx"], dtype=object), vazio=float("nan"))
+    assert convertidos[0] == 1.5
+    assert math.isnan(convertidos[1])
+    assert convertidos[2] == 0.0
+
+def test_converter_serie_br_coluna_so_numerica():
+    assert converter_serie_br(pd.Series([1, 2])).dtype == "float64"
+
+@pytest.mark.parametrize("valor", [1234567.891, -5, 0.004, 12.5])
+def test_formatar_serie_moeda_equivale_a_formatar_moeda(valor):
+    assert formatar_serie_moeda(pd.Series([valor])).tolist() == [formatar_moeda(valor)]
+
+def test_formatar_serie_moeda_nao_gera_zero_negativo():
+    serie = pd.Series([-0.0, converter_numero_br("(0,00)"), -0.001])
+    assert formatar_serie_moeda(serie).tolist() == ["R$ 0,00", "R$ 0,00", "R$ 0,00"]
+
+def test_formatar_serie_moeda_vazios_e_invalidos():
+    assert formatar_serie_moeda(pd.Series([None, "x", float("nan")], dtype=object)).tolist() == ["R$ 0,00"] * 3
+
+def test_tipar_colunas_relatorio_aceita_datas_em_formatos_mistos():
+    df = pd.DataFrame({"Data": ["15/03/2025", "2025-03-21", datetime(2025, 3, 20), "01/04/2025", "xx", None]})
+    datas = tipar_colunas_relatorio(df)["Data"]
+    assert formatar_serie_data(datas).tolist() == [
+        "15/03/2025", "21/03/2025", "20/03/2025", "01/04/2025", "Data Inválida", "Data não informada",
+    ]
+
+def test_tipar_colunas_relatorio_converte_valores():
+    df = tipar_colunas_relatorio(pd.DataFrame({"Valor": ["R$ 1.000,00", "(2,50)", None]}))
+    assert df["Valor"][0] == 1000.0 and df["Valor"][1] == -2.5 and math.isnan(df["Valor"][2])
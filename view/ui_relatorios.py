@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
+import time
 import logging
+from typing import List, Dict, Any
 import streamlit.components.v1 as components
 import apps.relatorios_ccee.configuracoes.constantes as config
 import apps.relatorios_ccee.model.servicos as services
@@ -30,6 +32,106 @@ def unir_emails_seguro(campo_email):
         return "; ".join(e.strip() for e in campo_email if e)
     return "; ".join([e.strip() for e in str(campo_email).split(';') if e.strip()])
 
+INTERVALO_ACOMPANHAMENTO_S = 2
+ROTULOS_ESTADO_EMPRESA = {
+    "pendente": "⏳ Na fila",
+    "renderizado": "📝 E-mail montado",
+    "anexos_carregados": "📎 Anexos carregados",
+    "rascunho_criado": "✅ Rascunho criado",
+    "ignorado": "⏭️ Ignorado",
+    "falhou": "❌ Falhou",
+}
+
+# Com st.fragment só o painel é reexecutado a cada intervalo; sem ele, a página inteira.
+_fragmento_periodico = st.fragment(run_every=INTERVALO_ACOMPANHAMENTO_S) if hasattr(st, "fragment") else (lambda funcao: funcao)
+
+def contar_criados(resultados: List[Dict[str, Any]]) -> int:
+    return sum(1 for r in resultados if r.get("situacao_envio", "rascunho_criado") == "rascunho_criado")
+
+def exibir_tabela_resultados(resultados: List[Dict[str, Any]], tipo_relatorio: str) -> None:
+    """Tabela de resultados por empresa; serve tanto para o envio em curso quanto para o final."""
+    df_resultados = pd.DataFrame(resultados)
+    if 'situacao_envio' in df_resultados.columns:
+        df_resultados['situacao_envio'] = df_resultados['situacao_envio'].map(lambda s: ROTULOS_ESTADO_EMPRESA.get(s, s))
+    colunas_base = ['tipo', 'analista', 'empresa', 'situacao_envio', 'email', 'contagem_anexos']
+    
+    nomes_exibicao = {
+        'tipo': 'Relatório',
+        'analista': 'Analista',
+        'empresa': 'Empresa',
+        'email': 'E-mail',
+        'contagem_anexos': 'Anexos',
+        'situacao_envio': 'Envio',
+        'erro': 'Erro',
+        'data': 'Data',
+        'valor': 'Valor',
+        'data_liquidacao': 'Data Liquidação',
+        'dataaporte': 'Data Aporte',
+        'ValorLiquidacao': 'Valor Liquidação',
+        'ValorLiquidado': 'Valor Liquidado',
+        'ValorInadimplencia': 'Valor Inadimplência',
+        'situacao': 'Situação',
+        'tempo_s': 'Tempo (s)'
+    }
+    
+    colunas_especificas_relatorio = {
+        'SUM001': ['data_liquidacao', 'valor', 'situacao'],
+        'LFN001': ['data', 'ValorLiquidacao', 'ValorLiquidado', 'ValorInadimplencia'],
+        'GFN001': ['dataaporte', 'valor'],
+        'LFRES001': ['data', 'valor'],
+        'LFRCAP001': ['dataaporte', 'valor'],
+        'RCAP002': ['dataaporte', 'valor']
+    }
+    
+    colunas_especificas = colunas_especificas_relatorio.get(tipo_relatorio, ['data', 'valor'])
+    colunas_para_mostrar = colunas_base + colunas_especificas + ['tempo_s', 'erro']
+    
+    colunas_existentes = [col for col in colunas_para_mostrar if col in df_resultados.columns]
+    df_exibicao = df_resultados[colunas_existentes].rename(columns={
+        col: nomes_exibicao.get(col, col) for col in colunas_existentes
+    })
+    
+    st.dataframe(df_exibicao, use_container_width=True, hide_index=True)
+
+@_fragmento_periodico
+def painel_andamento_envio() -> None:
+    """Mostra o andamento da tarefa de envio da sessão e recolhe o resultado ao terminar."""
+    id_tarefa = st.session_state.get("tarefa_envio")
+    tarefa = rc.acompanhar_envio(id_tarefa) if id_tarefa else None
+    if tarefa is None:
+        st.session_state.pop("tarefa_envio", None)
+        return
+    descricao = tarefa["descricao"]
+    st.subheader(f"📨 Envio em andamento - {descricao.get('tipo')} - {descricao.get('mes')}/{descricao.get('ano')} - {descricao.get('analista')}")
+    total = tarefa["total"] or 0
+    if total:
+        st.progress(min(1.0, tarefa["finalizadas"] / total), text=f"{tarefa['finalizadas']} de {total} empresas finalizadas")
+    else:
+        st.progress(0.0, text="Carregando planilhas e preparando os e-mails...")
+    if tarefa["empresas"]:
+        df_andamento = pd.DataFrame([
+            {"Empresa": nome, "Situação": ROTULOS_ESTADO_EMPRESA.get(info["estado"], info["estado"]), "Anexos": info.get("anexos"), "Erro": info.get("erro", "")}
+            for nome, info in tarefa["empresas"].items()
+        ])
+        st.dataframe(df_andamento, use_container_width=True, hide_index=True, height=300)
+    if tarefa.get("avisos"):
+        with st.expander(f"⚠️ {len(tarefa['avisos'])} aviso(s)"):
+            for aviso in tarefa["avisos"]:
+                st.warning(aviso)
+    if tarefa["resultados"]:
+        st.caption(f"{contar_criados(tarefa['resultados'])} rascunho(s) já criado(s).")
+        exibir_tabela_resultados(tarefa["resultados"], descricao.get("tipo"))
+    if tarefa["status"] in ("concluida", "falhou"):
+        st.session_state.pop("tarefa_envio", None)
+        st.session_state.resultados = tarefa["resultados"]
+        st.session_state[rc.CHAVE_TEMPOS_EXECUCAO] = tarefa["tempos"]
+        criados = contar_criados(tarefa["resultados"])
+        if tarefa["status"] == "falhou":
+            st.session_state.aviso_envio = ("erro", f"❌ Erro no processamento: {tarefa['erro']} ({criados} rascunho(s) criado(s) antes da falha)")
+        else:
+            st.session_state.aviso_envio = ("sucesso", f"✅ Rascunhos criados com sucesso na sua caixa de e-mail para {criados} empresas.")
+        st.rerun()
+
 def exibir_pagina_principal() -> None:
     """Renderiza a página principal de envio de relatórios."""
     todas_configuracoes = carregar_configuracoes() 
@@ -54,29 +156,61 @@ def exibir_pagina_principal() -> None:
     with c4:
         st.session_state.ano = st.selectbox("Ano", options=config.ANOS, index=config.ANOS.index(str(ano)) if str(ano) in config.ANOS else 0)
     
+    # Enquanto um envio do usuário roda, novos envios ficam bloqueados (evita rascunhos em dobro).
+    em_andamento = rc.envio_em_andamento()
     col1, col2 = st.columns(2)
     
     if col1.button("📊 Visualizar Dados", use_container_width=True):
         st.session_state.gatilho_previa = True
     
-    if col2.button("📧 Enviar E-mails", use_container_width=True, type="primary"):
+    if col2.button("📧 Enviar E-mails", use_container_width=True, type="primary", disabled=em_andamento is not None, help="Aguarde o envio em andamento terminar." if em_andamento else None):
         if "ms_token" not in st.session_state or not st.session_state["ms_token"].get("access_token"):
             st.warning("Por favor, faça o login com sua conta Microsoft para enviar e-mails.")
         else:
             st.session_state.gatilho_envio = True
             st.rerun()
 
+    with st.expander("📦 Envio em massa (vários relatórios e analistas)", expanded=False):
+        st.caption("Relatórios que usam o mesmo arquivo e aba (ex.: GFN001 e GFN - LEMBRETE sobre o GFN003) são lidos uma única vez; os grupos de planilhas rodam em paralelo.")
+        tipos_massa = st.multiselect("Relatórios", options=tipos_relatorio, key="tipos_massa")
+        analistas_massa = st.multiselect("Analistas", options=config.ANALISTAS, default=config.ANALISTAS, key="analistas_massa")
+        if st.button(f"📧 Enviar {len(tipos_massa) * len(analistas_massa)} combinação(ões) - {mes}/{ano}", use_container_width=True, disabled=em_andamento is not None or not (tipos_massa and analistas_massa)):
+            if "ms_token" not in st.session_state or not st.session_state["ms_token"].get("access_token"):
+                st.warning("Por favor, faça o login com sua conta Microsoft para enviar e-mails.")
+            else:
+                try:
+                    st.session_state.tarefa_envio = rc.iniciar_envio_massa(tipos_massa, analistas_massa, mes, str(ano))
+                    st.session_state.dados_formulario = {'tipo': ", ".join(tipos_massa), 'analista': ", ".join(analistas_massa), 'mes': mes, 'ano': ano}
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"❌ Erro no processamento: {e}")
+                    logging.exception("Erro inesperado ao agendar envio em massa:")
+
     if st.session_state.get("gatilho_envio"):
-        with st.spinner("Criando rascunhos na sua caixa de e-mail... Aguarde."):
-            try:
-                resultados = rc.criar_rascunhos(tipo, analista_final, mes, str(ano))
-                st.session_state.resultados = resultados
-                st.success(f"✅ Rascunhos criados com sucesso na sua caixa de e-mail para {len(resultados)} empresas.")
-            except Exception as e:
-                st.error(f"❌ Erro no processamento: {e}")
-                logging.exception("Erro inesperado durante criação de rascunhos:")
+        try:
+            st.session_state.tarefa_envio = rc.iniciar_envio(tipo, analista_final, mes, str(ano))
+            st.session_state.dados_formulario = {'tipo': tipo, 'analista': analista_final, 'mes': mes, 'ano': ano}
+        except Exception as e:
+            st.error(f"❌ Erro no processamento: {e}")
+            logging.exception("Erro inesperado ao agendar criação de rascunhos:")
         st.session_state.gatilho_envio = False
 
+    if "tarefa_envio" not in st.session_state:
+        # Após reconexão do navegador, retoma o acompanhamento de um envio ainda em curso.
+        if em_andamento:
+            st.session_state.tarefa_envio = em_andamento["id"]
+            st.session_state.dados_formulario = dict(em_andamento["descricao"])
+
+    if st.session_state.get("tarefa_envio"):
+        painel_andamento_envio()
+        if not hasattr(st, "fragment") and st.session_state.get("tarefa_envio"):
+            time.sleep(INTERVALO_ACOMPANHAMENTO_S)
+            st.rerun()
+
+    aviso_envio = st.session_state.pop("aviso_envio", None)
+    if aviso_envio:
+        (st.error if aviso_envio[0] == "erro" else st.success)(aviso_envio[1])
+
     if st.session_state.get("gatilho_previa"):
         with st.spinner("Carregando dados para visualização... Por favor, aguarde."):
             try:
@@ -106,7 +240,11 @@ def exibir_pagina_principal() -> None:
             st.subheader(f"Dados para {tipo} - {mes}/{ano} - {analista_final}")
             df_exibicao = tratar_valores_df(df_bruto.copy())
             st.dataframe(df_exibicao.reset_index(drop=True), use_container_width=True)
-            
+            sem_dados = cfg.get('_agentes_sem_dados') or []
+            if sem_dados:
+                with st.expander(f"⚠️ {len(sem_dados)} agente(s) de {analista_final} sem linha neste relatório", expanded=False):
+                    st.write(", ".join(sem_dados))
+
             st.subheader("Pré-visualização do E-mail")
             limite_visualizacao = min(5, len(df_bruto))
             for idx in range(limite_visualizacao):
@@ -131,6 +269,7 @@ def exibir_pagina_principal() -> None:
         if st.button("🗑️ Limpar Visualização", key="limpar_preview"):
             del st.session_state.dados_previa_brutos
             if 'config_previa' in st.session_state: del st.session_state.config_previa
+            rc.invalidar_dados_preparados()
             st.rerun()
 
     if 'resultados' in st.session_state and st.session_state.resultados:
@@ -138,49 +277,29 @@ def exibir_pagina_principal() -> None:
         formulario = st.session_state.get('dados_formulario', {})
         st.header(f"📤 Resultado do Envio - {formulario.get('tipo', 'N/A')} - {formulario.get('mes', 'N/A')}/{formulario.get('ano', 'N/A')}")
         
-        total_criados = resultados[-1]['contagem_criados'] if resultados else 0
+        total_criados = contar_criados(resultados)
         
         col1, col2 = st.columns(2)
         col1.metric("Empresas Processadas", len(resultados))
         col2.metric("E-mails Criados", total_criados)
         
-        df_resultados = pd.DataFrame(resultados)
-        colunas_base = ['empresa', 'email', 'anexos_count']
-        
-        nomes_exibicao = {
-            'empresa': 'Empresa',
-            'email': 'E-mail',
-            'anexos_count': 'Anexos',
-            'data': 'Data',
-            'valor': 'Valor',
-            'data_liquidacao': 'Data Liquidação',
-            'dataaporte': 'Data Aporte',
-            'ValorLiquidacao': 'Valor Liquidação',
-            'ValorLiquidado': 'Valor Liquidado',
-            'ValorInadimplencia': 'Valor Inadimplência',
-            'situacao': 'Situação'
-        }
-        
-        colunas_especificas_relatorio = {
-            'SUM001': ['data_liquidacao', 'valor', 'situacao'],
-            'LFN001': ['data', 'ValorLiquidacao', 'ValorLiquidado', 'ValorInadimplencia'],
-            'GFN001': ['dataaporte', 'valor'],
-            'LFRES001': ['data', 'valor'],
-            'LFRCAP001': ['dataaporte', 'valor'],
-            'RCAP002': ['dataaporte', 'valor']
-        }
-        
-        tipo_relatorio = st.session_state.tipo_relatorio
-        colunas_especificas = colunas_especificas_relatorio.get(tipo_relatorio, ['data', 'valor'])
-        colunas_para_mostrar = colunas_base + colunas_especificas
-        
-        colunas_existentes = [col for col in colunas_para_mostrar if col in df_resultados.columns]
-        df_exibicao = df_resultados[colunas_existentes].rename(columns={
-            col: nomes_exibicao.get(col, col) for col in colunas_existentes
-        })
-        
-        st.dataframe(df_exibicao, use_container_width=True, hide_index=True)
+        exibir_tabela_resultados(resultados, formulario.get('tipo', st.session_state.tipo_relatorio))
+
+        tempos = st.session_state.get(rc.CHAVE_TEMPOS_EXECUCAO)
+        if tempos and tempos.get('etapas'):
+            with st.expander(f"⏱️ Tempos por etapa - {tempos.get('duracao_s', 0):.1f}s no total", expanded=False):
+                df_etapas = pd.DataFrame([
+                    {'Etapa': nome, 'Chamadas': dados['contagem'], 'Total (s)': dados['total_s'], 'Média (s)': dados['media_s'],
+                     'p50 (s)': dados['p50_s'], 'p95 (s)': dados['p95_s'], 'Máx (s)': dados['max_s']}
+                    for nome, dados in tempos['etapas'].items()
+                ]).sort_values('Total (s)', ascending=False)
+                st.dataframe(df_etapas, use_container_width=True, hide_index=True)
+                if tempos.get('empresas'):
+                    df_empresas = pd.DataFrame.from_dict(tempos['empresas'], orient='index').fillna(0.0)
+                    st.dataframe(df_empresas, use_container_width=True)
+                st.caption(f"Execução {tempos.get('execucao')} gravada em {config.MEDICOES_CONFIGS['arquivo_jsonl']}.")
 
         if st.button("🗑️ Limpar Resultados", key="limpar_resultados"):
             del st.session_state.resultados
+            st.session_state.pop(rc.CHAVE_TEMPOS_EXECUCAO, None)
             st.rerun()
\ No newline at end of file